@@ -1,103 +1,276 @@
+from __future__ import annotations
+
 import argparse
+import math
 import os
 import random
-from typing import Tuple
-
-import matplotlib.pyplot as plt
-from PIL import Image
-
-parser = argparse.ArgumentParser()
-parser.add_argument("--grid_size", type=int, help="grid size in pixels")
-parser.add_argument(
-    "--coverage", type=int, help="percentage of obstacle coverage in grid"
-)
-parser.add_argument(
-    "--display", type=bool, help="whether to display grid during creation"
-)
-parser.add_argument(
-    "--save", type=bool, help="whether to save figure to image(default: False)"
-)
-args = parser.parse_args()
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+
+# Pillow and matplotlib are only imported by the functions drawing images, so
+# generating occupancy arrays needs neither
+if TYPE_CHECKING:
+    from PIL import Image
 
 obstacle_color = (0, 0, 0)
 # obstacle_color = 0  # This also works for non-binary images
 random.seed(100)
 
+# Cell offsets (dx, dy) from the anchor position of each tetromino type
+TETROMINOES = {
+    "1": ((0, 0), (0, 1), (0, 2), (0, 3)),  # I tetromino
+    "2": ((0, 0), (0, 1), (0, 2), (1, 2)),  # L tetromino
+    "3": ((0, 0), (1, 0), (1, 1), (2, 1)),  # Z tetromino
+    "4": ((0, 0), (1, 0), (2, 0), (1, 1)),  # T tetromino
+}
+TETROMINO_OFFSETS = np.array([TETROMINOES[str(i)] for i in range(1, 5)])
+# Most pieces placed per batch, which bounds the scratch memory of batch
+# placement however large the grid
+MAX_BATCH_PIECES = 2**20
+
 
 def get_coverage(image: Image, size_in_pixels: int) -> float:
-    black_pixels = 0
-    for pixel in image.getdata():
-        if pixel != (0, 0, 0):
-            continue
-        black_pixels += 1
+    pixels = np.asarray(image.convert("RGB"))
+    black_pixels = np.count_nonzero(~pixels.any(axis=2))
 
-    return black_pixels / size_in_pixels ** 2
+    return black_pixels / size_in_pixels**2
 
 
 def place_tetromino_in_image(position: Tuple, tetromino_type: str, image) -> Image:
     x = position[0]
     y = position[1]
 
-    if tetromino_type == "1":  # I tetromino
-        for loc in [position, (x, y + 1), (x, y + 2), (x, y + 3)]:
-            image.putpixel(loc, obstacle_color)
+    # Any type other than 1-3 is a T tetromino
+    for dx, dy in TETROMINOES.get(tetromino_type, TETROMINOES["4"]):
+        image.putpixel((x + dx, y + dy), obstacle_color)
+
+    return image
 
-    elif tetromino_type == "2":  # L tetromino
-        for loc in [position, (x, y + 1), (x, y + 2), (x + 1, y + 2)]:
-            image.putpixel(loc, obstacle_color)
 
-    elif tetromino_type == "3":  # Z tetromino
-        for loc in [position, (x + 1, y), (x + 1, y + 1), (x + 2, y + 1)]:
-            image.putpixel(loc, obstacle_color)
+def occupancy_to_image(occupied: np.ndarray) -> Image:
+    """
+    Converts a boolean occupancy array indexed as [y, x] into the RGB obstacle
+    course image the planners draw on.
+    """
+    from PIL import Image
 
-    else:  # T tetromino
-        for loc in [position, (x + 1, y), (x + 2, y), (x + 1, y + 1)]:
-            image.putpixel(loc, obstacle_color)
+    pixels = np.full(occupied.shape + (3,), 255, dtype=np.uint8)
+    pixels[occupied] = obstacle_color
+    return Image.fromarray(pixels, "RGB")
 
-    return image
+
+def _target_cells(grid_size: int, coverage: int) -> int:
+    """
+    Smallest number of obstacle cells whose coverage, computed the way
+    get_coverage does, reaches the desired percentage.
+    """
+    area, desired_coverage = grid_size**2, coverage / 100
+    target = min(math.ceil(desired_coverage * area), area)
+    while target > 0 and (target - 1) / area >= desired_coverage:
+        target -= 1
+    while target < area and target / area < desired_coverage:
+        target += 1
+    return target
+
+
+def _place_sequentially(
+    occupied: np.ndarray, target: int, rng, on_progress=None
+) -> None:
+    """
+    Drops one tetromino at a time, drawing (x, y, type) from rng in the same
+    order the image-based generator always has, so a given seed produces the
+    same course as before.
+    """
+    grid_size = occupied.shape[0]
+    cells = memoryview(occupied.reshape(-1).view(np.uint8))
+
+    occupied_cells, window_index = 0, 0
+    while occupied_cells < target:
+        window_index += 1
+
+        random_x = rng.randint(0, grid_size - 4)
+        random_y = rng.randint(0, grid_size - 4)
+        random_tetromino_index = str(rng.randint(1, 4))
+
+        for dx, dy in TETROMINOES[random_tetromino_index]:
+            index = (random_y + dy) * grid_size + random_x + dx
+            if not cells[index]:  # Only count cells that weren't occupied yet
+                cells[index] = 1
+                occupied_cells += 1
+
+        if on_progress is not None:
+            on_progress(window_index, occupied)
+
+
+def _place_in_batches(
+    occupied: np.ndarray, target: int, rng: np.random.Generator, on_progress=None
+) -> None:
+    """
+    Drops tetrominoes many at a time, with the same outcome as placing each
+    batch's pieces one after another and stopping at the target.
+    """
+    grid_size = occupied.shape[0]
+    cells = occupied.reshape(-1)
+
+    occupied_cells, batch_index = 0, 0
+    while occupied_cells < target:
+        batch_index += 1
+
+        # A piece adds at most four new cells, so a quarter of the remaining
+        # cells' worth of pieces can't overshoot the target. Close to it, a
+        # small batch is trimmed to the piece that reaches it instead.
+        remaining = target - occupied_cells
+        pieces = min(remaining // 4, MAX_BATCH_PIECES) if remaining >= 4 else 16
+        xs = rng.integers(0, grid_size - 3, pieces)
+        ys = rng.integers(0, grid_size - 3, pieces)
+        offsets = TETROMINO_OFFSETS[rng.integers(0, 4, pieces)]
+        piece_cells = (
+            (ys[:, None] + offsets[:, :, 1]) * grid_size
+            + xs[:, None]
+            + offsets[:, :, 0]
+        ).ravel()
+
+        if remaining >= 4 and cells.size > 64 * piece_cells.size:
+            # Large grid, count the cells this batch adds instead of rescanning
+            added = piece_cells[~cells[piece_cells]]
+            occupied_cells += int(np.unique(added).size)
+            cells[added] = True
+        elif remaining >= 4:
+            cells[piece_cells] = True
+            occupied_cells = int(np.count_nonzero(cells))
+        else:
+            # Credit each newly occupied cell to the first piece covering it
+            unique_cells, first_index = np.unique(piece_cells, return_index=True)
+            first_index = first_index[~cells[unique_cells]]
+            gained = np.cumsum(np.bincount(first_index // 4, minlength=pieces))
+
+            last_piece = min(int(np.searchsorted(gained, remaining)), pieces - 1)
+            cells[piece_cells[: 4 * (last_piece + 1)]] = True
+            occupied_cells += int(gained[last_piece])
+
+        if on_progress is not None:
+            on_progress(batch_index, occupied)
+
+
+def create_obstacle_array(
+    grid_size: int = 128,
+    coverage: int = 5,
+    seed: Optional[int] = None,
+    batch: bool = False,
+    on_progress=None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Creates the obstacle course as a boolean occupancy array indexed as [y, x],
+    keeping a running count of occupied cells instead of rescanning the grid
+    after every tetromino. on_progress(index, occupied), if given, is called
+    after every piece (or batch of pieces) is placed.
+
+    Without a seed, placement draws from the module-level random state (seeded
+    at import), so repeated runs reproduce the same course. With batch, pieces
+    are drawn from a NumPy generator and placed many at a time; this is much
+    faster on large grids but yields a different, still seed-deterministic,
+    course than one-at-a-time placement.
+
+    out, if given, is an all-free boolean array of shape (grid_size,
+    grid_size), such as a memory map, to place the course in.
+    """
+    if out is None:
+        out = np.zeros((grid_size, grid_size), dtype=bool)
+    occupied = out
+    target = _target_cells(grid_size, coverage)
+
+    rng = random if seed is None else random.Random(seed)
+    if batch:
+        rng = np.random.default_rng(rng.getrandbits(64))
+        _place_in_batches(occupied, target, rng, on_progress)
+    else:
+        _place_sequentially(occupied, target, rng, on_progress)
+
+    return occupied
+
+
+def create_obstacle_file(
+    path: str, grid_size: int = 128, coverage: int = 5, seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    Creates an obstacle course, placed in batches, straight into a .npy file of
+    one byte per cell and returns it memory-mapped. Memory use doesn't grow
+    with the grid, so courses larger than memory can be made; hw1 reads them
+    with load_occupancy.
+    """
+    occupied = np.lib.format.open_memmap(
+        path, mode="w+", dtype=bool, shape=(grid_size, grid_size)
+    )
+    create_obstacle_array(grid_size, coverage, seed, batch=True, out=occupied)
+    occupied.flush()
+    return occupied
 
 
 def create_obstacle_grid(grid_size: int = 128, coverage: int = 5, **kwargs) -> Image:
     print(
         f"Creating obstacle grid({grid_size}x{grid_size}) with coverage of {coverage}%"
     )
-    grid = Image.new("RGB", (grid_size, grid_size), color=(255, 255, 255))
 
-    desired_coverage = coverage / 100
+    if kwargs.get("display") or kwargs.get("save"):
+        import matplotlib.pyplot as plt
 
-    current_coverage, window_index = 0, 0
-    while current_coverage < desired_coverage:
-        window_index += 1
+    on_progress = None
+    if kwargs.get("display"):
+        plt.axis("off")
+        artist = None
 
-        random_x = random.randint(0, grid_size - 4)
-        random_y = random.randint(0, grid_size - 4)
-        random_tetromino_index = str(random.randint(1, 4))
+        def on_progress(window_index: int, occupied: np.ndarray):
+            nonlocal artist
+            # Pauses only occasionally for faster updates
+            if window_index % kwargs.get("pause_interval", 3):
+                return
+            if artist is None:
+                artist = plt.imshow(occupancy_to_image(occupied))
+            else:  # Reuse the artist rather than stacking a new image per update
+                artist.set_data(occupancy_to_image(occupied))
+            plt.pause(0.001)  # Updates the active fig & displays it before the pause
 
-        grid = place_tetromino_in_image(
-            (random_x, random_y), random_tetromino_index, grid
+    grid = occupancy_to_image(
+        create_obstacle_array(
+            grid_size,
+            coverage,
+            seed=kwargs.get("seed"),
+            batch=kwargs.get("batch", False),
+            on_progress=on_progress,
         )
-        current_coverage = get_coverage(grid, grid_size)
-
-        plt.imshow(grid)  # Required to render image on plot
-        if kwargs.get("display"):
-            plt.axis("off")
-            if (
-                window_index % kwargs.get("pause_interval", 3) == 0
-            ):  # Pauses only occasionally for faster updates
-                plt.pause(
-                    0.001
-                )  # Updates the active fig & displays it before the pause
+    )
 
     if kwargs.get("save", False):
+        plt.imshow(grid)
+        plt.axis("off")
         plt.savefig(f"Obstacle_course({coverage}).jpeg", bbox_inches="tight")
         print("Obstacle course saved to image locally!")
 
     if kwargs.get("display"):
+        plt.imshow(grid)
         plt.show()  # Causes the image fig to persist after completion
     return grid
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grid_size", type=int, help="grid size in pixels")
+    parser.add_argument(
+        "--coverage", type=int, help="percentage of obstacle coverage in grid"
+    )
+    parser.add_argument(
+        "--display", type=bool, help="whether to display grid during creation"
+    )
+    parser.add_argument(
+        "--save", type=bool, help="whether to save figure to image(default: False)"
+    )
+    parser.add_argument("--seed", type=int, help="seed for obstacle placement")
+    parser.add_argument(
+        "--batch", type=bool, help="whether to place tetrominoes in batches"
+    )
+    args = parser.parse_args()
 
     grid_size = args.grid_size
     if not grid_size:
@@ -109,5 +282,10 @@ if __name__ == "__main__":
         os.abort()
 
     create_obstacle_grid(
-        grid_size=grid_size, coverage=coverage, save=args.save, display=args.display
+        grid_size=grid_size,
+        coverage=coverage,
+        save=args.save,
+        display=args.display,
+        seed=args.seed,
+        batch=args.batch,
     )
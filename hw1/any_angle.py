@@ -0,0 +1,190 @@
+import math
+from heapq import heappop, heappush
+from math import inf
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from graph_searches import is_unreachable
+from grid import GridGraph
+from search_stats import SearchStats
+
+
+def line_cells(a: Tuple, b: Tuple, corners: bool = False) -> Iterator[Tuple[int, int]]:
+    """
+    Cells whose interior the segment between the centres of cells a and b
+    passes through, in order from a to b inclusive (a supercover walk). Where
+    the segment passes exactly through a cell corner it steps diagonally,
+    like a diagonal move on an 8-connected GridGraph, without the two cells
+    it only touches; with corners those are included too.
+    """
+    x, y = a
+    steps_x, steps_y = abs(b[0] - x), abs(b[1] - y)
+    sx, sy = (1 if b[0] > x else -1), (1 if b[1] > y else -1)
+    yield x, y
+    ix = iy = 0
+    while ix < steps_x or iy < steps_y:
+        # Compares where the segment next crosses a vertical and a horizontal
+        # cell edge, in integers
+        decision = (1 + 2 * ix) * steps_y - (1 + 2 * iy) * steps_x
+        if decision == 0:
+            if corners:
+                yield x + sx, y
+                yield x, y + sy
+            x, y, ix, iy = x + sx, y + sy, ix + 1, iy + 1
+        elif decision < 0:
+            x, ix = x + sx, ix + 1
+        else:
+            y, iy = y + sy, iy + 1
+        yield x, y
+
+
+def waypoint_cells(waypoints: List) -> List:
+    """
+    Fills in the cells along each segment of an any-angle path, giving a path
+    of adjacent cells for drawing or for following on the grid.
+    """
+    if not waypoints:
+        return []
+    cells = [waypoints[0]]
+    for a, b in zip(waypoints, waypoints[1:]):
+        segment = line_cells(a, b)
+        next(segment)  # a, already in cells
+        cells.extend(segment)
+    return cells
+
+
+def theta_star(
+    graph: GridGraph,
+    start: Tuple,
+    goal: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, float, SearchStats]:
+    """
+    Theta* (Nash, Daniel, Koenig and Felner, 2007): A* over the grid's cells
+    in which a node may take its parent's parent as its own whenever the
+    straight segment between them is clear, so paths run at any angle instead
+    of zig-zagging along grid moves. Costs are Euclidean and the heuristic is
+    the straight-line distance.
+
+    Line of sight is checked along line_cells over the occupancy, and each
+    pair of cells is only checked once per query. On a 4-connected grid,
+    where there are no diagonal moves, a segment through a cell corner also
+    needs both cells touching it free.
+
+    Returns (waypoints, cost, stats) like astar, where waypoints are the path's
+    turning points from start to goal inclusive; see waypoint_cells for the
+    cells in between. Empty, with an infinite cost, if the goal is
+    unreachable.
+    """
+    return _theta_star(graph, start, goal, False, on_expand, on_generate, on_path)
+
+
+def lazy_theta_star(
+    graph: GridGraph,
+    start: Tuple,
+    goal: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, float, SearchStats]:
+    """
+    Lazy Theta* (Nash, Koenig and Tovey, 2010): Theta* that assumes a new
+    node can see its parent's parent and only checks when the node is
+    expanded, falling back to its best expanded neighbour if not. Most nodes
+    generated are never expanded, so this checks line of sight far less
+    often for paths of about the same length. Returns what theta_star does.
+    """
+    return _theta_star(graph, start, goal, True, on_expand, on_generate, on_path)
+
+
+def _theta_star(
+    graph: GridGraph,
+    start: Tuple,
+    goal: Tuple,
+    lazy: bool,
+    on_expand: Optional[Callable],
+    on_generate: Optional[Callable],
+    on_path: Optional[Callable],
+) -> Tuple[List, float, SearchStats]:
+    stats = SearchStats().start()
+    if not graph.is_free(start) or is_unreachable(graph, start, goal):
+        return [], inf, stats.finish()
+
+    width, blocked = graph.width, graph.blocked
+    corners = graph.connectivity == 4
+    visible = {}  # (cell, cell) -> line of sight, for this query
+
+    def line_of_sight(a: Tuple, b: Tuple) -> bool:
+        key = (a, b) if a <= b else (b, a)
+        seen = visible.get(key)
+        if seen is None:
+            seen = visible[key] = not any(
+                blocked[y * width + x] for x, y in line_cells(a, b, corners)
+            )
+        return seen
+
+    dist = math.dist
+    cost_from_start = {start: 0}
+    parent = {start: start}
+    closed = set()
+    # Entries are (f, -g, node), so equal f pops the deeper node first
+    frontier = [(dist(start, goal), 0, start)]
+    stats.generated = 1
+
+    while frontier:
+        stats.peak_open = max(stats.peak_open, len(frontier))
+        _, _, current_node = heappop(frontier)
+        if current_node in closed:  # Stale entry
+            continue
+
+        if lazy and not line_of_sight(parent[current_node], current_node):
+            # The assumed shortcut is blocked, so take the best way in through
+            # an expanded neighbour; there is always the one that generated it
+            cost_from_start[current_node], parent[current_node] = min(
+                (cost_from_start[neighbour] + dist(neighbour, current_node), neighbour)
+                for neighbour in graph[current_node]
+                if neighbour in closed
+            )
+
+        closed.add(current_node)
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(current_node)
+
+        if current_node == goal:
+            waypoints = [goal]
+            while waypoints[-1] != start:
+                waypoints.append(parent[waypoints[-1]])
+            waypoints.reverse()
+            if on_path is not None:
+                on_path(waypoints)
+            cost = cost_from_start[goal]
+            return waypoints, cost, stats.finish(cost)
+
+        node_cost = cost_from_start[current_node]
+        grandparent = parent[current_node]
+        for child in graph[current_node]:
+            if child in closed:
+                continue
+
+            # Straight from the grandparent if it can be seen (or, when lazy,
+            # assuming it can), else by the grid move
+            if lazy or line_of_sight(grandparent, child):
+                via = grandparent
+                child_cost = cost_from_start[grandparent] + dist(grandparent, child)
+            else:
+                via = current_node
+                child_cost = node_cost + dist(current_node, child)
+
+            if child_cost < cost_from_start.get(child, inf):
+                if child in cost_from_start:
+                    stats.reopened += 1
+                cost_from_start[child] = child_cost
+                parent[child] = via
+                heappush(frontier, (child_cost + dist(child, goal), -child_cost, child))
+                stats.generated += 1
+                if on_generate is not None:
+                    on_generate(child)
+
+    return [], inf, stats.finish()
@@ -0,0 +1,165 @@
+import time
+from heapq import heapify, heappop, heappush
+from math import inf
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from graph_searches import is_unreachable
+from heuristics import manhattan, octile
+from search_stats import SearchStats
+from utils import reconstruct_path
+
+
+def ara_star(
+    graph: Dict,
+    start: Tuple,
+    goal: Tuple,
+    heuristic: Optional[Callable] = None,
+    epsilon: float = 2.5,
+    step: float = 0.5,
+    deadline: Optional[float] = None,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Iterator[Tuple[List, float, float, SearchStats]]:
+    """
+    Anytime Repairing A* (Likhachev, Gordon and Thrun, 2003). Searches with
+    the heuristic inflated by epsilon, which finds a path quickly, then lowers
+    epsilon by step and searches again until it reaches 1, each time reusing
+    the costs found so far: only nodes whose cost improved after they were
+    expanded are expanded again.
+
+    Yields (path, cost, bound, stats) whenever the path or its bound improves:
+    the path from start to goal inclusive, its cost, a bound on how many times
+    the optimal cost it can be, and the work done since the previous yield.
+    The bound is 1 for the last solution if the search runs to completion.
+    graph, heuristic (which must be admissible) and the callbacks are as for
+    astar.
+
+    deadline is a time.perf_counter() reading after which the search stops,
+    checked before every expansion, so the last solution yielded before it is
+    the best one available in time. Work cut off by the deadline yields
+    nothing, and nothing is yielded if the goal is unreachable.
+    """
+    if epsilon < 1:
+        raise ValueError(f"epsilon must be at least 1, got {epsilon}")
+    if step <= 0:
+        raise ValueError(f"step must be positive, got {step}")
+    if is_unreachable(graph, start, goal):
+        return
+    if heuristic is None:
+        heuristic = octile if isinstance(graph[start], dict) else manhattan
+
+    cost_from_start = {start: 0}
+    parent = {start: None}
+    # Nodes with a current entry on the frontier, and expanded nodes whose cost
+    # improved afterwards, which wait for the next iteration
+    open_nodes = {start}
+    inconsistent = set()
+    frontier = [(epsilon * heuristic(start, goal), 0, start)]
+    stats = SearchStats(generated=1).start()
+    reported = None  # (cost, bound) of the last solution yielded
+
+    while True:
+        closed = set()
+        goal_cost = cost_from_start.get(goal, inf)
+
+        while frontier:
+            f, negative_cost, node = frontier[0]
+            if node not in open_nodes or -negative_cost != cost_from_start[node]:
+                heappop(frontier)  # Stale entry
+                continue
+            if goal_cost <= f:  # No node left could lead to a cheaper goal
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                stats.finish()
+                return
+
+            stats.peak_open = max(stats.peak_open, len(frontier))
+            heappop(frontier)
+            open_nodes.remove(node)
+            closed.add(node)
+            stats.expanded += 1
+            if on_expand is not None:
+                on_expand(node)
+
+            node_cost = -negative_cost
+            children = graph[node]
+            weighted = isinstance(children, dict)
+            for child in children:
+                child_cost = node_cost + (children[child] if weighted else 1)
+                if child_cost >= cost_from_start.get(child, inf):
+                    continue
+                if child in cost_from_start:
+                    stats.reopened += 1
+                cost_from_start[child] = child_cost
+                parent[child] = node
+                if child == goal:
+                    goal_cost = child_cost
+                if child in closed:
+                    inconsistent.add(child)
+                    continue
+                heappush(
+                    frontier,
+                    (child_cost + epsilon * heuristic(child, goal), -child_cost, child),
+                )
+                open_nodes.add(child)
+                stats.generated += 1
+                if on_generate is not None:
+                    on_generate(child)
+
+        if goal_cost == inf:  # Frontier ran out
+            stats.finish()
+            return
+
+        # The optimal cost is at least the smallest uninflated f of any node
+        # that could still improve the path
+        waiting = open_nodes | inconsistent
+        lowest = min(
+            (cost_from_start[node] + heuristic(node, goal) for node in waiting),
+            default=goal_cost,
+        )
+        bound = max(1.0, min(epsilon, goal_cost / lowest if lowest > 0 else 1.0))
+
+        if (goal_cost, bound) != reported:
+            reported = goal_cost, bound
+            path = reconstruct_path(parent, goal)
+            if on_path is not None:
+                on_path(path)
+            yield path, goal_cost, bound, stats.finish(goal_cost)
+            stats = SearchStats().start()
+        if bound <= 1:
+            stats.finish()
+            return
+
+        # Next iteration: lower epsilon and requeue everything waiting
+        epsilon = max(1.0, epsilon - step)
+        open_nodes, inconsistent = waiting, set()
+        frontier = [
+            (
+                cost_from_start[node] + epsilon * heuristic(node, goal),
+                -cost_from_start[node],
+                node,
+            )
+            for node in waiting
+        ]
+        heapify(frontier)
+        stats.generated += len(frontier)
+
+
+def plan_within(
+    graph: Dict, start: Tuple, goal: Tuple, budget: float, **options
+) -> Tuple[List, float, float, SearchStats]:
+    """
+    Runs ara_star for at most budget seconds and returns its last solution,
+    (path, cost, bound, stats), with stats covering the work up to it. The path
+    is empty and the cost and bound infinite if none was found in time or the
+    goal is unreachable. options are passed on to ara_star.
+    """
+    deadline = time.perf_counter() + budget
+    stats = SearchStats().start()
+    path, cost, bound = [], inf, inf
+    for path, cost, bound, iteration in ara_star(
+        graph, start, goal, deadline=deadline, **options
+    ):
+        stats.merge(iteration)
+    return path, cost, bound, stats.finish(cost)
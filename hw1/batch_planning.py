@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from numpy import inf
+
+from any_angle import lazy_theta_star, theta_star
+from graph_searches import (
+    astar,
+    bfs,
+    bidirectional_astar,
+    bidirectional_bfs,
+    bidirectional_dijkstra,
+    dfs,
+    dijkstra,
+    jps,
+    random_planner,
+)
+from grid import GridGraph, occupancy_from_image
+from sampling import rrt, rrt_connect
+from search_stats import SearchStats
+from workspace import SearchWorkspace
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+PLANNERS = (
+    "bfs",
+    "dfs",
+    "random_planner",
+    "dijkstra",
+    "astar",
+    "jps",
+    "bidirectional_bfs",
+    "bidirectional_dijkstra",
+    "bidirectional_astar",
+    "theta_star",
+    "lazy_theta_star",
+    "rrt",
+    "rrt_connect",
+)
+# Planners returning (path, cost, stats) themselves
+SEARCHES = {
+    "astar": astar,
+    "jps": jps,
+    "bidirectional_astar": bidirectional_astar,
+    "theta_star": theta_star,
+    "lazy_theta_star": lazy_theta_star,
+    "rrt": rrt,
+    "rrt_connect": rrt_connect,
+}
+# Planners that take a SearchWorkspace to reuse between queries
+WORKSPACE_PLANNERS = ("dijkstra", "astar")
+
+# Set up in each pool worker by _attach_grid
+_worker_memory = None
+_worker_graph = None
+_worker_workspace = None
+
+
+def run_query(
+    graph: GridGraph, planner: str, start: Tuple, goal: Tuple, **planner_kwargs
+) -> Tuple[List, float, SearchStats]:
+    """
+    Runs one planner from graph_searches and returns its result in a common
+    form: (path, cost, stats). The path runs from start to goal inclusive
+    (for the any-angle and sampling planners, as waypoints) and is empty,
+    with an infinite cost, if the planner didn't reach the goal. stats is the
+    planner's own SearchStats record.
+    """
+    if planner in SEARCHES:
+        path, cost, stats = SEARCHES[planner](graph, start, goal, **planner_kwargs)
+    elif planner in ("dijkstra", "bidirectional_dijkstra"):
+        search = dijkstra if planner == "dijkstra" else bidirectional_dijkstra
+        _, _, path, stats = search(graph, start, goal, **planner_kwargs)
+        cost = stats.path_cost
+    elif planner in ("bfs", "dfs", "random_planner", "bidirectional_bfs"):
+        search = {
+            "bfs": bfs,
+            "dfs": dfs,
+            "random_planner": random_planner,
+            "bidirectional_bfs": bidirectional_bfs,
+        }[planner]
+        paths = []
+        on_path = planner_kwargs.pop("on_path", None)
+
+        def record(path: List) -> None:
+            paths.append(path)
+            if on_path is not None:
+                on_path(path)
+
+        stats = search(graph, start, goal, on_path=record, **planner_kwargs)[-1]
+        path, cost = (paths[0], stats.path_cost) if paths else ([], inf)
+    else:
+        raise ValueError(f"Unknown planner {planner!r}, expected one of {PLANNERS}")
+    return path, cost, stats
+
+
+def _attach_grid(name: str, shape: Tuple[int, int], connectivity: int) -> None:
+    """
+    Pool initializer: wraps the shared occupancy buffer in a GridGraph once per
+    worker, without copying it.
+    """
+    global _worker_memory, _worker_graph, _worker_workspace
+    _worker_memory = SharedMemory(name=name)
+    occupied = np.ndarray(shape, dtype=bool, buffer=_worker_memory.buf)
+    _worker_graph = GridGraph(occupied, connectivity)
+    _worker_workspace = SearchWorkspace.for_graph(_worker_graph)
+
+
+def _plan_queries(
+    graph: GridGraph,
+    workspace: SearchWorkspace,
+    planner: str,
+    planner_kwargs: Dict,
+    queries: List,
+) -> List[Tuple[List, float, SearchStats]]:
+    if planner in WORKSPACE_PLANNERS:
+        planner_kwargs = {"workspace": workspace, **planner_kwargs}
+    return [
+        run_query(graph, planner, start, goal, **planner_kwargs)
+        for start, goal in queries
+    ]
+
+
+def _plan_chunk(task: Tuple[str, Dict, List]) -> List[Tuple[List, float, SearchStats]]:
+    return _plan_queries(_worker_graph, _worker_workspace, *task)
+
+
+def plan_batch(
+    grid: Union[Image.Image, np.ndarray],
+    queries: List[Tuple[Tuple, Tuple]],
+    planner: str = "astar",
+    connectivity: int = 4,
+    processes: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    **planner_kwargs,
+) -> List[Tuple[List, float, SearchStats]]:
+    """
+    Answers many (start, goal) queries on one grid with a pool of processes.
+
+    grid is an obstacle course image from create_obstacle_grid or a boolean
+    occupancy array indexed as [y, x]. The occupancy is copied into shared
+    memory once and every worker builds its GridGraph over that buffer, so
+    tasks only carry the planner name and their queries; indexes such as the
+    component labels, and the SearchWorkspace that dijkstra and astar run in,
+    are built once per worker and reused for all its queries.
+
+    Returns one (path, cost, stats) per query, in input order, as run_query
+    does. With processes=1 the queries run in this process instead.
+    """
+    if planner not in PLANNERS:
+        raise ValueError(f"Unknown planner {planner!r}, expected one of {PLANNERS}")
+    if not isinstance(grid, np.ndarray):
+        grid = occupancy_from_image(grid)
+    occupied = np.ascontiguousarray(grid, dtype=bool)
+    # Plain int tuples, in case the queries were drawn from a numpy array
+    queries = [
+        (tuple(map(int, start)), tuple(map(int, goal))) for start, goal in queries
+    ]
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        graph = GridGraph(occupied, connectivity)
+        workspace = SearchWorkspace.for_graph(graph)
+        return _plan_queries(graph, workspace, planner, planner_kwargs, queries)
+
+    # Several chunks per worker keeps the pool balanced when query costs vary
+    if chunksize is None:
+        chunksize = max(1, -(-len(queries) // (processes * 4)))
+    tasks = [
+        (planner, planner_kwargs, queries[first : first + chunksize])
+        for first in range(0, len(queries), chunksize)
+    ]
+
+    memory = SharedMemory(create=True, size=max(occupied.nbytes, 1))
+    try:
+        np.ndarray(occupied.shape, dtype=bool, buffer=memory.buf)[...] = occupied
+        with Pool(
+            processes,
+            initializer=_attach_grid,
+            initargs=(memory.name, occupied.shape, connectivity),
+        ) as pool:
+            chunks = pool.map(_plan_chunk, tasks, chunksize=1)
+    finally:
+        memory.close()
+        memory.unlink()
+
+    return [result for chunk in chunks for result in chunk]
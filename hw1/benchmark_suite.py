@@ -0,0 +1,368 @@
+"""
+Reproducible, headless benchmark suite for the planners in graph_searches.
+Sweeps grid sizes, coverages and connectivities over seeded obstacle courses
+and records, per planner and query, the wall time, nodes expanded, peak memory
+and path cost. Run with the PYTHONPATH set up as in the README:
+
+    python hw1/benchmark_suite.py --sizes 50 512 4096 --json baseline.json
+    python hw1/benchmark_suite.py --sizes 50 512 4096 --baseline baseline.json
+
+It also times importing the modules a planning process starts from, each in
+a fresh interpreter, and checks that none of them pulls in matplotlib or
+Pillow. With --baseline, queries that got slower by more than --tolerance,
+expanded more nodes or found a costlier path, and imports that got slower or
+heavier, are listed and the exit status is 1.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from numpy import inf
+
+from batch_planning import PLANNERS, run_query
+from grid import GridGraph
+from scenarios import ScenarioStore
+
+# Planners that only run on one connectivity
+CONNECTIVITIES = {"random_planner": (4,), "jps": (8,)}
+KEY_FIELDS = ("planner", "grid_size", "coverage", "connectivity", "query")
+FIELDS = KEY_FIELDS + (
+    "seconds",
+    "expanded",
+    "generated",
+    "peak_open",
+    "reopened",
+    "path_cost",
+    "peak_memory",
+)
+# Modules that planning processes start from, whose import time is tracked,
+# and the visualisation modules none of them should import
+IMPORT_MODULES = (
+    "graph_searches",
+    "batch_planning",
+    "scenarios",
+    "planning_service",
+    "plan",
+)
+VISUAL_MODULES = ("matplotlib", "PIL")
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps([seconds, [name for name in {visual!r} if name in sys.modules]]))
+"""
+
+
+def measure(
+    graph: GridGraph,
+    planner: str,
+    start: tuple,
+    goal: tuple,
+    repeat: int = 3,
+    seed: int = 0,
+    memory: bool = True,
+) -> Dict:
+    """
+    Best wall time of repeat runs of one query, with the other stats of that
+    run. Peak memory comes from one more run under tracemalloc, which slows
+    planners down too much to time them at once.
+    """
+    best = None
+    for _ in range(repeat):
+        random.seed(seed)  # So random_planner takes the same walk every time
+        _, cost, stats = run_query(graph, planner, start, goal)
+        if best is None or stats.wall_time < best.wall_time:
+            best = stats
+
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        try:
+            random.seed(seed)
+            peak_memory = run_query(graph, planner, start, goal)[2].peak_memory
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "seconds": best.wall_time,
+        "expanded": best.expanded,
+        "generated": best.generated,
+        "peak_open": best.peak_open,
+        "reopened": best.reopened,
+        "path_cost": None if cost == inf else float(cost),
+        "peak_memory": peak_memory,
+    }
+
+
+def run_suite(
+    sizes: Sequence[int],
+    coverages: Sequence[int],
+    connectivities: Sequence[int] = (4, 8),
+    planners: Sequence[str] = PLANNERS,
+    queries: int = 3,
+    repeat: int = 3,
+    seed: int = 0,
+    memory: bool = True,
+    store: Optional[ScenarioStore] = None,
+) -> List[Dict]:
+    """
+    Runs every planner on queries start/goal pairs of each seeded course and
+    connectivity, and returns one record per query with the fields in FIELDS.
+    Courses, their component labels and the pairs come from the scenario
+    store, so repeated runs measure the same queries and start quickly.
+    """
+    store = store or ScenarioStore()
+    results = []
+    for grid_size in sizes:
+        for coverage in coverages:
+            scenario = store.get(grid_size, coverage, seed, batch=True)
+            for connectivity in connectivities:
+                graph = scenario.graph(connectivity)
+                pairs = scenario.pairs(queries, connectivity, seed).tolist()
+                for planner in planners:
+                    if connectivity not in CONNECTIVITIES.get(planner, (4, 8)):
+                        continue
+                    records = [
+                        {
+                            "planner": planner,
+                            "grid_size": grid_size,
+                            "coverage": coverage,
+                            "connectivity": connectivity,
+                            "query": query,
+                            **measure(
+                                graph,
+                                planner,
+                                tuple(start),
+                                tuple(goal),
+                                repeat,
+                                seed,
+                                memory,
+                            ),
+                        }
+                        for query, (start, goal) in enumerate(pairs)
+                    ]
+                    print_summary(records)
+                    results.extend(records)
+    return results
+
+
+def measure_imports(
+    modules: Sequence[str] = IMPORT_MODULES, repeat: int = 3
+) -> List[Dict]:
+    """
+    Best time over repeat fresh interpreters to import each module, which
+    every pool worker and command line run pays before planning anything,
+    with the VISUAL_MODULES the import loaded. One record per module.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = [here, os.path.dirname(here), os.environ.get("PYTHONPATH", "")]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, path))}
+    records = []
+    for module in modules:
+        script = IMPORT_SCRIPT.format(module=module, visual=VISUAL_MODULES)
+        best, loaded = inf, []
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", script],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            seconds, loaded = json.loads(output)
+            best = min(best, seconds)
+        records.append({"module": module, "seconds": best, "loaded": loaded})
+        print(
+            f"{'import ' + module:>22} {best * 1000:>10.2f}ms"
+            + (f" loads {', '.join(loaded)}" if loaded else "")
+        )
+    return records
+
+
+def print_summary(records: List[Dict]) -> None:
+    """
+    One line for the queries of one planner on one course and connectivity.
+    """
+    first = records[0]
+    memory = [r["peak_memory"] for r in records if r["peak_memory"] is not None]
+    print(
+        f"{first['planner']:>22} {first['grid_size']:>6} {first['coverage']:>4}% "
+        f"{first['connectivity']}-conn "
+        f"{np.mean([r['seconds'] for r in records]) * 1000:>10.2f}ms "
+        f"{np.mean([r['expanded'] for r in records]):>11.0f} exp "
+        + (f"{max(memory) / 2**20:>8.2f}MiB" if memory else "")
+    )
+
+
+def compare(
+    results: List[Dict],
+    baseline: List[Dict],
+    tolerance: float = 0.25,
+    min_seconds: float = 0.001,
+) -> List[str]:
+    """
+    Regressions of results against baseline, one line each: queries that took
+    more than 1 + tolerance times as long (and at least min_seconds longer, as
+    shorter differences are noise), expanded more nodes or found a costlier
+    path or none. Queries missing from either side are skipped.
+    """
+    previous = {tuple(record[f] for f in KEY_FIELDS): record for record in baseline}
+    regressions = []
+    for record in results:
+        key = tuple(record[f] for f in KEY_FIELDS)
+        old = previous.get(key)
+        if old is None:
+            continue
+
+        name = " ".join(f"{f}={value}" for f, value in zip(KEY_FIELDS, key))
+        seconds, old_seconds = record["seconds"], old["seconds"]
+        if seconds > old_seconds * (1 + tolerance) and (
+            seconds - old_seconds > min_seconds
+        ):
+            regressions.append(
+                f"{name}: {old_seconds * 1000:.2f}ms -> {seconds * 1000:.2f}ms"
+            )
+        if record["expanded"] > old["expanded"]:
+            regressions.append(
+                f"{name}: expanded {old['expanded']} -> {record['expanded']}"
+            )
+        cost, old_cost = record["path_cost"], old["path_cost"]
+        if old_cost is not None and (cost is None or cost > old_cost + 1e-6):
+            regressions.append(f"{name}: path cost {old_cost} -> {cost}")
+    return regressions
+
+
+def compare_imports(
+    imports: List[Dict],
+    baseline: List[Dict],
+    tolerance: float = 0.25,
+    min_seconds: float = 0.01,
+) -> List[str]:
+    """
+    Regressions of import records against baseline, as for compare: imports
+    that got slower by the same measure, and any that load a visualisation
+    module the baseline didn't.
+    """
+    previous = {record["module"]: record for record in baseline}
+    regressions = []
+    for record in imports:
+        old = previous.get(record["module"])
+        if old is None:
+            continue
+        name = f"import {record['module']}"
+        seconds, old_seconds = record["seconds"], old["seconds"]
+        if seconds > old_seconds * (1 + tolerance) and (
+            seconds - old_seconds > min_seconds
+        ):
+            regressions.append(
+                f"{name}: {old_seconds * 1000:.2f}ms -> {seconds * 1000:.2f}ms"
+            )
+        for module in set(record["loaded"]) - set(old["loaded"]):
+            regressions.append(f"{name}: now loads {module}")
+    return regressions
+
+
+def write_json(
+    path: str, results: List[Dict], imports: Optional[List[Dict]] = None
+) -> None:
+    meta = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+    with open(path, "w") as file:
+        json.dump(
+            {"meta": meta, "results": results, "imports": imports or []},
+            file,
+            indent=1,
+        )
+
+
+def write_csv(path: str, results: List[Dict]) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[50, 128, 512], help="grid sizes"
+    )
+    parser.add_argument(
+        "--coverages",
+        type=int,
+        nargs="+",
+        default=[0, 20, 40],
+        help="obstacle coverages in percent",
+    )
+    parser.add_argument(
+        "--connectivities", type=int, nargs="+", default=[4, 8], choices=(4, 8)
+    )
+    parser.add_argument(
+        "--planners", nargs="+", default=list(PLANNERS), choices=PLANNERS
+    )
+    parser.add_argument("--queries", type=int, default=3, help="queries per course")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per query")
+    parser.add_argument("--seed", type=int, default=0, help="course and query seed")
+    parser.add_argument(
+        "--no_memory", action="store_true", help="skip the peak memory runs"
+    )
+    parser.add_argument(
+        "--no_imports", action="store_true", help="skip the import time runs"
+    )
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--csv", help="write the results to this CSV file")
+    parser.add_argument("--baseline", help="JSON results to check for regressions")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="slowdown over the baseline allowed, as a fraction",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_suite(
+        args.sizes,
+        args.coverages,
+        args.connectivities,
+        args.planners,
+        args.queries,
+        args.repeat,
+        args.seed,
+        not args.no_memory,
+    )
+    imports = [] if args.no_imports else measure_imports(repeat=args.repeat)
+    if args.json:
+        write_json(args.json, results, imports)
+    if args.csv:
+        write_csv(args.csv, results)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        regressions += compare_imports(
+            imports, baseline.get("imports", []), args.tolerance
+        )
+        for line in regressions:
+            print("REGRESSION", line)
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,457 @@
+"""
+Timing comparisons between planners in graph_searches. Run with the
+PYTHONPATH set up as in the README:
+
+    python hw1/benchmarks.py
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Callable, Tuple
+
+from numpy import inf
+
+from anytime import ara_star
+from batch_planning import plan_batch
+from benchmark_suite import IMPORT_MODULES, measure_imports
+from cost_to_go import CostToGoCache
+from cspace import CSpaceCache, disc_footprint
+from graph_searches import (
+    astar,
+    bfs,
+    bidirectional_astar,
+    bidirectional_bfs,
+    bidirectional_dijkstra,
+    dijkstra,
+    frontier_bfs,
+    jps,
+)
+from grid import GridGraph
+from hierarchical import HierarchicalPlanner
+from hw0.obstacle_course import create_obstacle_array, create_obstacle_grid
+from landmarks import LandmarkHeuristic
+from planning_service import PlanningService
+from sampling import rrt, rrt_connect
+from utils import choose_start_and_end_loc
+
+
+def time_call(function: Callable, *args, repeat: int = 3) -> Tuple[float, object]:
+    """
+    Calls function repeat times and returns the best wall time in seconds
+    along with the result of the last call.
+    """
+    best, result = inf, None
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - tic)
+    return best, result
+
+
+def benchmark_dijkstra(grid_sizes=(64, 128, 256), coverage: int = 10):
+    """
+    Compares dijkstra against the FIFO search it replaced. The previous
+    dijkstra was line for line the same as bfs, so bfs stands in for it.
+    """
+    print("\nDijkstra (8-connected), previous FIFO version vs heap-based")
+    print(f"{'size':>6} {'previous':>12} {'heap':>12} {'prev cost':>10} {'cost':>10}")
+    for grid_size in grid_sizes:
+        grid = create_obstacle_grid(grid_size, coverage)
+        graph = GridGraph.from_image(grid, connectivity=8)
+        start, end = choose_start_and_end_loc(grid, graph)
+
+        previous_time, previous = time_call(bfs, graph, start, end)
+        current_time, current = time_call(dijkstra, graph, start, end)
+        print(
+            f"{grid_size:>6} {previous_time * 1000:>10.1f}ms "
+            f"{current_time * 1000:>10.1f}ms {previous[-1].path_cost:>10.2f} "
+            f"{current[-1].path_cost:>10.2f}"
+        )
+
+
+def benchmark_bfs(grid_sizes=(128, 256, 512, 1024), coverage: int = 20):
+    """
+    Compares the frontier-at-a-time frontier_bfs against bfs on 4-connected
+    grids, corner to corner.
+    """
+    print("\nBFS (4-connected), per-node queue vs frontier-at-a-time")
+    print(f"{'size':>6} {'bfs':>12} {'frontier':>12} {'path':>8}")
+    for grid_size in grid_sizes:
+        grid = create_obstacle_grid(grid_size, coverage, batch=True)
+        graph = GridGraph.from_image(grid, connectivity=4)
+        start, end = (0, 0), (grid_size - 1, grid_size - 1)
+        graph.set_occupied([start, end], False)
+        graph.components
+
+        bfs_time, (_, path, _, _) = time_call(bfs, graph, start, end)
+        frontier_time, (_, frontier_path, _, _) = time_call(
+            frontier_bfs, graph, start, end
+        )
+        assert len(path) == len(frontier_path), "frontier_bfs path length differs"
+        print(
+            f"{grid_size:>6} {bfs_time * 1000:>10.1f}ms "
+            f"{frontier_time * 1000:>10.1f}ms {len(path):>8}"
+        )
+
+
+def benchmark_jps(grid_sizes=(128, 256, 512, 1024), coverages=(0, 10, 20, 30)):
+    """
+    Compares jump point search against astar on 8-connected grids.
+    """
+    print("\nJump point search vs A* (8-connected)")
+    print(
+        f"{'size':>6} {'cov':>4} {'astar':>12} {'jps':>12} {'jps prep':>12} "
+        f"{'astar exp':>10} {'jps exp':>10} {'cost':>10}"
+    )
+    for grid_size in grid_sizes:
+        for coverage in coverages:
+            grid = create_obstacle_grid(grid_size, coverage, batch=True)
+            graph = GridGraph.from_image(grid, connectivity=8)
+            start, end = choose_start_and_end_loc(grid, graph)
+
+            # One-off precomputation of the straight jump table, cached per grid
+            tic = time.perf_counter()
+            graph.jump_stops
+            prep_time = time.perf_counter() - tic
+
+            astar_time, (_, cost, astar_stats) = time_call(astar, graph, start, end)
+            jps_time, (_, jps_cost, jps_stats) = time_call(jps, graph, start, end)
+            assert abs(cost - jps_cost) < 1e-6, "jps returned a suboptimal path"
+
+            print(
+                f"{grid_size:>6} {coverage:>4} {astar_time * 1000:>10.1f}ms "
+                f"{jps_time * 1000:>10.1f}ms {prep_time * 1000:>10.1f}ms "
+                f"{astar_stats.expanded:>10} "
+                f"{jps_stats.expanded:>10} {cost:>10.2f}"
+            )
+
+
+def benchmark_hierarchical(grid_sizes=(256, 512, 1024), coverage: int = 20):
+    """
+    Compares HierarchicalPlanner queries against astar on 8-connected grids,
+    corner to corner, along with the one-off cost of building the abstract
+    graph and of updating it after a small change.
+    """
+    print("\nHierarchical (HPA*) vs A* (8-connected)")
+    print(
+        f"{'size':>6} {'astar':>12} {'hpa':>12} {'build':>12} {'update':>12} "
+        f"{'cost':>10} {'hpa cost':>10}"
+    )
+    for grid_size in grid_sizes:
+        grid = create_obstacle_grid(grid_size, coverage, batch=True)
+        graph = GridGraph.from_image(grid, connectivity=8)
+        start, end = (0, 0), (grid_size - 1, grid_size - 1)
+        graph.set_occupied([start, end], False)
+        graph.components  # Shared reachability check, cached per grid
+
+        build_time, planner = time_call(HierarchicalPlanner, graph, repeat=1)
+        astar_time, (_, cost, _) = time_call(astar, graph, start, end)
+        hpa_time, (_, hpa_cost, _) = time_call(planner.plan, start, end)
+
+        middle = (grid_size // 2, grid_size // 2)
+        tic = time.perf_counter()
+        planner.update(graph.set_occupied([middle], not graph.occupied[middle[::-1]]))
+        update_time = time.perf_counter() - tic
+
+        print(
+            f"{grid_size:>6} {astar_time * 1000:>10.1f}ms {hpa_time * 1000:>10.1f}ms "
+            f"{build_time * 1000:>10.1f}ms {update_time * 1000:>10.1f}ms "
+            f"{cost:>10.2f} {hpa_cost:>10.2f}"
+        )
+
+
+def benchmark_batch(grid_size: int = 512, coverage: int = 20, queries: int = 400):
+    """
+    Throughput of plan_batch with astar for growing process pools, on random
+    queries between free cells of one grid.
+    """
+    print(f"\nBatch planning, {queries} astar queries on {grid_size}x{grid_size}")
+    print(f"{'processes':>10} {'time':>12} {'queries/s':>10} {'speedup':>8}")
+    occupied = create_obstacle_array(grid_size, coverage, seed=0, batch=True)
+    free = [(x, y) for y, x in zip(*(~occupied).nonzero())]
+    rng = random.Random(0)
+    pairs = [(rng.choice(free), rng.choice(free)) for _ in range(queries)]
+
+    serial_time = None
+    processes = 1
+    while processes <= (os.cpu_count() or 1):
+        batch_time, _ = time_call(
+            plan_batch, occupied, pairs, "astar", 8, processes, repeat=1
+        )
+        serial_time = serial_time or batch_time
+        print(
+            f"{processes:>10} {batch_time * 1000:>10.1f}ms "
+            f"{queries / batch_time:>10.1f} {serial_time / batch_time:>8.2f}"
+        )
+        processes *= 2
+
+
+def benchmark_cost_to_go(grid_sizes=(256, 512, 1024), coverage=20, queries=20):
+    """
+    Repeated queries to one goal: astar per query against a cost-to-go field
+    built on the first query and walked down on the rest.
+    """
+    print(f"\nCost-to-go fields vs A*, {queries} starts to one goal (8-connected)")
+    print(
+        f"{'size':>6} {'astar/query':>12} {'first':>12} {'cached/query':>13} "
+        f"{'hits':>6} {'misses':>6}"
+    )
+    for grid_size in grid_sizes:
+        occupied = create_obstacle_array(grid_size, coverage, seed=0, batch=True)
+        graph = GridGraph(occupied, connectivity=8)
+        goal = (grid_size - 1, grid_size - 1)
+        graph.set_occupied([goal], False)
+        graph.components
+
+        free = [(x, y) for y, x in zip(*(~graph.occupied).nonzero())]
+        rng = random.Random(0)
+        starts = [rng.choice(free) for _ in range(queries)]
+
+        cache = CostToGoCache()
+        first_time, _ = time_call(cache.plan, graph, starts[0], goal, repeat=1)
+        tic = time.perf_counter()
+        for start in starts:
+            _, cost, _ = cache.plan(graph, start, goal)
+        cached_time = (time.perf_counter() - tic) / queries
+
+        tic = time.perf_counter()
+        for start in starts:
+            _, astar_cost, _ = astar(graph, start, goal)
+        astar_time = (time.perf_counter() - tic) / queries
+        assert abs(cost - astar_cost) < 1e-6, "descent returned a suboptimal path"
+
+        print(
+            f"{grid_size:>6} {astar_time * 1000:>10.1f}ms {first_time * 1000:>10.1f}ms "
+            f"{cached_time * 1000:>11.1f}ms {cache.hits:>6} {cache.misses:>6}"
+        )
+
+
+def benchmark_landmarks(grid_sizes=(128, 256, 512), coverage=35, queries=20):
+    """
+    astar with the octile heuristic against the ALT heuristic of
+    LandmarkHeuristic on cluttered courses, over the same random queries.
+    """
+    print(f"\nALT vs octile A*, {queries} random queries at {coverage}% (8-connected)")
+    print(
+        f"{'size':>6} {'tables':>10} {'octile exp':>11} {'ALT exp':>9} "
+        f"{'octile':>10} {'ALT':>10}"
+    )
+    for grid_size in grid_sizes:
+        occupied = create_obstacle_array(grid_size, coverage, seed=0, batch=True)
+        graph = GridGraph(occupied, connectivity=8)
+        build_time, landmarks = time_call(LandmarkHeuristic.build, graph, repeat=1)
+
+        free = [(x, y) for y, x in zip(*(~graph.occupied).nonzero())]
+        rng = random.Random(0)
+        pairs = [(rng.choice(free), rng.choice(free)) for _ in range(queries)]
+
+        times, expanded = [0, 0], [0, 0]
+        for start, goal in pairs:
+            costs = []
+            for index, heuristic in enumerate((None, landmarks)):
+                tic = time.perf_counter()
+                _, cost, stats = astar(graph, start, goal, heuristic=heuristic)
+                times[index] += time.perf_counter() - tic
+                expanded[index] += stats.expanded
+                costs.append(cost)
+            assert costs[0] == costs[1] or abs(costs[0] - costs[1]) < 1e-6
+
+        print(
+            f"{grid_size:>6} {build_time:>9.2f}s {expanded[0]:>11} {expanded[1]:>9} "
+            f"{times[0] * 1000:>8.0f}ms {times[1] * 1000:>8.0f}ms"
+        )
+
+
+def benchmark_anytime(grid_sizes=(256, 512, 1024), coverage=20):
+    """
+    When ara_star reports each solution on a corner-to-corner query, against
+    the time astar takes to return the optimal one.
+    """
+    print(f"\nARA* solutions over time vs A*, {coverage}% coverage (8-connected)")
+    for grid_size in grid_sizes:
+        grid = create_obstacle_grid(grid_size, coverage)
+        graph = GridGraph.from_image(grid, connectivity=8)
+        start, goal = choose_start_and_end_loc(grid, graph)
+        graph.components
+
+        astar_time, (_, optimal, _) = time_call(astar, graph, start, goal, repeat=1)
+        solutions = []
+        tic = time.perf_counter()
+        for _, cost, bound, _ in ara_star(graph, start, goal):
+            solutions.append(
+                f"{(time.perf_counter() - tic) * 1000:.0f}ms "
+                f"{cost / optimal:.3f}x (<= {bound:.3f})"
+            )
+        print(
+            f"{grid_size:>6} astar {astar_time * 1000:.0f}ms, ARA*: "
+            + ", ".join(solutions)
+        )
+
+
+def benchmark_bidirectional(grid_sizes=(128, 256, 512), coverages=(0, 30)):
+    """
+    bfs, dijkstra and astar against their bidirectional variants on the
+    corner-to-corner queries of choose_start_and_end_loc, on open and
+    cluttered courses.
+    """
+    pairs = (
+        ("bfs", bfs, bidirectional_bfs),
+        ("dijkstra", dijkstra, bidirectional_dijkstra),
+        ("astar", astar, bidirectional_astar),
+    )
+    print("\nBidirectional vs one-way search, corner to corner (8-connected)")
+    print(
+        f"{'size':>6} {'cov':>4} {'planner':>9} {'expanded':>10} {'bidir.':>10} "
+        f"{'time':>10} {'bidir.':>10}"
+    )
+    for grid_size in grid_sizes:
+        for coverage in coverages:
+            grid = create_obstacle_grid(grid_size, coverage)
+            graph = GridGraph.from_image(grid, connectivity=8)
+            start, end = choose_start_and_end_loc(grid, graph)
+            graph.components
+
+            for name, one_way, both_ways in pairs:
+                one_way_time, result = time_call(one_way, graph, start, end, repeat=1)
+                both_ways_time, both_result = time_call(
+                    both_ways, graph, start, end, repeat=1
+                )
+                stats, both_stats = result[-1], both_result[-1]
+                assert abs(stats.path_cost - both_stats.path_cost) < 1e-6 or (
+                    name == "bfs"  # Fewest steps, whose costs can differ
+                ), "bidirectional search returned a costlier path"
+                print(
+                    f"{grid_size:>6} {coverage:>3}% {name:>9} {stats.expanded:>10} "
+                    f"{both_stats.expanded:>10} {one_way_time * 1000:>8.0f}ms "
+                    f"{both_ways_time * 1000:>8.0f}ms"
+                )
+
+
+def benchmark_cspace(grid_sizes=(512, 1024, 2048), radii=(1, 3, 8), coverage=2):
+    """
+    Building configuration spaces for disc robots, and looking them up again
+    in a CSpaceCache, against one astar query over the result. The courses
+    are read-only, as in a ScenarioStore, so lookups don't hash them again.
+    """
+    print(f"\nConfiguration spaces for disc robots, {coverage}% coverage")
+    print(f"{'size':>6} {'radius':>7} {'dilate':>10} {'cached':>10} {'astar':>10}")
+    for grid_size in grid_sizes:
+        occupied = create_obstacle_array(grid_size, coverage, seed=0, batch=True)
+        occupied.flags.writeable = False
+        for radius in radii:
+            cache = CSpaceCache()
+            footprint = disc_footprint(radius)
+            dilate_time, graph = time_call(
+                cache.graph, occupied, footprint, 8, repeat=1
+            )
+            cached_time, _ = time_call(cache.graph, occupied, footprint, 8)
+
+            free = [(x, y) for y, x in zip(*(~graph.occupied).nonzero())]
+            rng = random.Random(0)
+            astar_time, _ = time_call(
+                astar, graph, rng.choice(free), rng.choice(free), repeat=1
+            )
+            print(
+                f"{grid_size:>6} {radius:>7} {dilate_time * 1000:>8.1f}ms "
+                f"{cached_time * 1000:>8.1f}ms {astar_time * 1000:>8.0f}ms"
+            )
+
+
+def benchmark_sampling(grid_sizes=(1024, 4096), coverage=1, queries=3):
+    """
+    rrt and rrt_connect against astar from the top to the bottom of large, sparse
+    maps, where the sampling planners' work doesn't grow with the area.
+    """
+    print(f"\nSampling planners, {coverage}% coverage, {queries} queries")
+    print(f"{'size':>6} {'planner':>12} {'time':>10} {'solved':>7} {'length':>8}")
+    for grid_size in grid_sizes:
+        occupied = create_obstacle_array(grid_size, coverage, seed=0, batch=True)
+        graph = GridGraph(occupied, 8)
+        free = [(x, y) for y, x in zip(*(~graph.occupied).nonzero())]
+        rng = random.Random(0)
+        pairs = [
+            (rng.choice(free[: len(free) // 16]), rng.choice(free[-len(free) // 16 :]))
+            for _ in range(queries)
+        ]
+
+        for name, search in (
+            ("astar", astar),
+            ("rrt", rrt),
+            ("rrt_connect", rrt_connect),
+        ):
+            options = {} if name == "astar" else {"seed": 0}
+            start_time = time.perf_counter()
+            results = [search(graph, start, goal, **options) for start, goal in pairs]
+            elapsed = (time.perf_counter() - start_time) / queries
+            costs = [cost for _, cost, _ in results if cost < inf]
+            length = sum(costs) / len(costs) if costs else inf
+            print(
+                f"{grid_size:>6} {name:>12} {elapsed * 1000:>8.1f}ms "
+                f"{len(costs):>7} {length:>8.0f}"
+            )
+
+
+def benchmark_service(grid_size: int = 256, coverage: int = 20, queries: int = 400):
+    """
+    astar queries submitted all at once to a PlanningService, against the
+    same queries one after the other in this process, with the service's own
+    latency and batching counters.
+    """
+    occupied = create_obstacle_array(grid_size, coverage, seed=0, batch=True)
+    graph = GridGraph(occupied)
+    free = [(x, y) for y, x in zip(*(~graph.occupied).nonzero())]
+    rng = random.Random(0)
+    pairs = [(rng.choice(free), rng.choice(free)) for _ in range(queries)]
+
+    start_time = time.perf_counter()
+    for start, goal in pairs:
+        astar(graph, start, goal)
+    sequential_time = time.perf_counter() - start_time
+
+    async def run() -> Tuple[float, dict]:
+        service = PlanningService()
+        try:
+            service.load("course", occupied)
+            start_time = time.perf_counter()
+            await asyncio.gather(
+                *(service.plan("course", start, goal) for start, goal in pairs)
+            )
+            return time.perf_counter() - start_time, service.stats()
+        finally:
+            service.close()
+
+    service_time, stats = asyncio.run(run())
+    print(f"\nPlanning service, {queries} astar queries, {grid_size}x{grid_size}")
+    print(f"  sequential {sequential_time:.2f}s, service {service_time:.2f}s")
+    print(
+        f"  {stats['processes']} processes, {stats['batches']} batches of "
+        f"{stats['mean_batch']:.1f}, latency p50 {stats['latency_p50'] * 1000:.0f}ms "
+        f"p99 {stats['latency_p99'] * 1000:.0f}ms"
+    )
+
+
+def benchmark_imports():
+    """
+    Import times of the headless planning modules, which every worker process
+    pays, against those of the visualisation layer.
+    """
+    print("\nImport times in a fresh interpreter")
+    measure_imports(IMPORT_MODULES + ("path_planner", "rendering"))
+
+
+if __name__ == "__main__":
+    benchmark_dijkstra()
+    benchmark_bfs()
+    benchmark_jps()
+    benchmark_hierarchical()
+    benchmark_batch()
+    benchmark_cost_to_go()
+    benchmark_landmarks()
+    benchmark_anytime()
+    benchmark_bidirectional()
+    benchmark_cspace()
+    benchmark_sampling()
+    benchmark_service()
+    benchmark_imports()
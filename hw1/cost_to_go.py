@@ -0,0 +1,135 @@
+import weakref
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from numpy import inf
+
+from grid import GridGraph, grid_fingerprint
+from hierarchical import region_distances
+from search_stats import SearchStats
+
+
+def cost_to_go_field(graph: GridGraph, goal: Tuple) -> np.ndarray:
+    """
+    Optimal cost from every cell to goal, as a float32 array indexed as [y, x]
+    with inf for obstacles and cells that can't reach it. The grid is
+    undirected, so this is a single search outwards from the goal, run with
+    the sweeps of region_distances over the whole grid as one block.
+    """
+    if not graph.is_free(goal):
+        return np.full(graph.occupied.shape, inf, dtype=np.float32)
+    distances = region_distances(graph.occupied[None], [[goal]], graph.connectivity)
+    return distances[0, 0].astype(np.float32)
+
+
+def descend(graph: GridGraph, field: np.ndarray, start: Tuple) -> List:
+    """
+    Path from start to the goal of a cost-to-go field, stepping each time to
+    the neighbour with the smallest step cost plus cost-to-go. That always
+    lowers the cost-to-go, so this takes O(path length). Empty if start can't
+    reach the goal.
+    """
+    if not graph.is_free(start) or field[start[1], start[0]] == inf:
+        return []
+
+    path = [start]
+    node, remaining = start, field[start[1], start[0]]
+    while remaining > 0:
+        neighbours = graph[node]
+        steps = (
+            neighbours.items()
+            if isinstance(neighbours, dict)
+            else ((neighbour, 1) for neighbour in neighbours)
+        )
+        node = min(steps, key=lambda step: step[1] + field[step[0][1], step[0][0]])[0]
+        remaining = field[node[1], node[0]]
+        path.append(node)
+    return path
+
+
+class CostToGoCache:
+    """
+    Least recently used cache of cost-to-go fields, keyed by (grid
+    fingerprint, goal, connectivity). The first query to a goal builds its
+    field, O(area); later queries to the same goal on the same grid only walk
+    down the field, O(path length). Fields are 4 bytes per cell and the cache
+    drops the least recently used ones to stay within max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._fields = OrderedDict()
+        # GridGraph -> (version, fingerprint), so grids are only hashed again
+        # after their cells change
+        self._fingerprints = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def fingerprint(self, graph: GridGraph) -> str:
+        version, fingerprint = self._fingerprints.get(graph, (None, None))
+        if version != graph.version:
+            fingerprint = grid_fingerprint(graph.occupied)
+            self._fingerprints[graph] = graph.version, fingerprint
+        return fingerprint
+
+    def field(self, graph: GridGraph, goal: Tuple) -> np.ndarray:
+        """
+        Cost-to-go field for goal, from the cache if present. The array is
+        shared with the cache and therefore read-only.
+        """
+        key = (self.fingerprint(graph), goal, graph.connectivity)
+        field = self._fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self._fields.move_to_end(key)
+            return field
+
+        self.misses += 1
+        field = cost_to_go_field(graph, goal)
+        field.flags.writeable = False
+        if field.nbytes <= self.max_bytes:
+            self._fields[key] = field
+            self.nbytes += field.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._fields.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return field
+
+    def plan(
+        self,
+        graph: GridGraph,
+        start: Tuple,
+        goal: Tuple,
+        on_path: Optional[Callable] = None,
+    ) -> Tuple[List, float, SearchStats]:
+        """
+        Returns (path, cost, stats) like astar. The field is built by sweeps
+        rather than node by node, so there is no open list and no on_expand or
+        on_generate: stats.expanded is the number of cells the field reached
+        when this query had to build it, and 0 when it came from the cache.
+        """
+        stats = SearchStats().start()
+        misses = self.misses
+        field = self.field(graph, goal)
+        if self.misses > misses:
+            stats.expanded = int(np.count_nonzero(field < inf))
+
+        path = descend(graph, field, start)
+        if not path:
+            return [], inf, stats.finish()
+        if on_path is not None:
+            on_path(path)
+        cost = sum(graph.cost(a, b) for a, b in zip(path, path[1:]))
+        return path, cost, stats.finish(cost)
+
+    def clear(self) -> None:
+        self._fields.clear()
+        self.nbytes = 0
@@ -0,0 +1,223 @@
+import hashlib
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from grid import GridGraph, grid_fingerprint
+
+
+def disc_footprint(radius: float) -> np.ndarray:
+    """
+    Boolean mask of the cells within radius of the centre cell, a square of
+    side 2 * floor(radius) + 1 indexed as [y, x].
+    """
+    if radius < 0:
+        raise ValueError(f"radius must be at least 0, got {radius}")
+    reach = int(radius)
+    offsets = np.arange(-reach, reach + 1)
+    return offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius**2
+
+
+def footprint_runs(footprint: np.ndarray) -> Dict[Tuple[int, int], list]:
+    """
+    The footprint's cells as horizontal runs, {(first dx, last dx): [dy, ...]},
+    with offsets relative to its centre cell (shape // 2).
+    """
+    footprint = np.asarray(footprint, dtype=bool)
+    if footprint.ndim != 2 or not footprint.any():
+        raise ValueError("A footprint is a 2D boolean mask with at least one cell")
+    centre_y, centre_x = footprint.shape[0] // 2, footprint.shape[1] // 2
+
+    runs = {}
+    for row, cells in enumerate(footprint):
+        # Run boundaries are where the row switches between off and on
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], cells.view(np.int8), [0]))))
+        for first, end in zip(edges[::2], edges[1::2]):
+            key = int(first) - centre_x, int(end) - 1 - centre_x
+            runs.setdefault(key, []).append(row - centre_y)
+    return runs
+
+
+def dilate(
+    occupied: np.ndarray, footprint: np.ndarray, border_blocked: bool = True
+) -> np.ndarray:
+    """
+    Configuration space of a robot with the given footprint: True wherever the
+    footprint, centred on the cell, overlaps an obstacle, or with
+    border_blocked sticks out of the grid. Planning for the footprint's
+    centre over the result is planning for the whole robot, with the same
+    per-expansion cost as for a point.
+
+    Works through the footprint's horizontal runs: each run length needs one
+    sliding-window count along the rows, from a running sum, and each run
+    then ORs in a vertically shifted slice of it. That is O(runs * area) in
+    bulk NumPy operations, 2 * radius + 1 runs for a disc.
+    """
+    occupied = np.asarray(occupied, dtype=bool)
+    runs = footprint_runs(footprint)
+    reach_x = max(max(-first, last) for first, last in runs)
+    reach_y = max(abs(dy) for rows in runs.values() for dy in rows)
+    reach_x, reach_y = max(reach_x, 0), max(reach_y, 0)
+
+    height, width = occupied.shape
+    padded = np.pad(
+        occupied,
+        ((reach_y, reach_y), (reach_x, reach_x)),
+        constant_values=border_blocked,
+    )
+    # sums[:, j] counts the obstacles left of padded column j
+    sums = np.zeros((padded.shape[0], padded.shape[1] + 1), dtype=np.int32)
+    np.cumsum(padded, axis=1, out=sums[:, 1:])
+
+    blocked = np.zeros((height, width), dtype=bool)
+    for (first, last), rows in runs.items():
+        low, high = reach_x + first, reach_x + last + 1
+        window = sums[:, high : high + width] > sums[:, low : low + width]
+        for dy in rows:
+            blocked |= window[reach_y + dy : reach_y + dy + height]
+    return blocked
+
+
+def _immutable(array: np.ndarray) -> bool:
+    """
+    Whether an array's cells can't change: it is read-only and so is everything
+    it is a view of, as for a .npy file mapped with mmap_mode="r".
+    """
+    while isinstance(array, np.ndarray):
+        if array.flags.writeable:
+            return False
+        array = array.base
+    if array is None:
+        return True
+    try:
+        return memoryview(array).readonly
+    except TypeError:
+        return False
+
+
+class CSpaceCache:
+    """
+    Least recently used cache of configuration spaces, keyed by the grid's
+    fingerprint and the footprint, holding the dilated occupancy and the
+    GridGraphs built over it. Repeated queries for the same robot on the same
+    grid reuse both, component labels included, and drop the least recently
+    used spaces to stay within max_bytes of occupancy.
+
+    The cached arrays are read-only, so graphs over them can't be edited;
+    dilate the changed grid again instead. Looking a grid up hashes all of it
+    unless nothing can write to the array, like Scenario.occupied, whose
+    fingerprint is then remembered, or the caller passes the grid_fingerprint
+    it has.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._spaces = OrderedDict()  # key -> (occupancy, {connectivity: graph})
+        # id of an immutable occupancy array -> (weak reference, fingerprint)
+        self._fingerprints = {}
+
+    def __len__(self) -> int:
+        return len(self._spaces)
+
+    @staticmethod
+    def key(
+        occupied: np.ndarray,
+        footprint: np.ndarray,
+        border_blocked: bool,
+        fingerprint: Optional[str] = None,
+    ) -> Tuple:
+        footprint = np.ascontiguousarray(footprint, dtype=bool)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(footprint.shape).encode())
+        digest.update(footprint.tobytes())
+        if fingerprint is None:
+            fingerprint = grid_fingerprint(occupied)
+        return fingerprint, digest.hexdigest(), border_blocked
+
+    def fingerprint(self, occupied: np.ndarray) -> str:
+        """
+        grid_fingerprint(occupied), remembered for as long as the array lives if
+        neither it nor any array or buffer it views is writable, since its cells
+        can't change then. A read-only view of a writable array is hashed again.
+        """
+        if not _immutable(occupied):
+            return grid_fingerprint(occupied)
+
+        array_id = id(occupied)
+        reference, fingerprint = self._fingerprints.get(array_id, (None, None))
+        if reference is None or reference() is not occupied:
+            fingerprint = grid_fingerprint(occupied)
+            reference = weakref.ref(
+                occupied, lambda _: self._fingerprints.pop(array_id, None)
+            )
+            self._fingerprints[array_id] = reference, fingerprint
+        return fingerprint
+
+    def occupancy(
+        self,
+        occupied: np.ndarray,
+        footprint: np.ndarray,
+        border_blocked: bool = True,
+        fingerprint: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        dilate(occupied, footprint, border_blocked), from the cache if present.
+        fingerprint is the grid_fingerprint of occupied, if already known.
+        """
+        return self._entry(occupied, footprint, border_blocked, fingerprint)[0]
+
+    def graph(
+        self,
+        occupied: np.ndarray,
+        footprint: np.ndarray,
+        connectivity: int = 4,
+        border_blocked: bool = True,
+        fingerprint: Optional[str] = None,
+    ) -> GridGraph:
+        """
+        GridGraph over the configuration space, for any of the planners in
+        graph_searches to plan the footprint's centre with.
+        """
+        space, graphs = self._entry(occupied, footprint, border_blocked, fingerprint)
+        if connectivity not in graphs:
+            graphs[connectivity] = GridGraph(space, connectivity)
+        return graphs[connectivity]
+
+    def _entry(
+        self,
+        occupied: np.ndarray,
+        footprint: np.ndarray,
+        border_blocked: bool,
+        fingerprint: Optional[str],
+    ) -> Tuple[np.ndarray, Dict]:
+        if fingerprint is None:
+            fingerprint = self.fingerprint(occupied)
+        key = self.key(occupied, footprint, border_blocked, fingerprint)
+        entry = self._spaces.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._spaces.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        space = dilate(occupied, footprint, border_blocked)
+        space.flags.writeable = False
+        entry = space, {}
+        if space.nbytes <= self.max_bytes:
+            self._spaces[key] = entry
+            self.nbytes += space.nbytes
+            while self.nbytes > self.max_bytes:
+                _, (evicted, _) = self._spaces.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        self._spaces.clear()
+        self.nbytes = 0
@@ -1,35 +1,125 @@
-import math
 import random
 from collections import deque
-from queue import Queue, PriorityQueue
-from typing import Dict, List, Tuple
+from heapq import heappop, heappush
+from math import inf
+from queue import Queue
+from typing import Callable, Dict, List, Optional, Tuple
 
-from numpy import inf
+import numpy as np
 
-from utils import get_unvisited_children
+from grid import SQRT2, GridGraph
+from heuristics import manhattan, octile
+from search_stats import SearchStats, path_cost
+from utils import get_unvisited_children, reconstruct_path
+from workspace import SearchWorkspace
 
 
-def bfs(graph: Dict, start: Tuple, end: Tuple):
+def is_unreachable(graph: Dict, start: Tuple, end: Tuple) -> bool:
+    """
+    O(1) check against the connected-component labels of a GridGraph, so
+    searches for a walled-off end can return before exploring anything. Ends
+    inside obstacles are unreachable, even from themselves and without labels.
+    Adjacency dicts carry no such index and are always searched.
+    """
+    return isinstance(graph, GridGraph) and not (
+        graph.is_free(start) and graph.is_free(end) and graph.reachable(start, end)
+    )
+
+
+def legacy_path(parent: Dict, end: Tuple) -> List:
+    """
+    Path in the form bfs and dfs have always returned: the nodes strictly
+    between start and end, listed from end back to start. Empty if end wasn't
+    reached.
+    """
+    if end not in parent:
+        return []
+    return reconstruct_path(parent, end)[-2:0:-1]
+
+
+def grid_steps(graph: GridGraph) -> List[Tuple[int, int, int, float]]:
+    """
+    (dx, dy, cell id offset, cost) of each move on a GridGraph, in the order
+    graph[node] lists neighbours, with the cell ids of SearchWorkspace.
+    """
+    return [
+        (dx, dy, dx * graph.height + dy, SQRT2 if dx and dy else 1)
+        for dx, dy in graph.moves
+    ]
+
+
+def workspace_path(workspace: SearchWorkspace, height: int, end: int) -> List:
+    """
+    Path from the root of the workspace's parent links to the end cell id,
+    inclusive, as (x, y) nodes.
+    """
+    path = []
+    while end >= 0:
+        path.append(divmod(end, height))
+        end = workspace.parent[end]
+    return path[::-1]
+
+
+def finish_path(
+    stats: SearchStats, graph: Dict, path: List, on_path: Optional[Callable]
+) -> SearchStats:
+    """
+    Records the cost of a path from start to end inclusive, reports it to
+    on_path if one is set and stops the stats' clock.
+    """
+    if path and on_path is not None:
+        on_path(path)
+    return stats.finish(path_cost(graph, path))
+
+
+def bfs(
+    graph: Dict,
+    start: Tuple,
+    end: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+):
     """
     Traverses the graph using BFS logic.
+
+    Returns (level, path, visited, stats) with a SearchStats record last.
+    Like every planner here, it calls on_expand(node) for each node it
+    expands, on_generate(node) for each node it adds to the open list and
+    on_path(path) with the path from start to end inclusive once end is
+    reached. Callbacks that aren't set cost nothing.
     """
+    stats = SearchStats().start()
     tracking_queue = Queue()
     traversed_path = []
-    visited = {key: False for key in graph.keys()}
-    parent = {key: None for key in graph.keys()}
-    level = {key: -1 for key in graph.keys()}
+    # Bookkeeping only holds the nodes the search reaches, so no per-node setup
+    # is needed and graph can be a GridGraph that has no keys stored up front.
+    visited = {start: True}
+    parent = {start: None}
+    level = {start: 0}
+
+    if is_unreachable(graph, start, end):
+        return level, [], visited, stats.finish()
 
-    visited[start] = True
-    level[start] = 0
     tracking_queue.put(start)
+    stats.generated += 1
 
     while not tracking_queue.empty():
+        stats.peak_open = max(stats.peak_open, stats.generated - stats.expanded)
         current_node = tracking_queue.get()
         traversed_path.append(current_node)
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(current_node)
+
         for child in graph[current_node]:
-            if visited[child]:  # Ignore already visited nodes
+            if child in visited:  # Ignore already visited nodes
                 continue
 
+            stats.generated += 1
+            if on_generate is not None:
+                on_generate(child)
+
             if child == end:  # If goal reached, terminate traversal
                 visited[child] = True
                 parent[child] = current_node
@@ -43,199 +133,989 @@ def bfs(graph: Dict, start: Tuple, end: Tuple):
             level[child] = level[current_node] + 1
             tracking_queue.put(child)
 
+    path = reconstruct_path(parent, end) if end in parent else []
+    stats = finish_path(stats, graph, path, on_path)
+    return level, legacy_path(parent, end), visited, stats
+
+
+def frontier_bfs(
+    graph: GridGraph,
+    start: Tuple,
+    end: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+):
+    """
+    Level-synchronous BFS over a GridGraph: each iteration expands the whole
+    current frontier with NumPy, one shifted lookup per move, instead of
+    dequeuing one node at a time.
+
+    Returns (level, path, visited, stats) like bfs, except that level and
+    visited are arrays indexed as [y, x]: level holds each reached cell's BFS
+    level and -1 elsewhere, and visited is level >= 0. The search stops after
+    the level that reaches end, which is included whole. path has bfs's form
+    (the nodes strictly between start and end, from end back to start); where
+    several shortest paths exist it may pick a different one than bfs.
+    Callbacks, if set, are called node by node for each frontier.
+    """
+    stats = SearchStats().start()
+    width, height = graph.width, graph.height
+    if not graph.is_free(start):
+        level = np.full((height, width), -1, dtype=np.int32)
+        return level, [], level >= 0, stats.finish()
+    padded_width = width + 2
+
+    # Flat grid with a border of obstacles, so shifted indexes never wrap
+    free = np.zeros((height + 2, padded_width), dtype=bool)
+    free[1:-1, 1:-1] = ~graph.occupied
+    free = free.reshape(-1)
+    level = np.full(free.size, -1, dtype=np.int32)
+    direction = np.full(free.size, -1, dtype=np.int8)  # Move that reached it
+    offsets = [dy * padded_width + dx for dx, dy in graph.moves]
+
+    def index(node: Tuple) -> int:
+        return (node[1] + 1) * padded_width + node[0] + 1
+
+    def node(index: int) -> Tuple:
+        y, x = divmod(int(index), padded_width)
+        return x - 1, y - 1
+
+    start_index, end_index = index(start), index(end)
+    level[start_index] = 0
+    frontier = np.array([start_index])
+    stats.generated = 1
+
+    if not is_unreachable(graph, start, end):
+        depth = 0
+        while frontier.size and level[end_index] < 0:
+            depth += 1
+            stats.expanded += int(frontier.size)
+            stats.peak_open = max(stats.peak_open, int(frontier.size))
+            if on_expand is not None:
+                for cell in frontier:
+                    on_expand(node(cell))
+
+            reached = []
+            for move, offset in enumerate(offsets):
+                children = frontier + offset
+                children = children[free[children] & (level[children] < 0)]
+                level[children] = depth
+                direction[children] = move
+                reached.append(children)
+            frontier = np.concatenate(reached)
+            stats.generated += int(frontier.size)
+            if on_generate is not None:
+                for cell in frontier:
+                    on_generate(node(cell))
+
+    # Follow the parent directions back from end
     path = []
-    current = end
-    while current != start:
-        next = parent[current]
-        path.append(next)
-        current = next
-    path.pop()
+    if level[end_index] >= 0:
+        cell = end_index
+        path.append(end)
+        while cell != start_index:
+            cell -= offsets[direction[cell]]
+            path.append(node(cell))
+        path.reverse()
+    stats = finish_path(stats, graph, path, on_path)
 
-    return level, path, visited
+    level = level.reshape(height + 2, padded_width)[1:-1, 1:-1]
+    return level, path[-2:0:-1], level >= 0, stats
 
 
-def dfs(graph: Dict, start: Tuple, end: Tuple) -> Tuple[List, List]:
+def dfs(
+    graph: Dict,
+    start: Tuple,
+    end: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, List, SearchStats]:
     """
     Traverses the graph using DFS logic.
+
+    Returns (traversed, path, stats). Each node is expanded as soon as it is
+    generated, so both callbacks see the traversal order.
     """
+    stats = SearchStats().start()
     stack = deque()
     traversed_path = []
-    visited = {key: False for key in graph.keys()}
-    parent = {key: None for key in graph.keys()}
+    visited = {start: True}
+    parent = {start: None}
+
+    def visit(node: Tuple) -> None:
+        traversed_path.append(node)
+        stats.generated += 1
+        stats.expanded += 1
+        if on_generate is not None:
+            on_generate(node)
+        if on_expand is not None:
+            on_expand(node)
 
     current_node = start
-    visited[current_node] = True
-    traversed_path.append(current_node)
+    visit(current_node)
+    if is_unreachable(graph, start, end):
+        return traversed_path, [], stats.finish()
     stack.append(current_node)
 
     while len(stack):
+        stats.peak_open = max(stats.peak_open, len(stack))
         children = get_unvisited_children(current_node, graph, visited)
         if not children:
             current_node = stack.pop()
 
         for child in children:
-            if visited[child]:
+            if child in visited:
                 continue
 
             if child == end:  # If goal reached, terminate traversal
                 visited[child] = True
                 parent[child] = current_node
-                traversed_path.append(child)
+                visit(child)
                 stack.clear()
                 break
 
             visited[child] = True
             parent[child] = current_node
-            traversed_path.append(child)
+            visit(child)
             stack.append(current_node)
             current_node = child
             break
 
-    final_path = []
-    current = end
-    while current != start:
-        next = parent[current]
-        final_path.append(next)
-        current = next
-    final_path.pop()
-
-    return traversed_path, final_path
+    path = reconstruct_path(parent, end) if end in parent else []
+    stats = finish_path(stats, graph, path, on_path)
+    return traversed_path, legacy_path(parent, end), stats
 
 
-def random_planner(graph: Dict, start: Tuple, end: Tuple) -> List:
+def random_planner(
+    graph: Dict,
+    start: Tuple,
+    end: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, SearchStats]:
     """
-    Random planner that simply moves to a random neighboring cell
-    at each iteration.
+    Random planner that simply moves to a random unvisited neighbouring cell
+    at each iteration, backing up when there is none. For a sampling-based
+    planner that scales to large maps see rrt and rrt_connect in sampling.
+
+    Returns (traversed, stats). The walk itself is the path, so on_path and
+    the path cost only apply when it ends at end.
     """
+    stats = SearchStats().start()
     traversed_path = []
-    visited = {key: False for key in graph.keys()}
-    parent = {key: None for key in graph.keys()}
+    visited = {start: True}
+    parent = {start: None}
+
+    def visit(node: Tuple) -> None:
+        traversed_path.append(node)
+        stats.generated += 1
+        stats.expanded += 1
+        if on_generate is not None:
+            on_generate(node)
+        if on_expand is not None:
+            on_expand(node)
 
     current_node = start
-    visited[current_node] = True
-    traversed_path.append(current_node)
+    visit(current_node)
+    if is_unreachable(graph, start, end):
+        return traversed_path, stats.finish()
 
     index, max_iterations = 0, 1000
     while current_node != end:
         children = get_unvisited_children(current_node, graph, visited)
         if not children:  # If there's nowhere to go, take a step back
+            if parent.get(current_node) is None:  # Nowhere left to back up to
+                break
             current_node = parent[current_node]
             continue
 
-        child = random.choice(graph[current_node])
-        if visited[child]:
-            continue
-
+        child = random.choice(children)
         if child == end:  # If goal reached, terminate traversal
             visited[child] = True
-            traversed_path.append(child)
+            visit(child)
             parent[child] = current_node
             break
 
         visited[child] = True
-        traversed_path.append(child)
+        visit(child)
         current_node = child
 
         index += 1
-        print(index)
         if index > max_iterations:
             break
 
-    return traversed_path
+    reached = traversed_path[-1] == end
+    stats = finish_path(stats, graph, traversed_path if reached else [], on_path)
+    return traversed_path, stats
 
 
-def dijkstra(graph: Dict, start: Tuple, end: Tuple):
+def dijkstra(
+    graph: Dict,
+    start: Tuple,
+    end: Optional[Tuple] = None,
+    early_exit: bool = True,
+    *,
+    workspace: Optional[SearchWorkspace] = None,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[Dict, Dict, List, SearchStats]:
     """
-    Traverses the graph using Dijkstra logic.
+    Traverses the graph using Dijkstra logic: a uniform-cost search over a
+    binary heap, using the edge weights when graph[node] is a dict of
+    {neighbour: distance} and unit weights when it is a list.
+
+    Outdated heap entries are skipped when popped (lazy deletion) rather than
+    removed, and settled nodes are never expanded twice. With early_exit the
+    search stops as soon as end is settled; otherwise, or when no end is given,
+    it settles every node reachable from start (the full shortest-path tree).
+
+    Returns (cost, parent, path, stats): cost maps each settled node to its
+    optimal cost from start, in the order the nodes were settled, so cost[end]
+    is the optimal path cost; parent links each reached node to its
+    predecessor; path runs from start to end inclusive and is empty if end
+    wasn't reached.
+
+    With a SearchWorkspace (graph must then be a GridGraph) the search keeps
+    its state in the workspace's arrays instead of dicts, and only builds the
+    returned dicts, over the nodes it reached, at the end.
     """
-    tracking_queue = Queue()
-    traversed_path = []
-    visited = {key: False for key in graph.keys()}
-    parent = {key: None for key in graph.keys()}
-    level = {key: -1 for key in graph.keys()}
+    stats = SearchStats().start()
+    if workspace is not None:
+        return _dijkstra_in_workspace(
+            graph,
+            start,
+            end,
+            early_exit,
+            workspace,
+            stats,
+            on_expand,
+            on_generate,
+            on_path,
+        )
 
-    visited[start] = True
-    level[start] = 0
-    tracking_queue.put(start)
+    frontier = [(0, start)]
+    tentative_cost = {start: 0}
+    parent = {start: None}
+    cost = {}  # Closed set
 
-    while not tracking_queue.empty():
-        current_node = tracking_queue.get()
-        traversed_path.append(current_node)
-        for child in graph[current_node]:
-            if visited[child]:  # Ignore already visited nodes
+    if end is not None and early_exit and is_unreachable(graph, start, end):
+        return {start: 0}, parent, [], stats.finish()
+    stats.generated = 1
+
+    while frontier:
+        stats.peak_open = max(stats.peak_open, len(frontier))
+        node_cost, current_node = heappop(frontier)
+        if current_node in cost:  # Stale entry, the node was settled cheaper
+            continue
+        cost[current_node] = node_cost
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(current_node)
+
+        if current_node == end and early_exit:
+            break
+
+        children = graph[current_node]
+        weighted = isinstance(children, dict)
+        for child in children:
+            if child in cost:
                 continue
 
-            if child == end:  # If goal reached, terminate traversal
-                visited[child] = True
+            child_cost = node_cost + (children[child] if weighted else 1)
+            if child_cost < tentative_cost.get(child, inf):  # Relaxation
+                if child in tentative_cost:
+                    stats.reopened += 1
+                tentative_cost[child] = child_cost
                 parent[child] = current_node
-                level[child] = level[current_node] + 1
-                with tracking_queue.mutex:
-                    tracking_queue.queue.clear()
-                break
+                heappush(frontier, (child_cost, child))
+                stats.generated += 1
+                if on_generate is not None:
+                    on_generate(child)
 
-            visited[child] = True
-            parent[child] = current_node
-            level[child] = level[current_node] + 1
-            tracking_queue.put(child)
+    path = reconstruct_path(parent, end) if end in cost else []
+    if path and on_path is not None:
+        on_path(path)
 
-    path = []
-    current = end
-    while current != start:
-        next = parent[current]
-        path.append(next)
-        current = next
-    path.pop()
+    return cost, parent, path, stats.finish(cost.get(end, inf))
 
-    return level, path, visited
 
+def _dijkstra_in_workspace(
+    graph: GridGraph,
+    start: Tuple,
+    end: Optional[Tuple],
+    early_exit: bool,
+    workspace: SearchWorkspace,
+    stats: SearchStats,
+    on_expand: Optional[Callable],
+    on_generate: Optional[Callable],
+    on_path: Optional[Callable],
+) -> Tuple[Dict, Dict, List, SearchStats]:
+    workspace.check(graph)
+    generation = workspace.reset()
+    reached, closed = 2 * generation, 2 * generation + 1
+    stamp, tentative_cost, parent = workspace.stamp, workspace.cost, workspace.parent
+    width, height, blocked = graph.width, graph.height, graph.blocked
+    steps = grid_steps(graph)
 
-def astar(graph: Dict[Tuple, Dict[Tuple, int]], start: Tuple, goal: Tuple):
+    start_id = start[0] * height + start[1]
+    end_id = -1 if end is None else end[0] * height + end[1]
+    stamp[start_id], tentative_cost[start_id], parent[start_id] = reached, 0, -1
+    if end is not None and early_exit and is_unreachable(graph, start, end):
+        return {start: 0}, {start: None}, [], stats.finish()
 
-    tracker = PriorityQueue()
-    traversed_path = []
+    frontier = [(0, start_id)]
+    touched, settled = [start_id], []
+    stats.generated = 1
+    while frontier:
+        stats.peak_open = max(stats.peak_open, len(frontier))
+        node_cost, node = heappop(frontier)
+        if stamp[node] == closed:  # Stale entry, the node was settled cheaper
+            continue
+        stamp[node] = closed
+        settled.append(node)
+        x, y = divmod(node, height)
+        if on_expand is not None:
+            on_expand((x, y))
+
+        if node == end_id and early_exit:
+            break
+
+        if blocked[y * width + x]:  # Obstacles have no neighbours
+            continue
+        for dx, dy, offset, step in steps:
+            child_x, child_y = x + dx, y + dy
+            if (
+                not (0 <= child_x < width and 0 <= child_y < height)
+                or blocked[child_y * width + child_x]
+            ):
+                continue
+            child = node + offset
+            child_stamp = stamp[child]
+            child_cost = node_cost + step
+            if child_stamp == closed or (
+                child_stamp == reached and child_cost >= tentative_cost[child]
+            ):
+                continue
+            if child_stamp == reached:
+                stats.reopened += 1
+            else:
+                touched.append(child)
+            stamp[child], tentative_cost[child], parent[child] = (
+                reached,
+                child_cost,
+                node,
+            )
+            heappush(frontier, (child_cost, child))
+            stats.generated += 1
+            if on_generate is not None:
+                on_generate((child_x, child_y))
 
-    cost_from_start = {key: inf for key in graph.keys()}
-    cost_to_goal = {key: None for key in graph.keys()}
-    parent = {key: None for key in graph.keys()}  # Helps backtrace the traversed path
-    level = {key: -1 for key in graph.keys()}
+    stats.expanded = len(settled)
+    cost = {divmod(node, height): tentative_cost[node] for node in settled}
+    parents = {
+        divmod(node, height): (
+            divmod(parent[node], height) if parent[node] >= 0 else None
+        )
+        for node in touched
+    }
+    path = workspace_path(workspace, height, end_id) if end in cost else []
+    if path and on_path is not None:
+        on_path(path)
+    return cost, parents, path, stats.finish(cost.get(end, inf))
+
+
+def astar(
+    graph: Dict,
+    start: Tuple,
+    goal: Tuple,
+    heuristic: Optional[Callable] = None,
+    *,
+    workspace: Optional[SearchWorkspace] = None,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, float, SearchStats]:
+    """
+    Traverses the graph using A* logic. graph[node] may be a dict of
+    {neighbour: distance} or a list of neighbours at unit distance.
 
-    cost_from_start[start] = 0
-    level[start] = 0
-    tracker.put((0, start))
+    heuristic(node, goal) estimates the remaining cost; see heuristics for the
+    options. It defaults to manhattan for list neighbours (4-connected) and
+    octile otherwise, both admissible and consistent, so the returned path is
+    optimal. Ties on f are broken in favour of the larger cost from start,
+    i.e. the node closer to the goal, then by node order.
 
-    while not tracker.empty():
-        print("Still running")
-        current_node = tracker.get()[1]
-        traversed_path.append(current_node)  # This node was actually visited
+    on_expand(node) is called for every expanded node, in expansion order,
+    on_generate(node) whenever a node is put on the open list and on_path(path)
+    with the path once the goal is reached.
+
+    Returns (path, cost, stats): the path from start to goal inclusive, its
+    cost, and a SearchStats record. The path is empty and the cost infinite if
+    the goal is unreachable.
+
+    With a SearchWorkspace (graph must then be a GridGraph) the search keeps
+    its state in the workspace's arrays instead of dicts, so back-to-back
+    queries allocate next to nothing. Results are the same either way.
+    """
+    stats = SearchStats().start()
+    if is_unreachable(graph, start, goal):
+        return [], inf, stats.finish()
+    if heuristic is None:
+        heuristic = octile if isinstance(graph[start], dict) else manhattan
+    if workspace is not None:
+        return _astar_in_workspace(
+            graph,
+            start,
+            goal,
+            heuristic,
+            workspace,
+            stats,
+            on_expand,
+            on_generate,
+            on_path,
+        )
+
+    # Entries are (f, -g, node), so equal f pops the deeper node first
+    frontier = [(heuristic(start, goal), 0, start)]
+    cost_from_start = {start: 0}
+    parent = {start: None}  # Helps backtrace the traversed path
+    closed = set()
+    stats.generated = 1
+
+    while frontier:
+        stats.peak_open = max(stats.peak_open, len(frontier))
+        _, negative_cost, current_node = heappop(frontier)
+        if current_node in closed:  # Stale entry, the node was expanded cheaper
+            continue
+        closed.add(current_node)
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(current_node)
 
         if current_node == goal:
-            break
+            path = reconstruct_path(parent, goal)
+            if on_path is not None:
+                on_path(path)
+            return path, -negative_cost, stats.finish(-negative_cost)
 
+        node_cost = -negative_cost
         children = graph[current_node]
-        for child_node in children.keys():
-            # grid.putpixel(child_node, powder_blue)
-            # plt.imshow(grid)
-            # plt.pause(0.001)
-            if child_node in traversed_path:
+        weighted = isinstance(children, dict)
+        for child in children:
+            if child in closed:
                 continue
 
-            if child_node == start:
-                continue
+            child_cost = node_cost + (children[child] if weighted else 1)
+            if child_cost < cost_from_start.get(child, inf):  # Relaxation
+                if child in cost_from_start:
+                    stats.reopened += 1
+                cost_from_start[child] = child_cost
+                parent[child] = current_node
+                heappush(
+                    frontier,
+                    (child_cost + heuristic(child, goal), -child_cost, child),
+                )
+                stats.generated += 1
+                if on_generate is not None:
+                    on_generate(child)
 
-            new_cost_from_start = (
-                cost_from_start[current_node] + graph[current_node][child_node]
-            )
-            if new_cost_from_start < cost_from_start[child_node]:  # Relaxation
-                cost_from_start[child_node] = new_cost_from_start
-                parent[child_node] = current_node
-                print(f"Updating cost {new_cost_from_start} for", child_node)
+    return [], inf, stats.finish()
+
+
+def _astar_in_workspace(
+    graph: GridGraph,
+    start: Tuple,
+    goal: Tuple,
+    heuristic: Callable,
+    workspace: SearchWorkspace,
+    stats: SearchStats,
+    on_expand: Optional[Callable],
+    on_generate: Optional[Callable],
+    on_path: Optional[Callable],
+) -> Tuple[List, float, SearchStats]:
+    workspace.check(graph)
+    generation = workspace.reset()
+    reached, closed = 2 * generation, 2 * generation + 1
+    stamp, cost_from_start, parent = workspace.stamp, workspace.cost, workspace.parent
+    width, height, blocked = graph.width, graph.height, graph.blocked
+    steps = grid_steps(graph)
+
+    start_id, goal_id = start[0] * height + start[1], goal[0] * height + goal[1]
+    stamp[start_id], cost_from_start[start_id], parent[start_id] = reached, 0, -1
+    frontier = [(heuristic(start, goal), 0, start_id)]
+    stats.generated = 1
+
+    while frontier:
+        stats.peak_open = max(stats.peak_open, len(frontier))
+        _, negative_cost, node = heappop(frontier)
+        if stamp[node] == closed:  # Stale entry, the node was expanded cheaper
+            continue
+        stamp[node] = closed
+        stats.expanded += 1
+        x, y = divmod(node, height)
+        if on_expand is not None:
+            on_expand((x, y))
+
+        if node == goal_id:
+            path = workspace_path(workspace, height, goal_id)
+            if on_path is not None:
+                on_path(path)
+            return path, -negative_cost, stats.finish(-negative_cost)
 
-            cost_to_goal[child_node] = cost_from_start[child_node] + 1.5 * math.dist(
-                child_node, goal
+        if blocked[y * width + x]:  # Obstacles have no neighbours
+            continue
+
+        node_cost = -negative_cost
+        for dx, dy, offset, step in steps:
+            child_x, child_y = x + dx, y + dy
+            if (
+                not (0 <= child_x < width and 0 <= child_y < height)
+                or blocked[child_y * width + child_x]
+            ):
+                continue
+            child = node + offset
+            child_stamp = stamp[child]
+            child_cost = node_cost + step
+            if child_stamp == closed or (
+                child_stamp == reached and child_cost >= cost_from_start[child]
+            ):
+                continue
+            if child_stamp == reached:
+                stats.reopened += 1
+            stamp[child], cost_from_start[child], parent[child] = (
+                reached,
+                child_cost,
+                node,
+            )
+            heappush(
+                frontier,
+                (child_cost + heuristic((child_x, child_y), goal), -child_cost, child),
             )
-            tracker.put((cost_to_goal[child_node], child_node))
-            level[child_node] = level[current_node] + 1
+            stats.generated += 1
+            if on_generate is not None:
+                on_generate((child_x, child_y))
+
+    return [], inf, stats.finish()
+
+
+def jps(
+    graph: GridGraph,
+    start: Tuple,
+    goal: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, float, SearchStats]:
+    """
+    Traverses an 8-connected GridGraph using Jump Point Search: A* with the
+    octile heuristic that, instead of adding every neighbour to the open list,
+    scans straight and diagonal lines and only stops at jump points, i.e. the
+    goal or nodes with a forced neighbour that a symmetric path can't reach
+    more cheaply. The pruning rules assume the movement model of GridGraph,
+    where a diagonal step only needs its destination to be free. Straight
+    scans use the grid's precomputed jump stops (JPS+), so they take constant
+    time; diagonal scans still step cell by cell.
+
+    on_expand(node) and on_generate(node) see jump points only.
+
+    Returns (path, cost, stats) like astar, with the path expanded back into
+    individual grid cells from start to goal inclusive.
+    """
+    if graph.connectivity != 8:
+        raise ValueError("Jump point search needs an 8-connected grid")
+    stats = SearchStats().start()
+    # The straight scans take the goal anywhere up to the cell they stop at,
+    # which is the obstacle itself when the goal is blocked
+    if not (graph.is_free(start) and graph.is_free(goal)) or is_unreachable(
+        graph, start, goal
+    ):
+        return [], inf, stats.finish()
+
+    width, height, blocked = graph.width, graph.height, graph.blocked
+    stops = graph.jump_stops
+    goal_x, goal_y = goal
+
+    def free(x: int, y: int) -> bool:
+        return 0 <= x < width and 0 <= y < height and not blocked[y * width + x]
+
+    def jump_straight(x: int, y: int, dx: int, dy: int) -> Optional[Tuple]:
+        """
+        Moves from (x, y) in a straight direction (dx, dy) until reaching a jump
+        point, returned as (x, y, steps), or running into an obstacle. Looks up
+        where the scan stops instead of stepping there.
+        """
+        x, y = x + dx, y + dy
+        if dx:
+            if not 0 <= x < width:
+                return None
+            stop = stops[(dx, 0)][y * width + x]
+            if goal_y == y and min(x, stop) <= goal_x <= max(x, stop):
+                return goal_x, y, abs(goal_x - x) + 1
+            if not 0 <= stop < width or blocked[y * width + stop]:
+                return None
+            return stop, y, abs(stop - x) + 1
+
+        if not 0 <= y < height:
+            return None
+        stop = stops[(0, dy)][y * width + x]
+        if goal_x == x and min(y, stop) <= goal_y <= max(y, stop):
+            return x, goal_y, abs(goal_y - y) + 1
+        if not 0 <= stop < height or blocked[stop * width + x]:
+            return None
+        return x, stop, abs(stop - y) + 1
+
+    def jump(x: int, y: int, dx: int, dy: int) -> Optional[Tuple]:
+        """
+        Moves from (x, y) in direction (dx, dy) until reaching a jump point,
+        returned as (x, y, steps), or running into an obstacle.
+        """
+        if not (dx and dy):
+            return jump_straight(x, y, dx, dy)
+
+        steps = 0
+        while True:
+            x, y = x + dx, y + dy
+            steps += 1
+            if not free(x, y):
+                return None
+            if x == goal_x and y == goal_y:
+                return x, y, steps
+
+            if (not free(x - dx, y) and free(x - dx, y + dy)) or (
+                not free(x, y - dy) and free(x + dx, y - dy)
+            ):
+                return x, y, steps
+            # A diagonal move stops wherever a straight scan finds something
+            if jump_straight(x, y, dx, 0) or jump_straight(x, y, 0, dy):
+                return x, y, steps
+
+    def directions(x: int, y: int, dx: int, dy: int) -> List:
+        """
+        Directions to scan from (x, y) when it was reached moving (dx, dy):
+        its natural neighbours plus any forced ones.
+        """
+        if dx and dy:
+            pruned = [(dx, 0), (0, dy), (dx, dy)]
+            if not free(x - dx, y):
+                pruned.append((-dx, dy))
+            if not free(x, y - dy):
+                pruned.append((dx, -dy))
+        elif dx:
+            pruned = [(dx, 0)]
+            if not free(x, y + 1):
+                pruned.append((dx, 1))
+            if not free(x, y - 1):
+                pruned.append((dx, -1))
+        else:
+            pruned = [(0, dy)]
+            if not free(x + 1, y):
+                pruned.append((1, dy))
+            if not free(x - 1, y):
+                pruned.append((-1, dy))
+        return pruned
+
+    # Entries are (f, -g, node, direction it was reached in)
+    frontier = [(octile(start, goal), 0, start, None)]
+    cost_from_start = {start: 0}
+    parent = {start: None}
+    closed = set()
+    stats.generated = 1
+
+    while frontier:
+        stats.peak_open = max(stats.peak_open, len(frontier))
+        _, negative_cost, current_node, direction = heappop(frontier)
+        if current_node in closed:
+            continue
+        closed.add(current_node)
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(current_node)
+
+        if current_node == goal:
+            path = expand_jump_points(reconstruct_path(parent, goal))
+            if on_path is not None:
+                on_path(path)
+            return path, -negative_cost, stats.finish(-negative_cost)
+
+        node_cost = -negative_cost
+        x, y = current_node
+        scan = graph.moves if direction is None else directions(x, y, *direction)
+        for dx, dy in scan:
+            jump_point = jump(x, y, dx, dy)
+            if jump_point is None:
+                continue
+
+            jx, jy, steps = jump_point
+            child = (jx, jy)
+            if child in closed:
+                continue
+
+            child_cost = node_cost + (steps * SQRT2 if dx and dy else steps)
+            if child_cost < cost_from_start.get(child, inf):
+                if child in cost_from_start:
+                    stats.reopened += 1
+                cost_from_start[child] = child_cost
+                parent[child] = current_node
+                heappush(
+                    frontier,
+                    (child_cost + octile(child, goal), -child_cost, child, (dx, dy)),
+                )
+                stats.generated += 1
+                if on_generate is not None:
+                    on_generate(child)
+
+    return [], inf, stats.finish()
+
+
+def expand_jump_points(jump_points: List) -> List:
+    """
+    Fills in the grid cells between consecutive jump points, which always lie
+    on a common straight or diagonal line.
+    """
+    if not jump_points:
+        return []
+
+    cells = [jump_points[0]]
+    for (x, y), (next_x, next_y) in zip(jump_points, jump_points[1:]):
+        # int() as NumPy booleans, from NumPy coordinates, can't be subtracted
+        dx = int(next_x > x) - int(next_x < x)
+        dy = int(next_y > y) - int(next_y < y)
+        while (x, y) != (next_x, next_y):
+            x, y = x + dx, y + dy
+            cells.append((x, y))
+    return cells
+
+
+def _join_paths(parents: List[Dict], meeting: Tuple) -> List:
+    """
+    Path from start to end inclusive through the (forward node, backward
+    node) edge where a bidirectional search's two trees meet.
+    """
+    forward, backward = meeting
+    return (
+        reconstruct_path(parents[0], forward)
+        + reconstruct_path(parents[1], backward)[::-1]
+    )
+
+
+def bidirectional_bfs(
+    graph: Dict,
+    start: Tuple,
+    end: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+):
+    """
+    BFS from both ends at once on an undirected graph, a whole level at a
+    time from whichever side has the smaller frontier. Once a level reaches
+    the other side's tree, the shortest of the paths through it is the
+    shortest overall, so the search stops after that level. Each side explores
+    about half as deep as bfs does, so on open grids it expands far fewer
+    nodes.
+
+    Returns (level, path, visited, stats) like bfs. visited holds the nodes
+    reached from either end, level the depth from start of the nodes reached
+    from start and of those on the path.
+    """
+    stats = SearchStats().start()
+    levels = [{start: 0}, {end: 0}]
+    parents = [{start: None}, {end: None}]
+    unreachable = is_unreachable(graph, start, end)
+    if unreachable or start == end:
+        path = [] if unreachable else [start]
+        return {start: 0}, [], {start: True}, finish_path(stats, graph, path, on_path)
+
+    frontiers = [[start], [end]]
+    stats.generated = 2
+    best, meeting = inf, None
+    while frontiers[0] and frontiers[1] and meeting is None:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        level, other_level, parent = levels[side], levels[1 - side], parents[side]
+        stats.peak_open = max(stats.peak_open, len(frontiers[0]) + len(frontiers[1]))
+
+        next_frontier = []
+        for current_node in frontiers[side]:
+            stats.expanded += 1
+            if on_expand is not None:
+                on_expand(current_node)
+
+            depth = level[current_node] + 1
+            for child in graph[current_node]:
+                if child in other_level and depth + other_level[child] < best:
+                    best = depth + other_level[child]
+                    meeting = (
+                        (current_node, child) if side == 0 else (child, current_node)
+                    )
+                if child in level:
+                    continue
+                level[child] = depth
+                parent[child] = current_node
+                next_frontier.append(child)
+                stats.generated += 1
+                if on_generate is not None:
+                    on_generate(child)
+        frontiers[side] = next_frontier
+
+    path = _join_paths(parents, meeting) if meeting is not None else []
+    level = levels[0]
+    level.update((node, depth) for depth, node in enumerate(path))
+    visited = dict.fromkeys(levels[0], True)
+    visited.update(dict.fromkeys(levels[1], True))
+    stats = finish_path(stats, graph, path, on_path)
+    return level, path[-2:0:-1], visited, stats
+
+
+def _bidirectional_search(
+    graph: Dict,
+    start: Tuple,
+    end: Tuple,
+    potential: Callable,
+    stats: SearchStats,
+    on_expand: Optional[Callable],
+    on_generate: Optional[Callable],
+) -> Tuple[float, List, Dict, Dict]:
+    """
+    Uniform-cost searches from start and from end on an undirected graph,
+    taking turns by open list size. The forward search keys nodes by cost plus
+    potential(node) and the backward one by cost minus it, which is the same
+    as both running Dijkstra on edge costs reduced by the potential. With a
+    feasible potential, one whose change along an edge never exceeds the
+    edge's cost, the cheapest path seen through an edge joining the two trees
+    is optimal once the two smallest keys add up to at least its cost.
+
+    Returns (cost, path, settled, parent): the optimal cost and path (inf and
+    empty if end is unreachable), the optimal cost from start of each node
+    the forward search settled, in settling order, and the forward search's
+    parent links.
+    """
+    costs = [{start: 0}, {end: 0}]
+    parents = [{start: None}, {end: None}]
+    settled = [{}, {}]
+    frontiers = [[(potential(start), start)], [(-potential(end), end)]]
+    stats.generated = 2
+    best, meeting = inf, None
+
+    while True:
+        for side in (0, 1):  # Drop stale entries so the tops are current
+            frontier = frontiers[side]
+            while frontier and frontier[0][1] in settled[side]:
+                heappop(frontier)
+        if not (frontiers[0] and frontiers[1]):
+            break
+        if frontiers[0][0][0] + frontiers[1][0][0] >= best:
+            break
+
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        sign = 1 if side == 0 else -1
+        cost, other_cost, parent = costs[side], costs[1 - side], parents[side]
+        stats.peak_open = max(stats.peak_open, len(frontiers[0]) + len(frontiers[1]))
+        _, current_node = heappop(frontiers[side])
+        node_cost = settled[side][current_node] = cost[current_node]
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(current_node)
+
+        children = graph[current_node]
+        weighted = isinstance(children, dict)
+        for child in children:
+            child_cost = node_cost + (children[child] if weighted else 1)
+            if child in other_cost and child_cost + other_cost[child] < best:
+                best = child_cost + other_cost[child]
+                meeting = (current_node, child) if side == 0 else (child, current_node)
+            if child in settled[side] or child_cost >= cost.get(child, inf):
+                continue
+            if child in cost:
+                stats.reopened += 1
+            cost[child] = child_cost
+            parent[child] = current_node
+            heappush(frontiers[side], (child_cost + sign * potential(child), child))
+            stats.generated += 1
+            if on_generate is not None:
+                on_generate(child)
+
+    path = _join_paths(parents, meeting) if meeting is not None else []
+    return best, path, settled[0], parents[0]
+
+
+def bidirectional_dijkstra(
+    graph: Dict,
+    start: Tuple,
+    end: Tuple,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[Dict, Dict, List, SearchStats]:
+    """
+    Dijkstra from both ends at once on an undirected graph, stopping once the
+    two smallest costs on the open lists add up to at least the cheapest path
+    found through an edge joining the two trees. Each side settles nodes out
+    to about half the path cost, so on open grids this settles about half the
+    nodes dijkstra does.
+
+    Returns (cost, parent, path, stats) like dijkstra, except that cost and
+    parent only cover the nodes the search from start settled, plus the path.
+    """
+    stats = SearchStats().start()
+    unreachable = is_unreachable(graph, start, end)
+    if unreachable or start == end:
+        path = [] if unreachable else [start]
+        cost = {} if unreachable else {start: 0}
+        return cost, {start: None}, path, finish_path(stats, graph, path, on_path)
+
+    best, path, cost, parent = _bidirectional_search(
+        graph, start, end, lambda node: 0, stats, on_expand, on_generate
+    )
+    if path:
+        weighted = isinstance(graph[start], dict)
+        for node, next_node in zip(path, path[1:]):
+            parent[next_node] = node
+            if next_node not in cost:
+                cost[next_node] = cost[node] + (
+                    graph[node][next_node] if weighted else 1
+                )
+        cost[end] = best
+        if on_path is not None:
+            on_path(path)
+    return cost, parent, path, stats.finish(best)
+
+
+def bidirectional_astar(
+    graph: Dict,
+    start: Tuple,
+    end: Tuple,
+    heuristic: Optional[Callable] = None,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, float, SearchStats]:
+    """
+    A* from both ends at once on an undirected graph. The two searches share
+    the average potential (heuristic(node, end) - heuristic(node, start)) / 2,
+    which stays feasible for a consistent heuristic, so the stopping rule of
+    bidirectional_dijkstra still returns optimal paths. heuristic defaults as
+    in astar.
+
+    Returns (path, cost, stats) like astar.
+    """
+    stats = SearchStats().start()
+    if is_unreachable(graph, start, end):
+        return [], inf, stats.finish()
+    if start == end:
+        return [start], 0, finish_path(stats, graph, [start], on_path)
+    if heuristic is None:
+        heuristic = octile if isinstance(graph[start], dict) else manhattan
 
-    print("Done!")
+    def potential(node: Tuple) -> float:
+        return (heuristic(node, end) - heuristic(node, start)) / 2
 
-    return level, traversed_path
+    cost, path, _, _ = _bidirectional_search(
+        graph, start, end, potential, stats, on_expand, on_generate
+    )
+    if path and on_path is not None:
+        on_path(path)
+    return path, cost, stats.finish(cost)
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+SQRT2 = math.sqrt(2)
+
+# Neighbour order matches get_valid_node_neighbours(_with_weights) in utils so
+# searches break ties the same way on either graph representation.
+STRAIGHT_MOVES = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL_MOVES = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def occupancy_from_image(image: Image) -> np.ndarray:
+    """
+    Converts an obstacle course image into a boolean occupancy array in one
+    bulk operation. The array is indexed as [y, x] and is True wherever the
+    image holds an obstacle pixel (0, 0, 0).
+    """
+    pixels = np.asarray(image.convert("RGB"))
+    return ~pixels.any(axis=2)
+
+
+def grid_fingerprint(occupied: np.ndarray) -> str:
+    """
+    Digest of an occupancy array's shape and contents, equal for equal grids
+    whichever GridGraph or image they came from.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(occupied.shape).encode())
+    digest.update(np.packbits(occupied).tobytes())
+    return digest.hexdigest()
+
+
+def save_occupancy(path: str, occupied: np.ndarray) -> None:
+    """
+    Saves an occupancy array indexed as [y, x] to a .npy file, one byte per
+    cell, for load_occupancy to map back.
+    """
+    np.save(path, np.ascontiguousarray(occupied, dtype=bool))
+
+
+def load_occupancy(path: str, writable: bool = False) -> np.ndarray:
+    """
+    Memory-maps an occupancy array saved by save_occupancy (or written by
+    create_obstacle_file). Nothing is read up front: the OS pages in the rows a
+    search touches, so astar, dijkstra and the dict-based bfs and dfs on a
+    GridGraph over it use memory in proportion to the region they explore
+    rather than to the map. Planners built on whole-grid arrays (jps,
+    frontier_bfs, the workspace searches, HierarchicalPlanner, cost-to-go
+    fields) still take memory in proportion to the map. With writable,
+    set_occupied writes to the file.
+    """
+    occupied = np.load(path, mmap_mode="r+" if writable else "r")
+    if occupied.dtype != bool or occupied.ndim != 2:
+        raise ValueError(f"{path} doesn't hold a 2D boolean occupancy array")
+    return occupied
+
+
+def label_components(occupied: np.ndarray, connectivity: int = 4) -> np.ndarray:
+    """
+    Labels the connected regions of free space in an occupancy grid with a
+    vectorized union-find. Every round hooks the root of each tree under the
+    smallest root it shares an edge with, then compresses every path by pointer
+    jumping. The number of trees at least halves per round, and edges that end
+    up inside one tree are dropped.
+
+    Returns an int32 array indexed as [y, x] holding the component of each free
+    cell, numbered from 0 in row-major order of each component's first cell,
+    and -1 for obstacles.
+    """
+    height, width = occupied.shape
+    free = ~occupied
+    ids = np.arange(height * width, dtype=np.int32).reshape(height, width)
+
+    # Pairs of adjacent free cells, one direction per pair
+    pairs = [
+        (np.s_[:, :-1], np.s_[:, 1:]),
+        (np.s_[:-1, :], np.s_[1:, :]),
+    ]
+    if connectivity == 8:
+        pairs += [(np.s_[:-1, :-1], np.s_[1:, 1:]), (np.s_[:-1, 1:], np.s_[1:, :-1])]
+    sources, targets = [], []
+    for first, second in pairs:
+        linked = free[first] & free[second]
+        sources.append(ids[first][linked])
+        targets.append(ids[second][linked])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+
+    parent = ids.reshape(-1).copy()
+    while True:
+        source_roots, target_roots = parent[sources], parent[targets]
+        crossing = source_roots != target_roots
+        if not crossing.any():
+            break
+
+        sources, targets = sources[crossing], targets[crossing]
+        source_roots, target_roots = source_roots[crossing], target_roots[crossing]
+        np.minimum.at(
+            parent,
+            np.maximum(source_roots, target_roots),
+            np.minimum(source_roots, target_roots),
+        )
+        while True:  # Pointer jumping
+            grandparents = parent[parent]
+            if np.array_equal(grandparents, parent):
+                break
+            parent = grandparents
+
+    # Roots are the smallest id in their component, so ranking them in id
+    # order numbers the components without a sort
+    is_root = (parent == ids.reshape(-1)) & free.reshape(-1)
+    rank = np.cumsum(is_root, dtype=np.int32) - 1
+    labels = rank[parent].reshape(height, width)
+    labels[occupied] = -1
+    return labels
+
+
+def straight_jump_stops(occupied: np.ndarray) -> Dict[Tuple[int, int], np.ndarray]:
+    """
+    Precomputes straight-line scans for jump point search. For each straight
+    direction, an int32 array indexed as [y, x] holds the coordinate along that
+    direction of the first cell, from (x, y) onwards, where a scan moving that
+    way has to stop: an obstacle, the grid edge (-1 or the grid length) or a
+    cell with a forced neighbour.
+    """
+    height, width = occupied.shape
+    padded = np.pad(occupied, 1, constant_values=True)
+
+    def shifted(dx: int, dy: int) -> np.ndarray:
+        return padded[1 + dy : height + 1 + dy, 1 + dx : width + 1 + dx]
+
+    stops = {}
+    for dx, dy in STRAIGHT_MOVES:
+        if dx:  # Obstacles above or below open up a diagonal ahead
+            forced = (shifted(0, 1) & ~shifted(dx, 1)) | (
+                shifted(0, -1) & ~shifted(dx, -1)
+            )
+            axis, length = 1, width
+        else:
+            forced = (shifted(1, 0) & ~shifted(1, dy)) | (
+                shifted(-1, 0) & ~shifted(-1, dy)
+            )
+            axis, length = 0, height
+        stop = occupied | forced
+
+        coordinates = np.arange(length).reshape((1, -1) if axis else (-1, 1))
+        if dx + dy > 0:  # Nearest stop at or after each cell
+            nearest = np.where(stop, coordinates, length)
+            nearest = np.flip(np.minimum.accumulate(np.flip(nearest, axis), axis), axis)
+        else:  # Nearest stop at or before each cell
+            nearest = np.maximum.accumulate(np.where(stop, coordinates, -1), axis)
+        stops[(dx, dy)] = np.ascontiguousarray(nearest, dtype=np.int32)
+    return stops
+
+
+class GridGraph:
+    """
+    Graph view of an occupancy grid that produces neighbours on demand.
+
+    Nodes are (x, y) tuples like the keys of the adjacency dicts in utils, and
+    graph[node] returns what those dicts hold: a list of neighbours for a
+    4-connected grid (create_adjacency_dict) or a {neighbour: distance} dict for
+    an 8-connected one (create_adjacency_dict_for_weighted_graphs). Nothing is
+    precomputed per cell, so the searches in graph_searches can use it in place
+    of a dict without paying for a full adjacency structure up front.
+
+    The occupancy array may be memory-mapped (see load_occupancy). For maps
+    too large to label whole, pass index_components=False: reachable() then
+    answers True for every pair and searches find out for themselves.
+    """
+
+    def __init__(
+        self, occupied: np.ndarray, connectivity: int = 4, index_components: bool = True
+    ):
+        if connectivity not in (4, 8):
+            raise ValueError(f"connectivity must be 4 or 8, got {connectivity}")
+
+        self.occupied = np.ascontiguousarray(occupied, dtype=bool)
+        self.height, self.width = self.occupied.shape
+        self.connectivity = connectivity
+        self.moves = STRAIGHT_MOVES + (DIAGONAL_MOVES if connectivity == 8 else ())
+        self.index_components = index_components
+
+        # Flat byte view over the occupancy array: indexing it yields plain ints,
+        # which is considerably cheaper than indexing the numpy array per cell.
+        self.blocked = memoryview(self.occupied.reshape(-1).view(np.uint8))
+        self.version = 0  # Bumped whenever cells change, for caches built on top
+        self._components = None
+        self._jump_stops = None
+
+    @property
+    def components(self) -> np.ndarray:
+        """
+        Connected-component labels of the free cells (see label_components),
+        computed on first use and kept until cells change.
+        """
+        if self._components is None:
+            self._components = label_components(self.occupied, self.connectivity)
+        return self._components
+
+    @property
+    def jump_stops(self) -> Dict[Tuple[int, int], memoryview]:
+        """
+        Flat views of straight_jump_stops for this grid, computed on first use.
+        """
+        if self._jump_stops is None:
+            self.use_indexes(jump_stops=straight_jump_stops(self.occupied))
+        return self._jump_stops
+
+    def use_indexes(
+        self,
+        components: Optional[np.ndarray] = None,
+        jump_stops: Optional[Dict[Tuple[int, int], np.ndarray]] = None,
+    ) -> None:
+        """
+        Adopts component labels and straight_jump_stops computed earlier for
+        this occupancy and connectivity, e.g. loaded from a ScenarioStore,
+        instead of computing them on first use. They are dropped like the
+        computed ones when cells change.
+        """
+        if components is not None:
+            self._components = components
+        if jump_stops is not None:
+            self._jump_stops = {
+                direction: memoryview(stops.reshape(-1))
+                for direction, stops in jump_stops.items()
+            }
+
+    def reachable(self, start: Tuple, end: Tuple) -> bool:
+        """
+        Whether a path exists between two nodes, in O(1) once the component
+        labels are built. Always True without index_components.
+        """
+        if not self.index_components:
+            return True
+        labels = self.components
+        label = labels[start[1], start[0]]
+        return bool(label >= 0 and label == labels[end[1], end[0]])
+
+    def set_occupied(self, cells: Iterable[Tuple], occupied: bool = True) -> List:
+        """
+        Marks cells as obstacles (or frees them) in place and drops the indexes
+        derived from the old occupancy. Returns the cells that actually changed.
+        """
+        changed = []
+        for x, y in cells:
+            if self.in_bounds((x, y)) and self.occupied[y, x] != occupied:
+                self.occupied[y, x] = occupied
+                changed.append((x, y))
+
+        if changed:
+            self.version += 1
+            self._components = None
+            self._jump_stops = None
+        return changed
+
+    @classmethod
+    def from_image(cls, image: Image, connectivity: int = 4) -> "GridGraph":
+        return cls(occupancy_from_image(image), connectivity)
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        connectivity: int = 4,
+        writable: bool = False,
+        index_components: bool = True,
+    ) -> "GridGraph":
+        return cls(load_occupancy(path, writable), connectivity, index_components)
+
+    def in_bounds(self, node: Tuple) -> bool:
+        return 0 <= node[0] < self.width and 0 <= node[1] < self.height
+
+    def is_free(self, node: Tuple) -> bool:
+        return self.in_bounds(node) and not self.blocked[node[1] * self.width + node[0]]
+
+    def neighbours(self, node: Tuple) -> List:
+        """
+        Gets the traversable neighbours of a node. Obstacle nodes have none.
+        """
+        x, y = node
+        width, height, blocked = self.width, self.height, self.blocked
+        if blocked[y * width + x]:
+            return []
+
+        valid_neighbours = []
+        for dx, dy in self.moves:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and not blocked[ny * width + nx]:
+                valid_neighbours.append((nx, ny))
+        return valid_neighbours
+
+    def weighted_neighbours(self, node: Tuple) -> Dict:
+        """
+        Gets the traversable neighbours of a node along with the distance to
+        each of them.
+        """
+        x, y = node
+        width, height, blocked = self.width, self.height, self.blocked
+        if blocked[y * width + x]:
+            return {}
+
+        valid_neighbours = {}
+        for dx, dy in self.moves:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and not blocked[ny * width + nx]:
+                valid_neighbours[(nx, ny)] = SQRT2 if dx and dy else 1.0
+        return valid_neighbours
+
+    @staticmethod
+    def cost(current: Tuple, neighbour: Tuple) -> float:
+        """
+        Step cost between two adjacent nodes.
+        """
+        if current[0] != neighbour[0] and current[1] != neighbour[1]:
+            return SQRT2
+        return 1.0
+
+    # Mapping interface, so a GridGraph can stand in for the adjacency dicts
+
+    def __getitem__(self, node: Tuple):
+        if not self.in_bounds(node):
+            raise KeyError(node)
+        if self.connectivity == 8:
+            return self.weighted_neighbours(node)
+        return self.neighbours(node)
+
+    def get(self, node: Tuple, default=None):
+        if not self.in_bounds(node):
+            return default
+        return self[node]
+
+    def __contains__(self, node) -> bool:
+        return isinstance(node, tuple) and len(node) == 2 and self.in_bounds(node)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for x in range(self.width):
+            for y in range(self.height):
+                yield x, y
+
+    def keys(self) -> Iterator[Tuple[int, int]]:
+        return iter(self)
+
+    def __len__(self) -> int:
+        return self.width * self.height
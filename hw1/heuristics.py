@@ -0,0 +1,45 @@
+import math
+from typing import Callable, Tuple
+
+SQRT2_MINUS_ONE = math.sqrt(2) - 1
+
+
+def manhattan(node: Tuple, goal: Tuple) -> float:
+    """
+    Exact distance on an open 4-connected grid with unit steps. Overestimates
+    once diagonal steps are allowed, so it is only admissible without them.
+    """
+    return abs(node[0] - goal[0]) + abs(node[1] - goal[1])
+
+
+def octile(node: Tuple, goal: Tuple) -> float:
+    """
+    Exact distance on an open 8-connected grid with unit straight steps and
+    sqrt(2) diagonal steps. Admissible on both 4- and 8-connected grids.
+    """
+    dx, dy = abs(node[0] - goal[0]), abs(node[1] - goal[1])
+    return max(dx, dy) + SQRT2_MINUS_ONE * min(dx, dy)
+
+
+def euclidean(node: Tuple, goal: Tuple) -> float:
+    """
+    Straight-line distance. Admissible on any grid, but looser than octile.
+    """
+    return math.dist(node, goal)
+
+
+def weighted(heuristic: Callable, epsilon: float) -> Callable:
+    """
+    Inflates an admissible heuristic by epsilon. Searches using it expand
+    fewer nodes and return paths costing at most epsilon times the optimum.
+    """
+    if epsilon < 1:
+        raise ValueError(f"epsilon must be at least 1, got {epsilon}")
+
+    def inflated(node: Tuple, goal: Tuple) -> float:
+        return epsilon * heuristic(node, goal)
+
+    return inflated
+
+
+HEURISTICS = {"manhattan": manhattan, "octile": octile, "euclidean": euclidean}
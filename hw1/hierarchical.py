@@ -0,0 +1,443 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from numpy import inf
+
+from graph_searches import astar, dijkstra
+from grid import SQRT2, GridGraph
+from heuristics import manhattan, octile
+from search_stats import SearchStats
+
+# Clusters whose in-cluster distances are computed together in one batch
+CLUSTER_BATCH = 64
+
+
+class RegionView:
+    """
+    Mapping view of a GridGraph restricted to the rectangle x0 <= x < x1,
+    y0 <= y < y1, so the searches in graph_searches can run inside one cluster.
+    """
+
+    def __init__(self, graph: GridGraph, x0: int, y0: int, x1: int, y1: int):
+        self.graph = graph
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+
+    def __getitem__(self, node: Tuple):
+        x0, y0, x1, y1 = self.x0, self.y0, self.x1, self.y1
+        neighbours = self.graph[node]
+        if isinstance(neighbours, dict):
+            return {
+                (x, y): cost
+                for (x, y), cost in neighbours.items()
+                if x0 <= x < x1 and y0 <= y < y1
+            }
+        return [(x, y) for x, y in neighbours if x0 <= x < x1 and y0 <= y < y1]
+
+
+def region_distances(
+    blocked: np.ndarray, sources: List[List[Tuple[int, int]]], connectivity: int
+) -> np.ndarray:
+    """
+    Shortest distances within each of a stack of equally sized occupancy
+    blocks from each of that block's sources, computed for all blocks and
+    sources at once. Sweeps the blocks row by row downwards and upwards, then
+    column by column both ways, relaxing each row or column from the one before
+    it, and repeats until nothing improves. Most blocks settle in a few rounds.
+
+    blocked has shape (blocks, height, width) and sources[block] lists (x, y)
+    positions within that block. Returns a float array of shape (blocks,
+    most sources, height, width) with inf for unreachable cells and for source
+    slots a block doesn't use.
+    """
+    blocks, height, width = blocked.shape
+    distances = np.full(
+        (blocks, height + 2, width + 2, max(map(len, sources), default=0)), inf
+    )
+    for block, block_sources in enumerate(sources):
+        for index, (x, y) in enumerate(block_sources):
+            distances[block, y + 1, x + 1, index] = 0
+
+    # Entering an obstacle costs inf, so obstacles never pick up a distance
+    entry = np.where(blocked, inf, 0.0)[..., None]
+    straight, diagonal = entry + 1, entry + SQRT2
+
+    def relax(cells, previous, straight, diagonal):
+        np.minimum(cells, previous[:, 1:-1] + straight, out=cells)
+        if connectivity == 8:
+            np.minimum(cells, previous[:, :-2] + diagonal, out=cells)
+            np.minimum(cells, previous[:, 2:] + diagonal, out=cells)
+
+    rows, columns = distances, distances.swapaxes(1, 2)
+    row_costs = straight, diagonal
+    column_costs = straight.swapaxes(1, 2), diagonal.swapaxes(1, 2)
+    while True:
+        before = distances.copy()
+        for lines, (straight, diagonal), length in (
+            (rows, row_costs, height),
+            (columns, column_costs, width),
+        ):
+            for line, previous in [(i, i - 1) for i in range(1, length + 1)] + [
+                (i, i + 1) for i in range(length, 0, -1)
+            ]:
+                relax(
+                    lines[:, line, 1:-1],
+                    lines[:, previous],
+                    straight[:, line - 1],
+                    diagonal[:, line - 1],
+                )
+        if np.array_equal(before, distances):
+            return np.moveaxis(distances[:, 1:-1, 1:-1], 3, 1)
+
+
+class _AbstractGraph:
+    """
+    Mapping view of the abstract graph for one query: cached cluster edges
+    plus the temporary edges linking the query's start and goal.
+    """
+
+    def __init__(self, planner: "HierarchicalPlanner", extra_edges: Dict):
+        self.planner = planner
+        self.extra_edges = extra_edges
+
+    def __getitem__(self, node: Tuple) -> Dict:
+        edges = self.planner.abstract_edges(node)
+        if node in self.extra_edges:
+            edges = {**edges, **self.extra_edges[node]}
+        return edges
+
+
+class HierarchicalPlanner:
+    """
+    Hierarchical path-finding (HPA*, Botea et al. 2004) over a GridGraph.
+
+    The grid is split into square clusters. Cells on either side of a cluster
+    border where a path can cross become abstract nodes, and the exact
+    in-cluster distances between the abstract nodes of each cluster are cached
+    as abstract edges. A query links start and goal into the abstract graph,
+    runs astar over it and refines each abstract edge with a search confined to
+    one cluster, so its cost follows the path length rather than the map area.
+
+    Entrances are the runs of border rows (or columns) where both sides are
+    free. A run gets an abstract node at both ends and every entrance_spacing
+    cells in between, or only one in its middle if it is shorter than that.
+    Diagonal crossings with no straight crossing next to them, and diagonal
+    crossings through cluster corners, always get their own nodes.
+
+    Suboptimality bound: an optimal path can be rerouted through the nearest
+    abstract node of every entrance it crosses by walking along the border on
+    both sides, so the returned path costs at most the optimum plus
+    entrance_spacing + 1 per cluster border the optimal path crosses
+    (entrance_spacing on 4-connected grids). With entrance_spacing=1 every
+    crossing is an abstract node and paths are optimal.
+    """
+
+    def __init__(
+        self, graph: GridGraph, cluster_size: int = 32, entrance_spacing: int = 8
+    ):
+        if cluster_size < 2 or entrance_spacing < 1:
+            raise ValueError("Need cluster_size >= 2 and entrance_spacing >= 1")
+
+        self.graph = graph
+        self.cluster_size = cluster_size
+        self.entrance_spacing = entrance_spacing
+        self.heuristic = octile if graph.connectivity == 8 else manhattan
+        self.clusters_x = -(-graph.width // cluster_size)
+        self.clusters_y = -(-graph.height // cluster_size)
+
+        self._border_nodes = {}  # Border or corner key -> abstract nodes on it
+        self._cluster_nodes = {}  # Cluster -> abstract nodes inside it
+        self._cluster_edges = {}  # Cluster -> {node: {node: distance}}
+        self._version = None
+        self.rebuild()
+
+    def cluster_of(self, node: Tuple) -> Tuple[int, int]:
+        return node[0] // self.cluster_size, node[1] // self.cluster_size
+
+    def cluster_bounds(self, cluster: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """
+        (x0, y0, x1, y1) of a cluster, with x1 and y1 exclusive.
+        """
+        size = self.cluster_size
+        x0, y0 = cluster[0] * size, cluster[1] * size
+        return (
+            x0,
+            y0,
+            min(x0 + size, self.graph.width),
+            min(y0 + size, self.graph.height),
+        )
+
+    def rebuild(self) -> None:
+        """
+        Rebuilds the whole abstract graph from the current occupancy.
+        """
+        self._border_nodes.clear()
+        for key in self._border_keys(self._all_clusters()):
+            self._border_nodes[key] = self._find_border_nodes(key)
+        self._build_clusters(self._all_clusters())
+        self._version = self.graph.version
+
+    def update(self, cells: Iterable[Tuple]) -> None:
+        """
+        Refreshes the abstract graph after cells of the grid changed (e.g. via
+        GridGraph.set_occupied). Only the clusters holding those cells, and
+        neighbours whose abstract nodes moved as a result, are rebuilt.
+        """
+        changed = {self.cluster_of(cell) for cell in cells}
+        neighbours = {
+            (cx + dx, cy + dy)
+            for cx, cy in changed
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            if 0 <= cx + dx < self.clusters_x and 0 <= cy + dy < self.clusters_y
+        }
+
+        for key in self._border_keys(changed):
+            self._border_nodes[key] = self._find_border_nodes(key)
+        self._build_clusters(
+            [
+                cluster
+                for cluster in neighbours
+                if cluster in changed
+                or self._collect_nodes(cluster) != self._cluster_nodes[cluster]
+            ]
+        )
+        self._version = self.graph.version
+
+    def abstract_edges(self, node: Tuple) -> Dict:
+        """
+        Cached abstract edges of an abstract node: its in-cluster distances to
+        the cluster's other abstract nodes, plus single steps to adjacent
+        abstract nodes in neighbouring clusters.
+        """
+        cluster = self.cluster_of(node)
+        edges = dict(self._cluster_edges[cluster].get(node, {}))
+        for neighbour, cost in self._steps(node):
+            if (
+                self.cluster_of(neighbour) != cluster
+                and neighbour in self._cluster_nodes[self.cluster_of(neighbour)]
+            ):
+                edges[neighbour] = cost
+        return edges
+
+    def plan(
+        self,
+        start: Tuple,
+        goal: Tuple,
+        on_expand: Optional[Callable] = None,
+        on_generate: Optional[Callable] = None,
+        on_path: Optional[Callable] = None,
+    ) -> Tuple[List, float, SearchStats]:
+        """
+        Returns (path, cost, stats) like astar, with the path expanded into
+        grid cells. stats adds up the searches that link start and goal into
+        the abstract graph, the abstract search and the refinement; on_expand
+        and on_generate only see the abstract search.
+        """
+        stats = SearchStats().start()
+        if self._version != self.graph.version:
+            self.rebuild()  # Cells changed without update(), so start over
+
+        graph = self.graph
+        if not (graph.is_free(start) and graph.is_free(goal)):
+            return [], inf, stats.finish()
+
+        # Link start and goal to the abstract nodes of their clusters. Every
+        # entrance has an abstract node, so when either isn't one and links to
+        # none, or the abstract search below fails, no path exists. Unlike
+        # graph.reachable this doesn't relabel the whole grid after update().
+        extra_edges = {start: {}, goal: {}}
+        for endpoint in (start, goal):
+            cluster = self.cluster_of(endpoint)
+            costs, _, _, link_stats = dijkstra(self._region(cluster), endpoint)
+            stats.merge(link_stats)
+            targets = set(self._cluster_nodes[cluster])
+            if cluster == self.cluster_of(goal) == self.cluster_of(start):
+                targets.add(goal if endpoint == start else start)
+            for node in targets:
+                if node != endpoint and node in costs:
+                    extra_edges[endpoint][node] = costs[node]
+                    extra_edges.setdefault(node, {})[endpoint] = costs[node]
+            if not extra_edges[endpoint] and endpoint not in targets:
+                return [], inf, stats.finish()
+
+        abstract_path, cost, abstract_stats = astar(
+            _AbstractGraph(self, extra_edges),
+            start,
+            goal,
+            self.heuristic,
+            on_expand=on_expand,
+            on_generate=on_generate,
+        )
+        path = self._refine(abstract_path, stats.merge(abstract_stats))
+        if path and on_path is not None:
+            on_path(path)
+        return path, cost, stats.finish(cost)
+
+    def _refine(self, abstract_path: List, stats: SearchStats) -> List:
+        """
+        Expands consecutive abstract nodes into grid cells: single steps across
+        borders, and in-cluster searches along abstract edges whose work is
+        counted in stats.
+        """
+        if not abstract_path:
+            return []
+
+        path = [abstract_path[0]]
+        for node, next_node in zip(abstract_path, abstract_path[1:]):
+            cluster = self.cluster_of(node)
+            if cluster != self.cluster_of(next_node):
+                path.append(next_node)
+                continue
+            segment, _, segment_stats = astar(
+                self._region(cluster), node, next_node, self.heuristic
+            )
+            stats.merge(segment_stats)
+            path.extend(segment[1:])
+        return path
+
+    def _all_clusters(self) -> List[Tuple[int, int]]:
+        return [
+            (cx, cy) for cx in range(self.clusters_x) for cy in range(self.clusters_y)
+        ]
+
+    def _region(self, cluster: Tuple[int, int]) -> RegionView:
+        return RegionView(self.graph, *self.cluster_bounds(cluster))
+
+    def _steps(self, node: Tuple) -> List:
+        neighbours = self.graph[node]
+        if isinstance(neighbours, dict):
+            return list(neighbours.items())
+        return [(neighbour, 1) for neighbour in neighbours]
+
+    def _border_keys(self, clusters: Iterable[Tuple[int, int]]) -> Set:
+        """
+        Keys of the borders and corners around the given clusters: ("v", cx, cy)
+        for the border between clusters (cx, cy) and (cx + 1, cy), ("h", cx, cy)
+        between (cx, cy) and (cx, cy + 1), and ("c", cx, cy) for the corner
+        shared by (cx, cy) and (cx + 1, cy + 1).
+        """
+        keys = set()
+        for cx, cy in clusters:
+            for dx in (-1, 0):
+                for dy in (-1, 0):
+                    keys.add(("c", cx + dx, cy + dy))
+                keys.add(("v", cx + dx, cy))
+            for dy in (-1, 0):
+                keys.add(("h", cx, cy + dy))
+        return {
+            key
+            for key in keys
+            if 0 <= key[1] < self.clusters_x - (key[0] != "h")
+            and 0 <= key[2] < self.clusters_y - (key[0] != "v")
+        }
+
+    def _find_border_nodes(self, key: Tuple) -> Set:
+        kind, cx, cy = key
+        is_free = self.graph.is_free
+        x0, y0, x1, y1 = self.cluster_bounds((cx, cy))
+        nodes = set()
+
+        if kind == "c":
+            if self.graph.connectivity == 8:
+                x, y = x1 - 1, y1 - 1
+                for first, second in (
+                    ((x, y), (x + 1, y + 1)),
+                    ((x + 1, y), (x, y + 1)),
+                ):
+                    if is_free(first) and is_free(second):
+                        nodes.update((first, second))
+            return nodes
+
+        # Cells along the border as (near side, far side) pairs, in order
+        if kind == "v":
+            sides = [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+        else:
+            sides = [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+        open_along = [is_free(near) and is_free(far) for near, far in sides]
+
+        # Straight crossings, grouped into runs of consecutive open pairs
+        index = 0
+        while index < len(sides):
+            if not open_along[index]:
+                index += 1
+                continue
+            end = index
+            while end + 1 < len(sides) and open_along[end + 1]:
+                end += 1
+            for offset in self._entrance_offsets(end - index + 1):
+                nodes.update(sides[index + offset])
+            index = end + 1
+
+        # Diagonal crossings between neighbouring pairs along the border
+        if self.graph.connectivity == 8:
+            for index in range(len(sides) - 1):
+                (near, far), (next_near, next_far) = sides[index], sides[index + 1]
+                for first, second, others in (
+                    (near, next_far, (far, next_near)),
+                    (next_near, far, (near, next_far)),
+                ):
+                    if not (is_free(first) and is_free(second)):
+                        continue
+                    squeezed = not any(is_free(cell) for cell in others)
+                    if self.entrance_spacing == 1 or squeezed:
+                        nodes.update((first, second))
+        return nodes
+
+    def _entrance_offsets(self, length: int) -> List[int]:
+        spacing = self.entrance_spacing
+        if length < spacing:
+            return [length // 2]
+        return sorted(set(range(0, length, spacing)) | {length - 1})
+
+    def _collect_nodes(self, cluster: Tuple[int, int]) -> Set:
+        nodes = set()
+        for key in self._border_keys([cluster]):
+            nodes.update(
+                node
+                for node in self._border_nodes.get(key, ())
+                if self.cluster_of(node) == cluster
+            )
+        return nodes
+
+    def _build_clusters(self, clusters: Iterable[Tuple[int, int]]) -> None:
+        """
+        Recomputes the abstract nodes and in-cluster distances of clusters.
+        Clusters with similar node counts are batched through region_distances
+        together, with clusters at the map edge padded out with obstacles.
+        """
+        size, occupied = self.cluster_size, self.graph.occupied
+        nodes = {cluster: sorted(self._collect_nodes(cluster)) for cluster in clusters}
+        order = sorted(nodes, key=lambda cluster: len(nodes[cluster]))
+
+        for first in range(0, len(order), CLUSTER_BATCH):
+            batch = order[first : first + CLUSTER_BATCH]
+            blocked = np.ones((len(batch), size, size), dtype=bool)
+            sources = []
+            for block, cluster in enumerate(batch):
+                x0, y0, x1, y1 = self.cluster_bounds(cluster)
+                blocked[block, : y1 - y0, : x1 - x0] = occupied[y0:y1, x0:x1]
+                sources.append([(x - x0, y - y0) for x, y in nodes[cluster]])
+            distances = region_distances(blocked, sources, self.graph.connectivity)
+
+            for block, cluster in enumerate(batch):
+                x0, y0 = cluster[0] * size, cluster[1] * size
+                cluster_nodes = nodes[cluster]
+                edges = {node: {} for node in cluster_nodes}
+                for index, node in enumerate(cluster_nodes):
+                    for other in cluster_nodes:
+                        cost = distances[block, index, other[1] - y0, other[0] - x0]
+                        if other != node and cost < inf:
+                            edges[node][other] = float(cost)
+                self._cluster_nodes[cluster] = set(cluster_nodes)
+                self._cluster_edges[cluster] = edges
+
+
+def query_bound(planner: HierarchicalPlanner, crossings: int) -> float:
+    """
+    Largest extra cost over the optimum the planner can return for an optimal
+    path that crosses the given number of cluster borders.
+    """
+    if planner.entrance_spacing == 1:
+        return 0.0
+    per_crossing = planner.entrance_spacing + (planner.graph.connectivity == 8)
+    return float(per_crossing * crossings)
@@ -0,0 +1,156 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy import inf
+
+from cost_to_go import cost_to_go_field
+from grid import GridGraph
+from heuristics import manhattan, octile
+
+# Relative rounding error of float32: a stored distance d is off by at most
+# d * 2**-24, so a difference of two by twice the largest distance times that
+FLOAT32_ERROR = 2.0**-24
+
+
+def build_landmarks(
+    graph: GridGraph, count: int = 8, method: str = "farthest"
+) -> Tuple[List[Tuple], np.ndarray]:
+    """
+    Picks count free cells as landmarks and returns them with their
+    landmark_tables. method is one of:
+
+    - "farthest": farthest-point selection. Starting from the free cell
+      nearest the centre, each landmark is the cell farthest by path from the
+      ones chosen so far, which spreads them over the edges of the region the
+      centre reaches. The distances needed along the way are the tables, so
+      this takes count + 1 cost-to-go fields.
+    - "border": the free cells nearest count points spaced evenly around the
+      grid's border. Blind to walls, but placed without any search.
+
+    Fewer are returned if the grid runs out of reachable free cells.
+    """
+    occupied = np.asarray(graph.occupied)
+    ys, xs = np.nonzero(~occupied)
+    if not xs.size:
+        return [], landmark_tables(graph, [])
+
+    def nearest_free(x: float, y: float) -> Tuple:
+        index = np.argmin((xs - x) ** 2 + (ys - y) ** 2)
+        return int(xs[index]), int(ys[index])
+
+    height, width = occupied.shape
+    if method == "border":
+        # Points going clockwise from the top left corner along the border
+        perimeter = 2 * (width + height)
+        landmarks = []
+        for step in np.arange(count) * perimeter / count:
+            if step < width:
+                point = step, 0
+            elif step < width + height:
+                point = width - 1, step - width
+            elif step < 2 * width + height:
+                point = 2 * width + height - step, height - 1
+            else:
+                point = 0, perimeter - step
+            landmark = nearest_free(*point)
+            if landmark not in landmarks:
+                landmarks.append(landmark)
+        return landmarks, landmark_tables(graph, landmarks)
+    if method != "farthest":
+        raise ValueError(f"Unknown landmark selection method {method!r}")
+
+    # Distance to the nearest landmark so far, -1 where unreachable, with the
+    # centre standing in for the first one
+    nearest = cost_to_go_field(graph, nearest_free((width - 1) / 2, (height - 1) / 2))
+    nearest[nearest == inf] = -1
+    landmarks, fields = [], []
+    while len(landmarks) < count:
+        index = np.argmax(nearest)
+        if nearest.flat[index] <= 0:  # Every reachable cell is a landmark
+            break
+        y, x = divmod(int(index), width)
+        landmarks.append((x, y))
+        fields.append(cost_to_go_field(graph, (x, y)))
+        if len(landmarks) == 1:
+            nearest = np.where(fields[0] == inf, -1, fields[0])
+        else:
+            np.minimum(nearest, fields[-1], out=nearest)
+    tables = np.empty(occupied.shape + (len(fields),), dtype=np.float32)
+    for index, field in enumerate(fields):
+        tables[..., index] = field
+    return landmarks, tables
+
+
+def landmark_tables(graph: GridGraph, landmarks: Sequence[Tuple]) -> np.ndarray:
+    """
+    Exact path distances from each landmark to every cell, as a float32 array
+    of shape (height, width, landmarks) with inf where a landmark can't reach,
+    so all of one cell's distances sit together. 4 bytes per cell and
+    landmark.
+    """
+    tables = np.empty(graph.occupied.shape + (len(landmarks),), dtype=np.float32)
+    for index, landmark in enumerate(landmarks):
+        tables[..., index] = cost_to_go_field(graph, landmark)
+    return tables
+
+
+class LandmarkHeuristic:
+    """
+    ALT heuristic (A*, landmarks, triangle inequality) for astar and the
+    other planners taking heuristic(node, goal). For a landmark L the triangle
+    inequality gives d(node, goal) >= |d(L, goal) - d(L, node)|; the maximum
+    of that bound over all landmarks, and the octile (8-connected) or
+    manhattan (4-connected) distance, is admissible and consistent. Behind
+    walls it is far tighter than either, so astar expands several times fewer
+    nodes on cluttered courses while still returning optimal paths.
+
+    The bound is lowered by the worst-case rounding of the float32 tables so
+    it never overestimates. A node the goal's landmarks can't reach lies in
+    another component and gets inf. The tables only hold for the grid they
+    were computed on, not after cells change.
+    """
+
+    def __init__(
+        self,
+        tables: np.ndarray,
+        landmarks: Optional[Sequence[Tuple]] = None,
+        connectivity: int = 8,
+    ):
+        self.tables = np.asarray(tables)  # A plain array indexes faster than a memmap
+        self.landmarks = [tuple(landmark) for landmark in landmarks or ()]
+        self.fallback = octile if connectivity == 8 else manhattan
+        # Twice the worst case, leaving room for the float64 sums behind them
+        largest = np.max(self.tables, where=self.tables < inf, initial=0)
+        self.slack = 4 * FLOAT32_ERROR * float(largest)
+        self._goal = None
+        self._goal_distances = []  # (landmark index, distance) for the goal
+
+    @classmethod
+    def build(
+        cls, graph: GridGraph, count: int = 8, method: str = "farthest"
+    ) -> "LandmarkHeuristic":
+        landmarks, tables = build_landmarks(graph, count, method)
+        return cls(tables, landmarks, graph.connectivity)
+
+    def __call__(self, node: Tuple, goal: Tuple) -> float:
+        if goal != self._goal:
+            distances = self.tables[goal[1], goal[0]].tolist()
+            self._goal_distances = [
+                (index, distance)
+                for index, distance in enumerate(distances)
+                if distance < inf
+            ]
+            self._goal = goal
+
+        estimate = self.fallback(node, goal)
+        if self._goal_distances:
+            distances = self.tables[node[1], node[0]].tolist()
+            bound = (
+                max(
+                    abs(distances[i] - distance) for i, distance in self._goal_distances
+                )
+                - self.slack
+            )
+            if bound > estimate:
+                return bound
+        return estimate
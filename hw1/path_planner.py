@@ -1,12 +1,23 @@
-import matplotlib.pyplot as plt
+from __future__ import annotations
 
-from graph_searches import dfs, bfs, dijkstra, random_planner, astar
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+
+from any_angle import lazy_theta_star, theta_star, waypoint_cells
+from graph_searches import dfs, frontier_bfs, dijkstra, random_planner, astar
 from hw0.obstacle_course import create_obstacle_grid
-from utils import (
-    create_adjacency_dict,
-    choose_start_and_end_loc,
-    create_adjacency_dict_for_weighted_graphs,
-)
+from grid import GridGraph
+from sampling import rrt, rrt_connect, sampled_path_cells
+from scenarios import ScenarioStore
+from utils import choose_start_and_end_loc
+
+# The rendering layer pulls in matplotlib and Pillow, so it is only imported
+# once an animation starts, leaving load_course and the planners headless
+if TYPE_CHECKING:
+    from PIL import Image
+
+    from rendering import SearchAnimation
 
 powder_blue = (182, 208, 226)
 cherry = (210, 4, 45)
@@ -15,202 +26,261 @@ kelly_green = (76, 187, 23)
 rosybrown = (188, 143, 143)
 
 
-def generate_bfs_output(grid_size: int, coverage: int):
-    # Create obstacle grid with desired size and coverage
-    grid = create_obstacle_grid(grid_size, coverage)
-
-    # Get graph representation from image
-    graph = create_adjacency_dict(grid)
+def load_course(
+    grid_size: int, coverage: int, seed: Optional[int], connectivity: int
+) -> Tuple[Image.Image, GridGraph]:
+    """
+    Obstacle course image and graph. Without a seed the course is made afresh
+    as always; with one it comes from the scenario store, made only the first
+    time, along with its component labels.
+    """
+    if seed is None:
+        grid = create_obstacle_grid(grid_size, coverage)
+        return grid, GridGraph.from_image(grid, connectivity=connectivity)
+    scenario = ScenarioStore().get(grid_size, coverage, seed)
+    return scenario.image(), scenario.graph(connectivity)
+
+
+def start_animation(
+    grid: Image,
+    start: Tuple,
+    end: Tuple,
+    output: Optional[str],
+    live: Optional[bool],
+    every: int,
+) -> SearchAnimation:
+    """
+    Animation of grid with the path ends placed on it. It exports to output
+    (.gif or .mp4) when given, keeping every n-th frame, and shows a live
+    window unless live is False; by default only when there is no output.
+    """
+    from rendering import SearchAnimation
+
+    if live is None:
+        live = output is None
+    animation = SearchAnimation(grid, output, live=live, every=every)
+    animation.paint([start], cherry)
+    animation.paint([end], forest_green)
+    animation.frame()
+    return animation
+
+
+def generate_bfs_output(
+    grid_size: int,
+    coverage: int,
+    output: Optional[str] = None,
+    live: Optional[bool] = None,
+    every: int = 1,
+    seed: Optional[int] = None,
+):
+    # Create obstacle grid with desired size and coverage, and its graph
+    grid, graph = load_course(grid_size, coverage, seed, connectivity=4)
 
     # Place path ends on graph
-    start, end = choose_start_and_end_loc(grid)
-    grid.putpixel(start, cherry)
-    grid.putpixel(end, forest_green)
-    plt.imshow(grid)
-
-    nodes_with_stages, path, visited = bfs(graph, start, end)
-
-    level_order = {}
-    for k, v in nodes_with_stages.items():
-        level_order[v] = level_order.get(v, []) + [k]
-
-    # Remove nodes that don't need plotting
-    level_order.pop(-1)  # Unassigned nodes (default level -1)
-    level_order.pop(0)  # start node
-    level_order.pop(nodes_with_stages.get(end))  # end node
-
-    # Traversal
-    for key, value in sorted(level_order.items()):
-        for coord in value:
-            grid.putpixel(coord, powder_blue)
-        plt.imshow(grid)
-        plt.pause(0.001)
-
-    # Final path
-    for node in path:
-        grid.putpixel(node, kelly_green)
-
-    plt.imshow(grid)
-    plt.show()
-    print("Iterations taken:", len(path))
-    count = 0
-    for node in visited.values():
-        if not node:
-            continue
-        count += 1
-    print("visited nodes:", count)
-
-
-def generate_dfs_output(grid_size: int, coverage: int):
-    # Create obstacle grid with desired size and coverage
-    grid = create_obstacle_grid(grid_size, coverage)
-
-    # Get graph representation from image
-    graph = create_adjacency_dict(grid)
+    start, end = choose_start_and_end_loc(grid, graph)
+    level, path, visited, stats = frontier_bfs(graph, start, end)
+
+    with start_animation(grid, start, end, output, live, every) as animation:
+        # Levels strictly between the start (level 0) and the end's level, so
+        # as not to overwrite the (start, end) color in the graph
+        end_level = (
+            level[end[1], end[0]] if visited[end[1], end[0]] else level.max() + 1
+        )
+
+        # Traversal, one frame per BFS level read straight off the level array
+        for depth in range(1, end_level):
+            animation.paint(level == depth, powder_blue)
+            animation.frame()
+
+        # Final path
+        animation.paint(path, kelly_green)
+    print(stats)
+
+
+def generate_dfs_output(
+    grid_size: int,
+    coverage: int,
+    output: Optional[str] = None,
+    live: Optional[bool] = None,
+    every: int = 1,
+    seed: Optional[int] = None,
+):
+    # Create obstacle grid with desired size and coverage, and its graph
+    grid, graph = load_course(grid_size, coverage, seed, connectivity=4)
 
     # Place path ends on graph
-    start, end = choose_start_and_end_loc(grid)
-    grid.putpixel(start, cherry)
-    grid.putpixel(end, forest_green)
-    plt.imshow(grid)
+    start, end = choose_start_and_end_loc(grid, graph)
+    traversal, path, stats = dfs(graph, start, end)
+
+    with start_animation(grid, start, end, output, live, every) as animation:
+        # Traversal, without the ends so as not to overwrite their color
+        for coord in traversal[1:-1]:
+            animation.paint([coord], powder_blue)
+            animation.frame()
+
+        # Final path
+        animation.paint(path, kelly_green)
+    print(stats)
+
+
+def generate_random_traversal_output(
+    grid_size: int,
+    coverage: int,
+    output: Optional[str] = None,
+    live: Optional[bool] = None,
+    every: int = 1,
+    seed: Optional[int] = None,
+):
+    # Create obstacle grid with desired size and coverage, and its graph
+    grid, graph = load_course(grid_size, coverage, seed, connectivity=4)
 
-    traversal, path = dfs(graph, start, end)
+    # Place path ends on graph
+    start, end = choose_start_and_end_loc(grid, graph)
+    path, stats = random_planner(graph, start, end)
 
     # Remove ends so as not to overwrite the (start, end) color in the graph
-    traversal.pop(0)
-    traversal.pop()
-
-    # Traversal
-    for coord in traversal:
-        grid.putpixel(coord, powder_blue)
-        plt.imshow(grid)
-        plt.pause(0.001)
-
-    # Final path
-    for node in path:
-        grid.putpixel(node, kelly_green)
-
-    plt.imshow(grid)
-    plt.show()
-    print("Iterations taken:", len(path))
-
-
-def generate_random_traversal_output(grid_size: int, coverage: int):
-    # Create obstacle grid with desired size and coverage
-    grid = create_obstacle_grid(grid_size, coverage)
-
-    # Get graph representation from image
-    graph = create_adjacency_dict(grid)
+    path = path[1:-1]
+
+    with start_animation(grid, start, end, output, live, every) as animation:
+        # Traversal
+        for coord in path:
+            animation.paint([coord], powder_blue)
+            animation.frame()
+
+        # Final path
+        animation.paint(path, kelly_green)
+    print(stats)
+
+
+def generate_dijkstras_output(
+    grid_size: int,
+    coverage: int,
+    output: Optional[str] = None,
+    live: Optional[bool] = None,
+    every: int = 1,
+    seed: Optional[int] = None,
+):
+    # Create obstacle grid with desired size and coverage, and its graph
+    grid, graph = load_course(grid_size, coverage, seed, connectivity=8)
 
     # Place path ends on graph
-    start, end = choose_start_and_end_loc(grid)
-    # end = (10, 6)
-    grid.putpixel(start, cherry)
-    grid.putpixel(end, forest_green)
-    plt.imshow(grid)
+    start, end = choose_start_and_end_loc(grid, graph)
+    cost, parent, path, stats = dijkstra(graph, start, end)
+
+    # Settled nodes without the path ends, so as not to overwrite the
+    # (start, end) color in the graph, and the unit-cost band of each
+    settled = [node for node in cost if node not in (start, end)]
+    nodes = np.array(settled, dtype=np.intp).reshape(-1, 2)
+    bands = np.array([cost[node] for node in settled]).astype(int)
+
+    with start_animation(grid, start, end, output, live, every) as animation:
+        # Traversal, one frame per band to animate the wavefront
+        for band in np.unique(bands):
+            animation.paint(nodes[bands == band], powder_blue)
+            animation.frame()
+
+        # Final path
+        animation.paint(path[1:-1], kelly_green)
+    print(stats)
+
+
+def generate_astar_output(
+    grid_size: int,
+    coverage: int,
+    output: Optional[str] = None,
+    live: Optional[bool] = None,
+    every: int = 1,
+    seed: Optional[int] = None,
+):
+    # Create obstacle grid with desired size and coverage, and its graph
+    grid, graph = load_course(grid_size, coverage, seed, connectivity=8)
 
-    path = random_planner(graph, start, end)
+    # Place path ends on graph
+    start, end = choose_start_and_end_loc(grid, graph)
+    expanded = []
+    path, cost, stats = astar(graph, start, end, on_expand=expanded.append)
 
     # Remove ends so as not to overwrite the (start, end) color in the graph
-    path.pop(0)
-    path.pop()
-
-    # Traversal
-    for coord in path:
-        grid.putpixel(coord, powder_blue)
-        plt.imshow(grid)
-        plt.pause(0.001)
-
-    # Final path
-    for node in path:
-        grid.putpixel(node, kelly_green)
-
-    plt.imshow(grid)
-    plt.show()
-
-
-def generate_dijkstras_output(grid_size: int, coverage: int):
-    # Create obstacle grid with desired size and coverage
-    grid = create_obstacle_grid(grid_size, coverage)
-
-    # Get graph representation from image
-    graph = create_adjacency_dict_for_weighted_graphs(grid)
+    expanded = expanded[1:-1]
+
+    with start_animation(grid, start, end, output, live, every) as animation:
+        # Traversal, one frame per batch with the latest expansion highlighted
+        for index in range(0, len(expanded), grid_size):
+            batch = expanded[index : index + grid_size]
+            animation.paint(batch, powder_blue)
+            animation.paint(batch[-1:], rosybrown)
+            animation.frame()
+            animation.paint(batch[-1:], powder_blue)
+
+        # Final path
+        animation.paint(path[1:-1], kelly_green)
+    print(stats)
+
+
+def generate_theta_star_output(
+    grid_size: int,
+    coverage: int,
+    output: Optional[str] = None,
+    live: Optional[bool] = None,
+    every: int = 1,
+    seed: Optional[int] = None,
+    lazy: bool = False,
+):
+    # Create obstacle grid with desired size and coverage, and its graph
+    grid, graph = load_course(grid_size, coverage, seed, connectivity=8)
 
     # Place path ends on graph
-    start, end = choose_start_and_end_loc(grid)
-    grid.putpixel(start, cherry)
-    grid.putpixel(end, forest_green)
-    plt.imshow(grid)
+    start, end = choose_start_and_end_loc(grid, graph)
+    expanded = []
+    search = lazy_theta_star if lazy else theta_star
+    waypoints, cost, stats = search(graph, start, end, on_expand=expanded.append)
 
-    nodes_with_stages, path, visited = dijkstra(graph, start, end)
-
-    level_order = {}
-    for k, v in nodes_with_stages.items():
-        level_order[v] = level_order.get(v, []) + [k]
-
-    # Remove nodes that don't need plotting
-    level_order.pop(-1)  # Unassigned nodes (default level -1)
-    level_order.pop(0)  # start node
-    level_order.pop(nodes_with_stages.get(end))  # end node
-
-    # Traversal
-    for key, value in sorted(level_order.items()):
-        for coord in value:
-            grid.putpixel(coord, powder_blue)
-            plt.imshow(grid)
-        plt.pause(0.001)
-
-    # Final path
-    for node in path:
-        grid.putpixel(node, kelly_green)
-
-    plt.imshow(grid)
-    plt.show()
-
-
-def generate_astar_output(grid_size: int, coverage: int):
-    # Create obstacle grid with desired size and coverage
-    grid = create_obstacle_grid(grid_size, coverage)
-
-    # Get graph representation from image
-    graph = create_adjacency_dict_for_weighted_graphs(grid)
+    # Remove ends so as not to overwrite the (start, end) color in the graph
+    expanded = expanded[1:-1]
+
+    with start_animation(grid, start, end, output, live, every) as animation:
+        # Traversal, one frame per batch as for A*
+        for index in range(0, len(expanded), grid_size):
+            animation.paint(expanded[index : index + grid_size], powder_blue)
+            animation.frame()
+
+        # Final path, the cells along its segments with the turns highlighted
+        animation.paint(waypoint_cells(waypoints)[1:-1], kelly_green)
+        animation.paint(waypoints[1:-1], rosybrown)
+    print(stats)
+
+
+def generate_rrt_output(
+    grid_size: int,
+    coverage: int,
+    output: Optional[str] = None,
+    live: Optional[bool] = None,
+    every: int = 1,
+    seed: Optional[int] = None,
+    connect: bool = False,
+):
+    # Create obstacle grid with desired size and coverage, and its graph
+    grid, graph = load_course(grid_size, coverage, seed, connectivity=8)
 
     # Place path ends on graph
-    start, end = choose_start_and_end_loc(grid)
-    grid.putpixel(start, cherry)
-    grid.putpixel(end, forest_green)
-    plt.imshow(grid)
-
-    nodes_with_stages, path = astar(graph, start, end)
-
-    level_order = {}
-    for k, v in nodes_with_stages.items():
-        level_order[v] = level_order.get(v, []) + [k]
-
-    # Remove nodes that don't need plotting
-    level_order.pop(0)
-    level_order.pop(-1)
-
-    # Remove path ends so as not to overwrite the color in the graph
-    path.pop(0)
-
-    # Traversal
-    index = 0
-    for key, value in sorted(level_order.items()):
-        for coord in value:
-            grid.putpixel(coord, powder_blue)
-        grid.putpixel(path[index], rosybrown)
-        plt.imshow(grid)
-        plt.pause(0.001)
-        index += 1
-
-    # Final path
-    for node in path:
-        grid.putpixel(node, kelly_green)
-
-    grid.putpixel(end, forest_green)
-    plt.imshow(grid)
-    plt.show()
+    start, end = choose_start_and_end_loc(grid, graph)
+    nodes = []
+    search = rrt_connect if connect else rrt
+    waypoints, cost, stats = search(
+        graph, start, end, seed=seed, on_generate=nodes.append
+    )
+
+    with start_animation(grid, start, end, output, live, every) as animation:
+        # Tree growth, one frame per batch of nodes at their nearest cells
+        cells = [(round(x), round(y)) for x, y in nodes]
+        cells = [cell for cell in cells if cell not in (start, end)]
+        for index in range(0, len(cells), 10):
+            animation.paint(cells[index : index + 10], powder_blue)
+            animation.frame()
+
+        # Final path
+        animation.paint(sampled_path_cells(waypoints)[1:-1], kelly_green)
+    print(stats)
 
 
 if __name__ == "__main__":
@@ -221,3 +291,11 @@ if __name__ == "__main__":
     # generate_dijkstras_output(grid_size, coverage)
     # generate_random_traversal_output(grid_size, coverage)
     generate_astar_output(grid_size, coverage)
+    # generate_theta_star_output(grid_size, coverage)
+    # generate_rrt_output(grid_size, coverage, connect=True)
+
+    # Headless export, keeping every other frame, e.g. to refresh media/
+    # generate_bfs_output(grid_size, coverage, output="media/bfs.gif", every=2)
+
+    # Same course on every run, made once and then loaded from the store
+    # generate_astar_output(grid_size, coverage, seed=100)
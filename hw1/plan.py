@@ -0,0 +1,147 @@
+"""
+Headless command line planner: runs any of the planners in batch_planning on
+seeded obstacle courses or on a course file, without a display and without
+importing matplotlib. Run with the PYTHONPATH set up as in the README:
+
+    python hw1/plan.py --planners astar jps --size 512 --coverage 20 --connectivity 8
+    python hw1/plan.py --file map.npy --start 0 0 --goal 99 99 --image path.png
+
+Without --start and --goal, --queries pairs of cells that reach each other
+are drawn for the seed. Prints one line per planner and query.
+"""
+
+import argparse
+import json
+import sys
+from math import inf
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from any_angle import waypoint_cells
+from batch_planning import PLANNERS, run_query
+from grid import load_occupancy, occupancy_from_image
+from sampling import sampled_path_cells
+from scenarios import Scenario, ScenarioStore
+
+# Planners whose paths are waypoints rather than adjacent cells
+WAYPOINT_PLANNERS = {
+    "theta_star": waypoint_cells,
+    "lazy_theta_star": waypoint_cells,
+    "rrt": sampled_path_cells,
+    "rrt_connect": sampled_path_cells,
+}
+
+
+def load_scenario(args: argparse.Namespace, store: ScenarioStore) -> Scenario:
+    """
+    The course named by the command line: a seeded course from the store, or
+    a .npy occupancy or obstacle course image added to it.
+    """
+    if args.file is None:
+        return store.get(args.size, args.coverage, args.seed, batch=True)
+    if args.file.endswith(".npy"):
+        return store.put(load_occupancy(args.file))
+
+    from PIL import Image
+
+    with Image.open(args.file) as image:
+        return store.put(occupancy_from_image(image))
+
+
+def path_cells(planner: str, path: List) -> List:
+    """
+    The cells a planner's path covers, for drawing it.
+    """
+    if planner in WAYPOINT_PLANNERS:
+        return WAYPOINT_PLANNERS[planner](path)
+    return path
+
+
+def save_image(path: str, occupied: np.ndarray, records: List[Dict]) -> None:
+    """
+    Writes the course with each record's path and ends drawn on it, in the
+    colours of path_planner.
+    """
+    from hw0.obstacle_course import occupancy_to_image
+    from path_planner import cherry, forest_green, kelly_green
+
+    image = occupancy_to_image(occupied)
+    for record in records:
+        for cell in path_cells(record["planner"], record["path"])[1:-1]:
+            image.putpixel(tuple(map(round, cell)), kelly_green)
+        image.putpixel(tuple(record["start"]), cherry)
+        image.putpixel(tuple(record["goal"]), forest_green)
+    image.save(path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--planners", nargs="+", default=["astar"], choices=PLANNERS)
+    parser.add_argument("--size", type=int, default=128, help="grid size")
+    parser.add_argument(
+        "--coverage", type=int, default=20, help="obstacle coverage in percent"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="course and query seed")
+    parser.add_argument("--file", help="plan on this .npy occupancy or image instead")
+    parser.add_argument("--connectivity", type=int, default=4, choices=(4, 8))
+    parser.add_argument("--queries", type=int, default=1, help="random queries")
+    parser.add_argument("--start", type=int, nargs=2, metavar=("X", "Y"))
+    parser.add_argument("--goal", type=int, nargs=2, metavar=("X", "Y"))
+    parser.add_argument("--json", help="write the results, paths included, here")
+    parser.add_argument(
+        "--image", help="save the course with the first planner's paths drawn"
+    )
+    args = parser.parse_args(argv)
+    if (args.start is None) != (args.goal is None):
+        parser.error("--start and --goal go together")
+
+    scenario = load_scenario(args, ScenarioStore())
+    graph = scenario.graph(args.connectivity)
+    if args.start is not None:
+        queries = [(tuple(args.start), tuple(args.goal))]
+        for node in queries[0]:
+            if not graph.is_free(node):
+                parser.error(f"{node} is not a free cell of the course")
+    else:
+        pairs = scenario.pairs(args.queries, args.connectivity, args.seed)
+        queries = [(tuple(start), tuple(goal)) for start, goal in pairs.tolist()]
+
+    records = []
+    for planner in args.planners:
+        for index, (start, goal) in enumerate(queries):
+            try:
+                path, cost, stats = run_query(graph, planner, start, goal)
+            except ValueError as error:  # Such as jps on a 4-connected grid
+                print(f"{planner:>22} {error}")
+                break
+            records.append(
+                {
+                    "planner": planner,
+                    "query": index,
+                    "start": list(start),
+                    "goal": list(goal),
+                    "path_cost": cost if cost < inf else None,
+                    "path_length": len(path),
+                    "expanded": stats.expanded,
+                    "seconds": stats.wall_time,
+                    "path": [list(node) for node in path],
+                }
+            )
+            print(
+                f"{planner:>22} {index:>3} {str(start):>12} -> {str(goal):<12} "
+                f"cost {cost:>9.2f} {stats.expanded:>9} exp "
+                f"{stats.wall_time * 1000:>9.2f}ms"
+            )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(records, file)
+    if args.image:
+        first = [record for record in records if record["planner"] == args.planners[0]]
+        save_image(args.image, scenario.occupied, first)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,725 @@
+"""
+Long-lived local planning service. Keeps obstacle courses in shared memory
+and answers start/goal queries over a Unix socket or localhost TCP, running
+the planners in graph_searches on a pool of worker processes. Run with the
+PYTHONPATH set up as in the README:
+
+    python hw1/planning_service.py --socket /tmp/planner.sock --grid course=512:20:0
+
+The protocol is one JSON object per line each way. Every request carries an
+"id" that its response repeats, and responses come back as they finish, not
+in request order:
+
+    {"id": 1, "op": "plan", "grid": "course", "start": [0, 0], "goal": [9, 9],
+     "planner": "astar", "connectivity": 4, "timeout": 2.5}
+    {"id": 2, "op": "cancel", "target": 1}
+    {"id": 3, "op": "load", "grid": "maze", "size": 256, "coverage": 30, "seed": 1}
+    {"id": 4, "op": "load", "grid": "map", "file": "map.npy"}
+    {"id": 5, "op": "unload", "grid": "maze"}
+    {"id": 6, "op": "grids"}
+    {"id": 7, "op": "stats"}
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_planning import PLANNERS, WORKSPACE_PLANNERS, run_query
+from grid import GridGraph, load_occupancy, occupancy_from_image
+from scenarios import ScenarioStore
+from search_stats import SearchStats
+from workspace import SearchWorkspace
+
+# Expansions between checks of a query's cancel flag and deadline
+CHECK_EVERY = 64
+# Courses each worker keeps attached, least recently used dropped first
+WORKER_GRIDS = 8
+# Latencies kept for the percentiles in the stats
+LATENCY_WINDOW = 10000
+# Seconds of recent answers the current throughput is measured over
+THROUGHPUT_WINDOW = 10.0
+
+# Set up in each pool worker
+_worker_flags = None
+_worker_grids = OrderedDict()  # Shared memory name -> (memory, {connectivity: ...})
+
+
+class SearchCancelled(Exception):
+    """
+    Raised from a search's on_expand to stop it mid-expansion once its query
+    is cancelled or past its deadline.
+    """
+
+
+def _attach_flags(name: str) -> None:
+    """
+    Pool initializer: maps the cancel flags the service sets, one byte per
+    request slot.
+    """
+    global _worker_flags
+    _worker_flags = SharedMemory(name=name)
+
+
+def _worker_graph(
+    name: str, shape: Tuple[int, int], connectivity: int
+) -> Tuple[GridGraph, SearchWorkspace]:
+    """
+    GridGraph over the course in shared memory block name, with a workspace
+    for it, attached on first use and kept for the queries after.
+    """
+    entry = _worker_grids.get(name)
+    if entry is None:
+        memory = SharedMemory(name=name)
+        entry = _worker_grids[name] = memory, {}
+        while len(_worker_grids) > WORKER_GRIDS:
+            _worker_grids.popitem(last=False)  # Unmapped once unreferenced
+    else:
+        _worker_grids.move_to_end(name)
+
+    memory, graphs = entry
+    if connectivity not in graphs:
+        occupied = np.ndarray(shape, dtype=bool, buffer=memory.buf)
+        graph = GridGraph(occupied, connectivity)
+        graphs[connectivity] = graph, SearchWorkspace.for_graph(graph)
+    return graphs[connectivity]
+
+
+def _plan_batch(
+    name: str,
+    shape: Tuple[int, int],
+    connectivity: int,
+    planner: str,
+    queries: List[Tuple[int, Tuple, Tuple, float]],
+) -> List[Tuple[str, List, float, Optional[SearchStats]]]:
+    """
+    Runs in a worker: answers (slot, start, goal, deadline) queries one after
+    the other, returning (status, path, cost, stats) for each. A query whose
+    slot is flagged or whose deadline, a time.time() reading, has passed is
+    skipped, or stopped within CHECK_EVERY expansions if already running.
+    """
+    graph, workspace = _worker_graph(name, shape, connectivity)
+    options = {"workspace": workspace} if planner in WORKSPACE_PLANNERS else {}
+    flags = _worker_flags.buf
+    results = []
+    for slot, start, goal, deadline in queries:
+        expanded = 0
+
+        def checkpoint(node: Tuple) -> None:
+            nonlocal expanded
+            expanded += 1
+            if expanded % CHECK_EVERY == 0 and (flags[slot] or time.time() >= deadline):
+                raise SearchCancelled
+
+        if flags[slot] or time.time() >= deadline:
+            results.append(("stopped", [], math.inf, None))
+            continue
+        try:
+            path, cost, stats = run_query(
+                graph, planner, start, goal, on_expand=checkpoint, **options
+            )
+        except SearchCancelled:
+            results.append(("stopped", [], math.inf, None))
+        except Exception as error:
+            results.append(("error", [], math.inf, f"{type(error).__name__}: {error}"))
+        else:
+            results.append(("ok", path, cost, stats))
+    return results
+
+
+@dataclass
+class PlanRequest:
+    """
+    One query waiting for, or being planned by, the service. future resolves
+    to (status, path, cost, stats), where status is "ok", "cancelled",
+    "timeout" or "error" (with the message in place of the stats).
+    """
+
+    grid: str
+    planner: str
+    connectivity: int
+    start: Tuple[int, int]
+    goal: Tuple[int, int]
+    deadline: float  # time.time() reading
+    slot: int
+    future: asyncio.Future
+    received: float = field(default_factory=time.perf_counter)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class ServiceCounters:
+    """
+    Running totals of what a PlanningService answered, with the latency of
+    the most recent planned queries for percentiles and throughput, in
+    queries planned per second.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.answered = {"ok": 0, "cancelled": 0, "timeout": 0, "error": 0}
+        self.rejected = 0
+        self.batches = 0
+        self.batched = 0
+        self.expanded = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # (answered at, seconds)
+
+    def answer(self, status: str, latency: float, stats) -> None:
+        self.answered[status] += 1
+        if status == "ok":
+            self.latencies.append((time.perf_counter(), latency))
+            self.expanded += stats.expanded
+
+    def snapshot(self) -> Dict:
+        now = time.perf_counter()
+        uptime = now - self.started
+        latencies = sorted(latency for _, latency in self.latencies)
+        recent = sum(1 for at, _ in self.latencies if now - at <= THROUGHPUT_WINDOW)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+        return {
+            "uptime": uptime,
+            "requests": self.requests,
+            "answered": dict(self.answered),
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "mean_batch": self.batched / self.batches if self.batches else 0.0,
+            "expanded": self.expanded,
+            "throughput": self.answered["ok"] / uptime if uptime else 0.0,
+            "recent_throughput": recent / min(uptime, THROUGHPUT_WINDOW),
+            "latency_p50": percentile(0.5),
+            "latency_p90": percentile(0.9),
+            "latency_p99": percentile(0.99),
+            "latency_max": latencies[-1] if latencies else None,
+        }
+
+
+class PlanningService:
+    """
+    Plans start/goal queries on named courses held in shared memory, over a
+    pool of worker processes that each attach a course once and keep its
+    GridGraph, component labels and SearchWorkspace between queries.
+
+    Queries on the same course, planner and connectivity queue together. A
+    worker that comes free takes up to max_batch of the queue whose oldest
+    query has waited longest, so a lightly loaded service answers each query
+    straight away while a busy one sends fewer, larger tasks.
+
+    Every query has a deadline, timeout seconds after it arrives. At the
+    deadline, or on cancel(), it is answered straight away and a flag shared
+    with the workers stops its search within CHECK_EVERY expansions, or keeps
+    it from starting. At most max_pending queries are waiting or running at
+    once; beyond that submit() rejects them.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        max_batch: int = 32,
+        max_pending: int = 4096,
+        timeout: float = 10.0,
+        store: Optional[ScenarioStore] = None,
+    ):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.store = store
+        self.counters = ServiceCounters()
+        self.grids = {}  # name -> (shared memory, shape)
+        self._flags = SharedMemory(create=True, size=max_pending)
+        self._flags.buf[:] = bytes(max_pending)
+        self._free_slots = deque(range(max_pending))
+        self._queues = {}  # (grid, planner, connectivity) -> deque of PlanRequest
+        self._in_flight = 0
+        self._closed = False
+        self._pool = ProcessPoolExecutor(
+            self.processes, initializer=_attach_flags, initargs=(self._flags.name,)
+        )
+
+    def load(self, name: str, occupied: np.ndarray) -> None:
+        """
+        Copies an occupancy array indexed as [y, x] into shared memory under
+        name, replacing any course loaded as name before.
+        """
+        occupied = np.ascontiguousarray(occupied, dtype=bool)
+        memory = SharedMemory(create=True, size=max(occupied.nbytes, 1))
+        np.ndarray(occupied.shape, dtype=bool, buffer=memory.buf)[...] = occupied
+        self.unload(name)
+        self.grids[name] = memory, occupied.shape
+
+    def unload(self, name: str) -> bool:
+        """
+        Drops a course. Queries still waiting for it are answered with an
+        error, while workers that attached it finish from their own mapping.
+        """
+        entry = self.grids.pop(name, None)
+        if entry is None:
+            return False
+        for key in [key for key in self._queues if key[0] == name]:
+            for request in self._queues.pop(key):
+                self._answer(request, ("error", [], math.inf, f"{name} was unloaded"))
+                self._release(request.slot)
+        memory, _ = entry
+        memory.close()
+        memory.unlink()
+        return True
+
+    def submit(
+        self,
+        grid: str,
+        start: Sequence[int],
+        goal: Sequence[int],
+        planner: str = "astar",
+        connectivity: int = 4,
+        timeout: Optional[float] = None,
+    ) -> PlanRequest:
+        """
+        Queues a query and returns its PlanRequest, whose future resolves to
+        the answer. Raises ValueError for a query that can't be planned, and
+        RuntimeError when max_pending queries are outstanding.
+        """
+        self.counters.requests += 1
+        if grid not in self.grids:
+            raise ValueError(f"No course named {grid!r} is loaded")
+        if planner not in PLANNERS:
+            raise ValueError(f"Unknown planner {planner!r}, expected one of {PLANNERS}")
+        if connectivity not in (4, 8):
+            raise ValueError(f"connectivity must be 4 or 8, got {connectivity}")
+        _, (height, width) = self.grids[grid]
+        start, goal = tuple(map(int, start)), tuple(map(int, goal))
+        for node in (start, goal):
+            if len(node) != 2 or not (0 <= node[0] < width and 0 <= node[1] < height):
+                raise ValueError(f"{node} is not a cell of {grid!r}")
+        if not self._free_slots:
+            self.counters.rejected += 1
+            raise RuntimeError("Too many queries outstanding")
+
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        request = PlanRequest(
+            grid,
+            planner,
+            connectivity,
+            start,
+            goal,
+            time.time() + timeout,
+            self._free_slots.popleft(),
+            loop.create_future(),
+        )
+        request.timer = loop.call_later(timeout, self._stop, request, "timeout")
+        self._queues.setdefault((grid, planner, connectivity), deque()).append(request)
+        self._dispatch()
+        return request
+
+    async def plan(self, *args, **kwargs) -> Tuple[str, List, float, object]:
+        """
+        submit() and wait for the answer, cancelling the query if the caller
+        is cancelled.
+        """
+        request = self.submit(*args, **kwargs)
+        try:
+            return await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            self.cancel(request)
+            raise
+
+    def cancel(self, request: PlanRequest) -> bool:
+        """
+        Stops a query, returning False if it was already answered.
+        """
+        return self._stop(request, "cancelled")
+
+    def stats(self) -> Dict:
+        snapshot = self.counters.snapshot()
+        snapshot["waiting"] = sum(len(queue) for queue in self._queues.values())
+        snapshot["running_batches"] = self._in_flight
+        snapshot["processes"] = self.processes
+        return snapshot
+
+    def close(self) -> None:
+        """
+        Stops every query and the workers, and frees the shared memory.
+        """
+        self._closed = True
+        self._flags.buf[:] = b"\x01" * self._flags.size
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        for name in list(self.grids):
+            for key in [key for key in self._queues if key[0] == name]:
+                for request in self._queues.pop(key):
+                    self._answer(request, ("cancelled", [], math.inf, None))
+            self.unload(name)
+        self._flags.close()
+        self._flags.unlink()
+
+    def _stop(self, request: PlanRequest, status: str) -> bool:
+        if request.future.done():
+            return False
+        if not self._closed:
+            self._flags.buf[request.slot] = 1
+        self._answer(request, (status, [], math.inf, None))
+        return True
+
+    def _answer(self, request: PlanRequest, result: Tuple) -> None:
+        if request.future.done():
+            return
+        if request.timer is not None:
+            request.timer.cancel()
+        request.future.set_result(result)
+        status, _, _, stats = result
+        self.counters.answer(status, time.perf_counter() - request.received, stats)
+
+    def _release(self, slot: int) -> None:
+        self._flags.buf[slot] = 0
+        self._free_slots.append(slot)
+
+    def _dispatch(self) -> None:
+        """
+        Hands batches to idle workers, oldest waiting query first.
+        """
+        loop = asyncio.get_running_loop()
+        while self._in_flight < self.processes and self._queues:
+            key = min(self._queues, key=lambda key: self._queues[key][0].received)
+            queue = self._queues[key]
+            batch = []
+            while queue and len(batch) < self.max_batch:
+                request = queue.popleft()
+                if request.future.done():  # Cancelled or timed out while waiting
+                    self._release(request.slot)
+                else:
+                    batch.append(request)
+            if not queue:
+                del self._queues[key]
+            if not batch:
+                continue
+
+            grid, planner, connectivity = key
+            memory, shape = self.grids[grid]
+            queries = [
+                (request.slot, request.start, request.goal, request.deadline)
+                for request in batch
+            ]
+            self._in_flight += 1
+            self.counters.batches += 1
+            self.counters.batched += len(batch)
+            task = loop.run_in_executor(
+                self._pool,
+                _plan_batch,
+                memory.name,
+                shape,
+                connectivity,
+                planner,
+                queries,
+            )
+            task.add_done_callback(lambda task, batch=batch: self._finish(batch, task))
+
+    def _finish(self, batch: List[PlanRequest], task: asyncio.Future) -> None:
+        self._in_flight -= 1
+        if self._closed:  # The flags are gone, and the queries were stopped
+            for request in batch:
+                self._answer(request, ("cancelled", [], math.inf, None))
+            return
+        try:
+            results = task.result()
+        except Exception as error:  # A worker died, or the course went away
+            message = f"{type(error).__name__}: {error}"
+            results = [("error", [], math.inf, message)] * len(batch)
+        for request, result in zip(batch, results):
+            if result[0] != "stopped":
+                self._answer(request, result)
+            self._release(request.slot)
+        self._dispatch()
+
+    async def handle(self, message: Dict) -> Dict:
+        """
+        Answers a load, unload, grids or stats message, as described at the
+        top of this module.
+        """
+        op = message.get("op")
+        if op == "load":
+            loop = asyncio.get_running_loop()
+            occupied = await loop.run_in_executor(None, self._read_course, message)
+            self.load(message["grid"], occupied)
+            return {"shape": list(occupied.shape)}
+        if op == "unload":
+            return {"unloaded": self.unload(message["grid"])}
+        if op == "grids":
+            grids = {name: list(shape) for name, (_, shape) in self.grids.items()}
+            return {"grids": grids}
+        if op == "stats":
+            return self.stats()
+        raise ValueError(f"Unknown op {op!r}")
+
+    def _read_course(self, message: Dict) -> np.ndarray:
+        """
+        Occupancy for a load message: an .npy file or obstacle course image,
+        or the course a ScenarioStore makes for size, coverage and seed.
+        """
+        if "file" in message:
+            if message["file"].endswith(".npy"):
+                return np.array(load_occupancy(message["file"]))
+            from PIL import Image
+
+            with Image.open(message["file"]) as image:
+                return occupancy_from_image(image)
+        if self.store is None:
+            self.store = ScenarioStore()
+        scenario = self.store.get(
+            message["size"], message["coverage"], message.get("seed", 0), batch=True
+        )
+        return np.array(scenario.occupied)
+
+    async def _response(self, request: PlanRequest) -> Dict:
+        status, path, cost, stats = await asyncio.shield(request.future)
+        response = {"status": status}
+        if status == "error":
+            response["error"] = stats
+        elif status == "ok":
+            response["path"] = [list(node) for node in path]
+            response["cost"] = cost if cost < math.inf else None
+            response["stats"] = {
+                key: value if value != math.inf else None
+                for key, value in asdict(stats).items()
+                if not key.startswith("_")
+            }
+        response["latency"] = time.perf_counter() - request.received
+        return response
+
+    async def serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Reads messages off one connection until it closes, answering each
+        concurrently. Queries still outstanding when it closes are cancelled.
+        """
+        outstanding = {}  # id -> PlanRequest for this connection's queries
+        tasks = set()
+
+        def send(response: Dict) -> None:
+            if not writer.is_closing():
+                writer.write(json.dumps(response).encode() + b"\n")
+
+        async def reply(message: Dict) -> None:
+            request_id = message.get("id")
+            try:
+                op = message.get("op", "plan")
+                if op == "plan":
+                    request = self.submit(
+                        message["grid"],
+                        message["start"],
+                        message["goal"],
+                        message.get("planner", "astar"),
+                        message.get("connectivity", 4),
+                        message.get("timeout"),
+                    )
+                    outstanding[request_id] = request
+                    try:
+                        response = await self._response(request)
+                    finally:
+                        outstanding.pop(request_id, None)
+                elif op == "cancel":
+                    request = outstanding.get(message.get("target"))
+                    response = {
+                        "cancelled": request is not None and self.cancel(request)
+                    }
+                else:
+                    response = await self.handle(message)
+            except (KeyError, TypeError, ValueError, RuntimeError, OSError) as error:
+                response = {
+                    "status": "error",
+                    "error": f"{type(error).__name__}: {error}",
+                }
+            send({**response, "id": request_id})
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except ValueError as error:
+                    send({"status": "error", "error": f"Bad message: {error}"})
+                    continue
+                if not isinstance(message, dict):
+                    send({"status": "error", "error": "Messages are JSON objects"})
+                    continue
+                # Tasks start in order, so a query is registered before any
+                # cancel read after it is handled
+                task = asyncio.create_task(reply(message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Closed by the client, or by the server shutting down
+        finally:
+            for request in list(outstanding.values()):
+                self.cancel(request)
+            for task in list(tasks):
+                task.cancel()
+            writer.close()
+
+    async def serve(
+        self, path: Optional[str] = None, host: str = "127.0.0.1", port: int = 8550
+    ) -> asyncio.AbstractServer:
+        """
+        Starts listening on the Unix socket at path, or on host and port, and
+        returns the asyncio server.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.serve_connection, path)
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+
+class PlanningClient:
+    """
+    asyncio client for a PlanningService, sending any number of messages over
+    one connection without waiting for the answers in between.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting = {}  # id -> future for the response
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(
+        cls, path: Optional[str] = None, host: str = "127.0.0.1", port: int = 8550
+    ) -> "PlanningClient":
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    def send(self, message: Dict) -> Tuple[int, asyncio.Future]:
+        """
+        Sends message under a new id and returns the id with a future for the
+        response, for queries that may be cancelled by id later.
+        """
+        request_id = next(self._ids)
+        line = json.dumps({**message, "id": request_id}).encode() + b"\n"
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(line)
+        return request_id, future
+
+    async def request(self, message: Dict) -> Dict:
+        _, future = self.send(message)
+        await self._writer.drain()
+        return await future
+
+    async def plan(self, grid: str, start: Sequence, goal: Sequence, **options) -> Dict:
+        """
+        Plans one query; options are planner, connectivity and timeout.
+        """
+        start, goal = list(map(int, start)), list(map(int, goal))
+        message = {"op": "plan", "grid": grid, "start": start, "goal": goal}
+        return await self.request({**message, **options})
+
+    async def cancel(self, request_id: int) -> bool:
+        return (await self.request({"op": "cancel", "target": request_id}))["cancelled"]
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._receiver.cancel()
+
+    async def _receive(self) -> None:
+        try:
+            while line := await self._reader.readline():
+                response = json.loads(line)
+                future = self._waiting.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+
+
+def parse_grid(spec: str) -> Tuple[str, Dict]:
+    """
+    NAME=SIZE:COVERAGE[:SEED] or NAME=FILE from the command line, as a name and
+    a load message.
+    """
+    name, _, source = spec.partition("=")
+    if not name or not source:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=SIZE:COVERAGE[:SEED] or NAME=FILE, got {spec!r}"
+        )
+    parts = source.split(":")
+    if all(part.isdigit() for part in parts) and len(parts) in (2, 3):
+        size, coverage, seed = (list(map(int, parts)) + [0])[:3]
+        return name, {"grid": name, "size": size, "coverage": coverage, "seed": seed}
+    return name, {"grid": name, "file": source}
+
+
+async def run_service(args: argparse.Namespace) -> None:
+    service = PlanningService(args.processes, args.max_batch, timeout=args.timeout)
+    try:
+        for _, message in args.grid:
+            response = await service.handle({"op": "load", **message})
+            height, width = response["shape"]
+            print(f"Loaded {message['grid']}, {width}x{height}")
+        server = await service.serve(args.socket, args.host, args.port)
+        where = args.socket or f"{args.host}:{args.port}"
+        print(f"Planning on {service.processes} processes, listening on {where}")
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        async with server:
+            await stop.wait()
+    finally:
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--socket", help="listen on this Unix socket")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host without --socket")
+    parser.add_argument(
+        "--port", type=int, default=8550, help="TCP port without --socket"
+    )
+    parser.add_argument(
+        "--grid",
+        type=parse_grid,
+        action="append",
+        default=[],
+        help="course to load, NAME=SIZE:COVERAGE[:SEED] or NAME=FILE",
+    )
+    parser.add_argument("--processes", type=int, help="worker processes")
+    parser.add_argument(
+        "--max_batch",
+        type=int,
+        default=32,
+        help="most queries sent to a worker at once",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=10.0, help="default query deadline in seconds"
+    )
+    args = parser.parse_args(argv)
+    asyncio.run(run_service(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+from typing import Iterable, List, Optional, Tuple, Union
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib import animation
+from matplotlib.figure import Figure
+from PIL import Image
+
+from hw0.obstacle_course import occupancy_to_image
+
+# Longer side of exported frames in pixels, as in the recordings in media/
+MEDIA_SIZE = 400
+
+
+class SearchAnimation:
+    """
+    Animates a search over an obstacle course. Cells are painted into an RGB
+    array indexed as [y, x], a whole batch per NumPy write, and frame() hands
+    the array to whichever outputs are open:
+
+    - output ending in .gif: frames are kept, one byte per pixel indexing a
+      palette they share, and saved with Pillow on close()
+    - output ending in .mp4: frames are piped to ffmpeg through matplotlib
+    - live: one persistent imshow artist in a matplotlib window, redrawn in
+      place, which stays open after close() until it is closed
+
+    Without live nothing opens a window, so exports also run headless. Only
+    every n-th call to frame() makes a frame, and close() makes one of the
+    final state if that isn't the last frame already. Exported frames are
+    scaled up by a whole factor to about MEDIA_SIZE pixels, or by scale if it
+    is given.
+
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(
+        self,
+        grid: Union[Image.Image, np.ndarray],
+        output: Optional[str] = None,
+        live: bool = False,
+        every: int = 1,
+        fps: int = 25,
+        scale: Optional[int] = None,
+    ):
+        if isinstance(grid, np.ndarray):
+            grid = occupancy_to_image(grid)
+        self.pixels = np.array(grid.convert("RGB"))
+        height, width = self.pixels.shape[:2]
+
+        self.output = output
+        self.live = live
+        self.every = max(1, every)
+        self.fps = fps
+        self.scale = scale or max(1, MEDIA_SIZE // max(width, height))
+        self.frames = 0  # Frames made so far
+        self._calls = 0  # Calls to frame() so far
+        self._painted = True  # Whether pixels changed since the last frame
+        self._gif_frames = []
+        self._palette = {}  # 0xRRGGBB -> palette index, for the GIF frames
+
+        if output is not None and not output.endswith((".gif", ".mp4")):
+            raise ValueError(f"Can only export .gif or .mp4, not {output!r}")
+        self._figure = self._artist = self._writer = None
+        if live or (output is not None and output.endswith(".mp4")):
+            self._open_figure(width * self.scale, height * self.scale)
+
+    def _open_figure(self, width: int, height: int) -> None:
+        dpi = 100
+        if self.live:
+            figure = plt.figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        else:
+            figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        axes = figure.add_axes([0, 0, 1, 1])
+        axes.set_axis_off()
+        self._figure = figure
+        self._artist = axes.imshow(self.pixels, interpolation="nearest")
+
+        if self.output is not None and self.output.endswith(".mp4"):
+            if not animation.writers.is_available("ffmpeg"):
+                raise RuntimeError("Writing MP4 needs ffmpeg on the PATH")
+            self._writer = animation.writers["ffmpeg"](fps=self.fps)
+            self._writer.setup(figure, self.output, dpi=dpi)
+
+    def __enter__(self) -> "SearchAnimation":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def paint(self, cells: Union[np.ndarray, Iterable[Tuple]], color: Tuple) -> None:
+        """
+        Colours cells, given as a boolean mask indexed as [y, x] or as (x, y)
+        nodes, in one write.
+        """
+        if isinstance(cells, np.ndarray) and cells.dtype == bool:
+            self.pixels[cells] = color
+        else:
+            nodes = np.asarray(list(cells), dtype=np.intp).reshape(-1, 2)
+            self.pixels[nodes[:, 1], nodes[:, 0]] = color
+        self._painted = True
+
+    def frame(self) -> None:
+        self._calls += 1
+        if (self._calls - 1) % self.every == 0:
+            self._make_frame()
+
+    def _make_frame(self) -> None:
+        self.frames += 1
+        self._painted = False
+        if self.output is not None and self.output.endswith(".gif"):
+            self._gif_frames.append(self._gif_frame())
+        if self._artist is not None:
+            self._artist.set_data(self.pixels)
+        if self._writer is not None:
+            self._writer.grab_frame()
+        if self.live:
+            plt.pause(0.001)
+
+    def _gif_frame(self) -> np.ndarray:
+        """
+        Palette indexes of the current pixels. With at most 256 colours over
+        all frames, the GIF needs no quantizing, which would otherwise take
+        Pillow longer than everything else together; past that the frame is
+        kept in RGB and left to Pillow.
+        """
+        keys = self.pixels.reshape(-1, 3).astype(np.uint32)
+        keys = keys[:, 0] << 16 | keys[:, 1] << 8 | keys[:, 2]
+        colors, indexes = np.unique(keys, return_inverse=True)
+        slots = [self._palette.setdefault(int(c), len(self._palette)) for c in colors]
+        if len(self._palette) > 256:
+            return self.pixels.copy()
+        slots = np.array(slots, dtype=np.uint8)
+        return slots[indexes].reshape(self.pixels.shape[:2])
+
+    def _gif_images(self) -> List[Image.Image]:
+        palette = bytearray(3 * len(self._palette))
+        for color, index in self._palette.items():
+            palette[3 * index : 3 * index + 3] = color.to_bytes(3, "big")
+
+        images = []
+        for frame in self._gif_frames:
+            if frame.ndim == 2:
+                image = Image.fromarray(frame, "P")
+                image.putpalette(palette)
+            else:
+                image = Image.fromarray(frame, "RGB")
+            images.append(
+                image.resize(
+                    (frame.shape[1] * self.scale, frame.shape[0] * self.scale),
+                    Image.NEAREST,
+                )
+            )
+        return images
+
+    def close(self) -> None:
+        """
+        Makes the final frame, writes the export and, when live, leaves the
+        window up until it is closed.
+        """
+        if self._painted:
+            self._make_frame()
+        if self._gif_frames:
+            frames = self._gif_images()
+            frames[0].save(
+                self.output,
+                save_all=True,
+                append_images=frames[1:],
+                duration=round(1000 / self.fps),
+                loop=0,
+                optimize=False,
+            )
+            self._gif_frames = []
+        if self._writer is not None:
+            self._writer.finish()
+            self._writer = None
+        if self.live:
+            plt.show()
@@ -0,0 +1,238 @@
+from heapq import heappop, heappush
+from math import inf
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from grid import GridGraph
+from heuristics import manhattan, octile
+from search_stats import SearchStats
+
+# Keys are sums of irrational step costs and heuristic values, so keys that
+# are equal in exact arithmetic can differ in the last bits
+KEY_TOLERANCE = 1e-9
+
+
+def key_precedes(key: Tuple[float, float], other: Tuple[float, float]) -> bool:
+    """
+    Lexicographic key < other that treats components within KEY_TOLERANCE as
+    equal.
+    """
+    if abs(key[0] - other[0]) > KEY_TOLERANCE:
+        return key[0] < other[0]
+    return key[1] < other[1] - KEY_TOLERANCE
+
+
+class DStarLite:
+    """
+    Incremental planner over a GridGraph following D* Lite (Koenig and
+    Likhachev, 2002). The search runs backwards from the goal and keeps its
+    tree between calls, so after obstacles are added or removed, or the start
+    moves along the path, plan() only repairs the part of the tree the change
+    affects instead of searching from scratch.
+
+    Obstacle changes are written into graph, which is shared with any other
+    planner using it. The on_expand, on_generate and on_path callbacks work as
+    in astar, for every call to plan().
+    """
+
+    def __init__(
+        self,
+        graph: GridGraph,
+        start: Tuple,
+        goal: Tuple,
+        heuristic: Optional[Callable] = None,
+        on_expand: Optional[Callable] = None,
+        on_generate: Optional[Callable] = None,
+        on_path: Optional[Callable] = None,
+    ):
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        if heuristic is None:
+            heuristic = octile if graph.connectivity == 8 else manhattan
+        self.heuristic = heuristic
+        self.on_expand = on_expand
+        self.on_generate = on_generate
+        self.on_path = on_path
+        # Work towards the next call to plan(), including the requeues that
+        # obstacle changes cause before it
+        self._stats = SearchStats()
+
+        self._cost_to_goal = {}  # g, missing entries are infinite
+        self._lookahead = {goal: 0}  # rhs, missing entries are infinite
+        self._key_modifier = 0  # k_m, accumulates heuristic drift as start moves
+        self._last_start = start
+
+        # Heap of (key, node); an entry is current only if its key matches
+        # _queued[node], older ones are skipped when popped
+        self._open = []
+        self._queued = {}
+        self._push(goal)
+
+    def plan(self) -> Tuple[List, float, SearchStats]:
+        """
+        Brings the search tree up to date and returns (path, cost, stats) like
+        astar: the path from start to goal inclusive, its cost, and what this
+        call did. The path is empty and the cost infinite if the goal is
+        unreachable.
+        """
+        stats = self._stats.start()
+        self._compute_shortest_path()
+        self._stats = SearchStats()
+
+        cost = self._g(self.start)
+        # The goal is its own cost-to-goal field even when it is blocked
+        if cost == inf or not (
+            self.graph.is_free(self.start) and self.graph.is_free(self.goal)
+        ):
+            return [], inf, stats.finish()
+
+        # Follow the cheapest successor down the cost-to-goal field
+        path = [self.start]
+        while path[-1] != self.goal:
+            path.append(
+                min(
+                    self._successors(path[-1]),
+                    key=lambda edge: edge[1] + self._g(edge[0]),
+                )[0]
+            )
+        if self.on_path is not None:
+            self.on_path(path)
+        return path, cost, stats.finish(cost)
+
+    def move_start(self, start: Tuple) -> None:
+        """
+        Moves the start, typically to where the robot now is along the path.
+        """
+        self._key_modifier += self.heuristic(self._last_start, start)
+        self._last_start = start
+        self.start = start
+
+    def add_obstacles(self, cells: Iterable[Tuple]) -> None:
+        self._update_cells(self.graph.set_occupied(cells, True))
+
+    def remove_obstacles(self, cells: Iterable[Tuple]) -> None:
+        self._update_cells(self.graph.set_occupied(cells, False))
+
+    def _update_cells(self, changed: List) -> None:
+        """
+        Edge costs into and out of changed cells differ now, so their
+        lookahead values and their neighbours' need recomputing.
+        """
+        affected = set(changed)
+        for cell in changed:
+            affected.update(self._adjacent(cell))
+        for node in affected:
+            self._update_vertex(node)
+
+    def _g(self, node: Tuple) -> float:
+        return self._cost_to_goal.get(node, inf)
+
+    def _rhs(self, node: Tuple) -> float:
+        return self._lookahead.get(node, inf)
+
+    def _key(self, node: Tuple) -> Tuple[float, float]:
+        best = min(self._g(node), self._rhs(node))
+        return best + self.heuristic(self.start, node) + self._key_modifier, best
+
+    def _push(self, node: Tuple) -> None:
+        key = self._key(node)
+        self._queued[node] = key
+        heappush(self._open, (key, node))
+        self._stats.generated += 1
+        if self.on_generate is not None:
+            self.on_generate(node)
+
+    def _top(self):
+        """
+        Smallest current entry of the open list, or None if it is empty.
+        """
+        while self._open:
+            key, node = self._open[0]
+            if self._queued.get(node) == key:
+                return key, node
+            heappop(self._open)
+        return None
+
+    def _successors(self, node: Tuple) -> List:
+        """
+        (neighbour, step cost) pairs for the traversable edges out of node.
+        """
+        neighbours = self.graph[node]
+        if isinstance(neighbours, dict):
+            return list(neighbours.items())
+        return [(neighbour, 1) for neighbour in neighbours]
+
+    def _adjacent(self, node: Tuple) -> List:
+        """
+        In-bounds cells next to node, whether or not they are obstacles.
+        """
+        x, y = node
+        return [
+            (x + dx, y + dy)
+            for dx, dy in self.graph.moves
+            if self.graph.in_bounds((x + dx, y + dy))
+        ]
+
+    def _requeue(self, node: Tuple) -> None:
+        """
+        Queues node if it is locally inconsistent, dropping any older entry.
+        """
+        queued = self._queued.pop(node, None) is not None
+        if self._g(node) != self._rhs(node):
+            if queued:
+                self._stats.reopened += 1
+            self._push(node)
+
+    def _update_vertex(self, node: Tuple) -> None:
+        """
+        Recomputes the lookahead of node from all of its successors.
+        """
+        if node != self.goal:
+            cost_to_goal = self._cost_to_goal
+            self._lookahead[node] = min(
+                (
+                    cost + cost_to_goal.get(successor, inf)
+                    for successor, cost in self._successors(node)
+                ),
+                default=inf,
+            )
+        self._requeue(node)
+
+    def _compute_shortest_path(self) -> None:
+        lookahead = self._lookahead
+        stats = self._stats
+        while True:
+            top = self._top()
+            if top is None:
+                break
+            key, node = top
+            if not key_precedes(key, self._key(self.start)) and self._rhs(
+                self.start
+            ) == self._g(self.start):
+                break
+
+            stats.peak_open = max(stats.peak_open, len(self._open))
+            heappop(self._open)
+            del self._queued[node]
+            stats.expanded += 1
+            if self.on_expand is not None:
+                self.on_expand(node)
+
+            new_key = self._key(node)
+            if key_precedes(key, new_key):  # Heuristic drifted since it was queued
+                self._push(node)
+            elif self._g(node) > self._rhs(node):  # Overconsistent, settle it
+                node_cost = self._cost_to_goal[node] = lookahead[node]
+                # The graph is undirected, so predecessors are the successors
+                for neighbour, cost in self._successors(node):
+                    if neighbour != self.goal and cost + node_cost < self._rhs(
+                        neighbour
+                    ):
+                        lookahead[neighbour] = cost + node_cost
+                        self._requeue(neighbour)
+            else:  # Underconsistent, raise it and repair what depended on it
+                old_cost = self._cost_to_goal.pop(node)
+                self._update_vertex(node)
+                for neighbour, cost in self._successors(node):
+                    if self._rhs(neighbour) == cost + old_cost:
+                        self._update_vertex(neighbour)
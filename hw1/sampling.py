@@ -0,0 +1,337 @@
+import math
+import random
+from math import inf
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from grid import GridGraph
+from search_stats import SearchStats
+
+# Segments crossing a vertical and a horizontal cell edge within this fraction
+# of each other pass through the corner; between cell centres they do exactly
+CORNER_TOLERANCE = 1e-9
+
+
+class KDTree:
+    """
+    2D tree of points that grows one point at a time, for the nearest-node
+    queries of the planners below. Neither insertion nor a query looks at
+    more than a branch or two on average, so both take O(log n) for the
+    scattered points a sampling planner adds, where a scan would take O(n).
+    """
+
+    def __init__(self):
+        self.points = []
+        self._left = []  # Child indexes, -1 for none
+        self._right = []
+        self._axis = []  # Coordinate each point splits on
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def insert(self, point: Tuple[float, float]) -> int:
+        """
+        Adds a point and returns its index in points.
+        """
+        index = len(self.points)
+        self.points.append(point)
+        self._left.append(-1)
+        self._right.append(-1)
+        if index == 0:
+            self._axis.append(0)
+            return index
+
+        node = 0
+        while True:
+            axis = self._axis[node]
+            side = self._left if point[axis] < self.points[node][axis] else self._right
+            if side[node] < 0:
+                side[node] = index
+                self._axis.append(1 - axis)
+                return index
+            node = side[node]
+
+    def nearest(self, point: Tuple[float, float]) -> int:
+        """
+        Index of the point closest to point. The tree must not be empty.
+        """
+        points, left, right, axes = self.points, self._left, self._right, self._axis
+        best, best_distance = -1, inf
+        # (node, squared distance from point to the node's side of its parent)
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= best_distance:
+                continue
+            x, y = points[node]
+            distance = (x - point[0]) ** 2 + (y - point[1]) ** 2
+            if distance < best_distance:
+                best, best_distance = node, distance
+
+            offset = point[axes[node]] - points[node][axes[node]]
+            near, far = (left, right) if offset < 0 else (right, left)
+            if far[node] >= 0:
+                stack.append((far[node], offset * offset))
+            if near[node] >= 0:
+                stack.append((near[node], 0.0))
+        return best
+
+
+def segment_cells(
+    a: Tuple[float, float], b: Tuple[float, float], corners: bool = False
+) -> Iterator[Tuple[int, int]]:
+    """
+    Cells whose interior the segment from point a to point b passes through,
+    in order, for points anywhere in the grid's continuous space, where cell
+    (x, y) is the unit square centred on (x, y). Like line_cells in
+    any_angle, a segment passing exactly through a corner steps diagonally,
+    and only includes the two cells touching it with corners.
+    """
+    x0, y0 = a[0] + 0.5, a[1] + 0.5
+    x, y = math.floor(x0), math.floor(y0)
+    end_x, end_y = math.floor(b[0] + 0.5), math.floor(b[1] + 0.5)
+    yield x, y
+
+    dx, dy = b[0] + 0.5 - x0, b[1] + 0.5 - y0
+    sx, sy = (1 if dx > 0 else -1), (1 if dy > 0 else -1)
+    # Fraction of the segment at which it next crosses a vertical or a
+    # horizontal cell edge, and the fraction between such crossings
+    next_x = (x + (sx > 0) - x0) / dx if dx else inf
+    next_y = (y + (sy > 0) - y0) / dy if dy else inf
+    delta_x, delta_y = (abs(1 / dx) if dx else inf), (abs(1 / dy) if dy else inf)
+
+    # Count the crossings left rather than compare with the end cell, so
+    # rounding in the fractions can't make the walk overshoot
+    crossings_x, crossings_y = abs(end_x - x), abs(end_y - y)
+    while crossings_x or crossings_y:
+        if crossings_x and crossings_y and abs(next_x - next_y) < CORNER_TOLERANCE:
+            if corners:
+                yield x + sx, y
+                yield x, y + sy
+            x, y = x + sx, y + sy
+            next_x, next_y = next_x + delta_x, next_y + delta_y
+            crossings_x, crossings_y = crossings_x - 1, crossings_y - 1
+        elif crossings_x and (next_x < next_y or not crossings_y):
+            x, next_x, crossings_x = x + sx, next_x + delta_x, crossings_x - 1
+        else:
+            y, next_y, crossings_y = y + sy, next_y + delta_y, crossings_y - 1
+        yield x, y
+
+
+def sampled_path_cells(waypoints: List) -> List:
+    """
+    Cells along a path of continuous waypoints, for drawing it on the grid.
+    """
+    cells = []
+    for a, b in zip(waypoints, waypoints[1:]):
+        for cell in segment_cells(a, b):
+            if not cells or cell != cells[-1]:
+                cells.append(cell)
+    return cells or [tuple(map(round, point)) for point in waypoints]
+
+
+class _Sampler:
+    """
+    What rrt and rrt_connect share: drawing points, steering and collision
+    checks over a GridGraph's occupancy, none of which looks at more of the
+    grid than the segments checked.
+    """
+
+    def __init__(self, graph: GridGraph, step: float, seed: Optional[int]):
+        if step <= 0:
+            raise ValueError(f"step must be positive, got {step}")
+        self.graph = graph
+        self.step = step
+        self.random = random.Random(seed) if seed is not None else random
+        self.corners = graph.connectivity == 4
+
+    def sample(self) -> Tuple[float, float]:
+        uniform = self.random.uniform
+        return (
+            uniform(-0.5, self.graph.width - 0.5),
+            uniform(-0.5, self.graph.height - 0.5),
+        )
+
+    def steer(self, source: Tuple, target: Tuple) -> Tuple:
+        """
+        target, or the point step away from source towards it if farther.
+        """
+        distance = math.dist(source, target)
+        if distance <= self.step:
+            return target
+        scale = self.step / distance
+        return (
+            source[0] + (target[0] - source[0]) * scale,
+            source[1] + (target[1] - source[1]) * scale,
+        )
+
+    def free(self, a: Tuple, b: Tuple) -> bool:
+        width, blocked = self.graph.width, self.graph.blocked
+        return not any(
+            blocked[y * width + x] for x, y in segment_cells(a, b, self.corners)
+        )
+
+
+def _tree_path(points: List, parent: List, index: int) -> List:
+    path = []
+    while index >= 0:
+        path.append(points[index])
+        index = parent[index]
+    return path[::-1]
+
+
+def _finish(
+    stats: SearchStats, path: List, on_path: Optional[Callable]
+) -> Tuple[List, float, SearchStats]:
+    if not path:
+        return [], inf, stats.finish()
+    if on_path is not None:
+        on_path(path)
+    cost = sum(math.dist(a, b) for a, b in zip(path, path[1:]))
+    return path, cost, stats.finish(cost)
+
+
+def rrt(
+    graph: GridGraph,
+    start: Tuple,
+    goal: Tuple,
+    step: float = 5.0,
+    goal_bias: float = 0.05,
+    max_samples: int = 20000,
+    seed: Optional[int] = None,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, float, SearchStats]:
+    """
+    Rapidly-exploring random tree (LaValle, 1998) over the continuous free
+    space of the grid. Each of up to max_samples iterations draws a point,
+    the goal itself with probability goal_bias, and grows the tree from its
+    nearest node by at most step towards it if the segment is free. The
+    search ends once the goal can be joined to a new node.
+
+    Nodes are found through a KDTree and only the segments tried are checked
+    against the occupancy, so the work grows with the number of samples the
+    path needs rather than with the size of the map. The path is feasible
+    but not optimal. Draws come from random.Random(seed), or from the random
+    module when seed is None.
+
+    Returns (waypoints, cost, stats) like theta_star, with waypoints from
+    start to goal inclusive, in between at continuous positions; see
+    sampled_path_cells for the cells they cross. Empty, with an infinite cost,
+    if no path was found within max_samples. stats counts each sample as an
+    expansion and each node added as generated. on_expand gets each sample
+    point, on_generate each new node and on_path the waypoints.
+    """
+    stats = SearchStats().start()
+    if not (graph.is_free(start) and graph.is_free(goal)):
+        return [], inf, stats.finish()
+    sampler = _Sampler(graph, step, seed)
+    tree = KDTree()
+    parent = [-1]
+    tree.insert(start)
+    stats.generated = 1
+    if start == goal:
+        return _finish(stats, [start], on_path)
+
+    for _ in range(max_samples):
+        target = goal if sampler.random.random() < goal_bias else sampler.sample()
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(target)
+
+        nearest = tree.nearest(target)
+        source = tree.points[nearest]
+        point = sampler.steer(source, target)
+        if not sampler.free(source, point):
+            continue
+        parent.append(nearest)
+        index = tree.insert(point)
+        stats.generated += 1
+        if on_generate is not None:
+            on_generate(point)
+
+        if point == goal:
+            return _finish(stats, _tree_path(tree.points, parent, index), on_path)
+        if math.dist(point, goal) <= step and sampler.free(point, goal):
+            parent.append(index)
+            index = tree.insert(goal)
+            stats.generated += 1
+            return _finish(stats, _tree_path(tree.points, parent, index), on_path)
+
+    return _finish(stats, [], on_path)
+
+
+def rrt_connect(
+    graph: GridGraph,
+    start: Tuple,
+    goal: Tuple,
+    step: float = 5.0,
+    max_samples: int = 20000,
+    seed: Optional[int] = None,
+    on_expand: Optional[Callable] = None,
+    on_generate: Optional[Callable] = None,
+    on_path: Optional[Callable] = None,
+) -> Tuple[List, float, SearchStats]:
+    """
+    RRT-Connect (Kuffner and LaValle, 2000): grows one tree from start and
+    one from goal. Each iteration extends one tree by a step towards a random
+    point, then greedily extends the other straight towards the new node
+    until it reaches it or is blocked, and the trees swap roles. Usually
+    needs far fewer samples than rrt, with no goal bias to tune.
+
+    Takes the arguments of rrt except goal_bias and returns what it does.
+    """
+    stats = SearchStats().start()
+    if not (graph.is_free(start) and graph.is_free(goal)):
+        return [], inf, stats.finish()
+    sampler = _Sampler(graph, step, seed)
+    trees, parents = (KDTree(), KDTree()), ([-1], [-1])
+    trees[0].insert(start)
+    trees[1].insert(goal)
+    stats.generated = 2
+    if start == goal:
+        return _finish(stats, [start], on_path)
+
+    def extend(side: int, source_index: int, target: Tuple) -> int:
+        """
+        Adds the node step from source towards target if the way is free,
+        returning its index, or -1.
+        """
+        tree = trees[side]
+        source = tree.points[source_index]
+        point = sampler.steer(source, target)
+        if not sampler.free(source, point):
+            return -1
+        parents[side].append(source_index)
+        stats.generated += 1
+        if on_generate is not None:
+            on_generate(point)
+        return tree.insert(point)
+
+    side = 0
+    for _ in range(max_samples):
+        target = sampler.sample()
+        stats.expanded += 1
+        if on_expand is not None:
+            on_expand(target)
+
+        tree, other = trees[side], trees[1 - side]
+        new = extend(side, tree.nearest(target), target)
+        if new >= 0:
+            point = tree.points[new]
+            reached = other.nearest(point)
+            while other.points[reached] != point:
+                reached = extend(1 - side, reached, point)
+                if reached < 0:
+                    break
+            else:
+                halves = (
+                    _tree_path(tree.points, parents[side], new),
+                    _tree_path(other.points, parents[1 - side], reached),
+                )
+                if side == 1:
+                    halves = halves[::-1]
+                return _finish(stats, halves[0] + halves[1][-2::-1], on_path)
+        side = 1 - side
+
+    return _finish(stats, [], on_path)
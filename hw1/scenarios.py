@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from grid import (
+    STRAIGHT_MOVES,
+    GridGraph,
+    grid_fingerprint,
+    label_components,
+    straight_jump_stops,
+)
+from hw0.obstacle_course import create_obstacle_array, occupancy_to_image
+from landmarks import LandmarkHeuristic, build_landmarks
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Part of every parameter key, bumped whenever the files written change meaning
+FORMAT_VERSION = 1
+DEFAULT_ROOT = os.environ.get(
+    "SCENARIO_STORE",
+    os.path.join(os.path.expanduser("~"), ".cache", "rbe550", "scenarios"),
+)
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    """
+    Writes array to path as .npy through a temporary file, so that concurrent
+    runs never see a partly written one.
+    """
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            np.save(file, array)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class Scenario:
+    """
+    One obstacle course in a ScenarioStore along with the data derived from
+    it. Arrays are memory-mapped on first use, and derived data the store
+    doesn't hold yet is computed once and written back.
+    """
+
+    def __init__(self, store: "ScenarioStore", fingerprint: str):
+        self.store = store
+        self.fingerprint = fingerprint
+        self.directory = os.path.join(store.root, "grids", fingerprint)
+        self._occupied = None
+
+    @property
+    def occupied(self) -> np.ndarray:
+        """
+        Read-only occupancy array indexed as [y, x].
+        """
+        if self._occupied is None:
+            self._occupied = np.load(self._path("occupancy"), mmap_mode="r")
+        return self._occupied
+
+    def image(self) -> Image.Image:
+        return occupancy_to_image(self.occupied)
+
+    def graph(self, connectivity: int = 4) -> GridGraph:
+        """
+        GridGraph over a copy-on-write mapping of the occupancy, so cells can
+        be changed without touching the store, with the stored component
+        labels and, when 8-connected, jump stops.
+        """
+        occupied = np.load(self._path("occupancy"), mmap_mode="c")
+        graph = GridGraph(occupied, connectivity)
+        graph.use_indexes(
+            components=self.components(connectivity),
+            jump_stops=self.jump_stops() if connectivity == 8 else None,
+        )
+        return graph
+
+    def components(self, connectivity: int = 4) -> np.ndarray:
+        return self._derived(
+            f"components{connectivity}",
+            lambda: label_components(self.occupied, connectivity),
+        )
+
+    def jump_stops(self) -> Dict[Tuple[int, int], np.ndarray]:
+        names = {(dx, dy): f"jump_stops{dx:+d}{dy:+d}" for dx, dy in STRAIGHT_MOVES}
+        if not all(os.path.exists(self._path(name)) for name in names.values()):
+            stops = straight_jump_stops(self.occupied)
+            for direction, name in names.items():
+                _save_array(self._path(name), stops[direction])
+            self.store.evict(keep=self.fingerprint)
+        return {
+            direction: np.load(self._path(name), mmap_mode="r")
+            for direction, name in names.items()
+        }
+
+    def landmarks(self, connectivity: int = 8, count: int = 8) -> LandmarkHeuristic:
+        """
+        ALT heuristic over count farthest-point landmarks, whose positions and
+        distance tables are stored with the course.
+        """
+        names = (
+            f"landmarks{connectivity}-{count}",
+            f"landmark_tables{connectivity}-{count}",
+        )
+        if not all(os.path.exists(self._path(name)) for name in names):
+            landmarks, tables = build_landmarks(self.graph(connectivity), count)
+            _save_array(self._path(names[0]), np.array(landmarks, dtype=np.intp))
+            _save_array(self._path(names[1]), tables)
+            self.store.evict(keep=self.fingerprint)
+        landmarks, tables = (np.load(self._path(name), mmap_mode="r") for name in names)
+        return LandmarkHeuristic(tables, landmarks.tolist(), connectivity)
+
+    def pairs(self, count: int, connectivity: int = 4, seed: int = 0) -> np.ndarray:
+        """
+        count (start, goal) pairs of free cells that reach each other, drawn
+        uniformly for seed, as an int array of shape (count, 2, 2) whose rows
+        are ((x, y), (x, y)).
+        """
+
+        def sample() -> np.ndarray:
+            labels = self.components(connectivity).reshape(-1)
+            free = np.flatnonzero(labels >= 0)
+            if not free.size:
+                raise ValueError("The grid has no free cells")
+            free = free[np.argsort(labels[free], kind="stable")]
+            free_labels = labels[free]
+
+            # Goals are drawn among the free cells sharing the start's label
+            rng = np.random.default_rng(seed)
+            starts = free[rng.integers(0, free.size, count)]
+            low = np.searchsorted(free_labels, labels[starts], "left")
+            high = np.searchsorted(free_labels, labels[starts], "right")
+            goals = free[low + (rng.random(count) * (high - low)).astype(np.intp)]
+
+            ys, xs = np.divmod(
+                np.stack([starts, goals], axis=1), self.occupied.shape[1]
+            )
+            return np.stack([xs, ys], axis=2)
+
+        return self._derived(f"pairs{connectivity}-{count}-{seed}", sample)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name + ".npy")
+
+    def _derived(self, name: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        path = self._path(name)
+        if not os.path.exists(path):
+            _save_array(path, compute())
+            self.store.evict(keep=self.fingerprint)
+        return np.load(path, mmap_mode="r")
+
+
+class ScenarioStore:
+    """
+    On-disk store of obstacle courses and data derived from them: component
+    labels, jump point tables, landmark distance tables and sampled start/goal
+    pairs, as .npy files that are memory-mapped back, so a hit costs
+    milliseconds whatever the grid size.
+
+    Courses are content-addressed, stored under the grid_fingerprint of their
+    occupancy, and get() maps the parameters of create_obstacle_array to the
+    course they produce. When the store outgrows max_bytes, the least recently
+    used courses are removed.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, max_bytes: int = 2**30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.join(root, "grids"), exist_ok=True)
+        os.makedirs(os.path.join(root, "params"), exist_ok=True)
+
+    def get(
+        self, grid_size: int, coverage: int, seed: int, batch: bool = False
+    ) -> Scenario:
+        """
+        The course create_obstacle_array(grid_size, coverage, seed, batch)
+        makes, generated and stored on a miss. Unseeded courses depend on the
+        random state, so can't be looked up.
+        """
+        if seed is None:
+            raise ValueError("Only seeded obstacle courses can be stored")
+        key = f"v{FORMAT_VERSION}-{grid_size}-{coverage}-{seed}-{int(batch)}"
+        key_path = os.path.join(self.root, "params", key + ".json")
+        try:
+            with open(key_path) as file:
+                scenario = Scenario(self, json.load(file)["fingerprint"])
+        except (OSError, ValueError, KeyError):
+            scenario = None
+
+        if scenario is not None and os.path.exists(scenario._path("occupancy")):
+            self.hits += 1
+            os.utime(scenario.directory)  # Most recently used
+            return scenario
+
+        self.misses += 1
+        scenario = self.put(
+            create_obstacle_array(grid_size, coverage, seed=seed, batch=batch)
+        )
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(key_path))
+        with os.fdopen(descriptor, "w") as file:
+            json.dump({"fingerprint": scenario.fingerprint}, file)
+        os.replace(temporary, key_path)
+        return scenario
+
+    def put(self, occupied: np.ndarray) -> Scenario:
+        """
+        Stores an occupancy array indexed as [y, x], unless the same grid is
+        stored already.
+        """
+        occupied = np.ascontiguousarray(occupied, dtype=bool)
+        scenario = Scenario(self, grid_fingerprint(occupied))
+        os.makedirs(scenario.directory, exist_ok=True)
+        if not os.path.exists(scenario._path("occupancy")):
+            _save_array(scenario._path("occupancy"), occupied)
+        os.utime(scenario.directory)
+        self.evict(keep=scenario.fingerprint)
+        return scenario
+
+    @property
+    def nbytes(self) -> int:
+        return sum(size for _, size, _ in self._grids())
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Removes the least recently used courses, other than keep, until the
+        store fits in max_bytes. Parameter keys left pointing at them become
+        misses.
+        """
+        grids = sorted(self._grids())
+        total = sum(size for _, size, _ in grids)
+        for _, size, fingerprint in grids:
+            if total <= self.max_bytes:
+                break
+            if fingerprint != keep:
+                shutil.rmtree(
+                    os.path.join(self.root, "grids", fingerprint), ignore_errors=True
+                )
+                total -= size
+                self.evictions += 1
+
+    def _grids(self):
+        """
+        (last used, bytes, fingerprint) of every stored course.
+        """
+        grids = os.path.join(self.root, "grids")
+        for fingerprint in os.listdir(grids):
+            directory = os.path.join(grids, fingerprint)
+            try:
+                size = sum(
+                    entry.stat().st_size
+                    for entry in os.scandir(directory)
+                    if entry.is_file()
+                )
+                yield os.path.getmtime(directory), size, fingerprint
+            except OSError:  # Removed by another process meanwhile
+                continue
@@ -0,0 +1,80 @@
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from math import inf
+from typing import Dict, List, Optional
+
+
+@dataclass
+class SearchStats:
+    """
+    What one planner call did:
+
+    expanded: nodes taken off the open list and expanded
+    generated: nodes put on the open list, counting repeats
+    peak_open: largest size the open list reached, stale entries included
+    reopened: times a node already on the open list was put on it again
+        because a cheaper way to it turned up (or, for D* Lite, its cost to
+        the goal needed repairing)
+    path_cost: cost of the returned path, inf if there is none
+    wall_time: seconds from the start of the call to its return
+    peak_memory: peak bytes allocated during the call above what was
+        allocated when it started, or None unless tracemalloc is tracing.
+        The tracemalloc peak is left to whoever traces, so reset it before
+        the call if an earlier peak may be higher
+    """
+
+    expanded: int = 0
+    generated: int = 0
+    peak_open: int = 0
+    reopened: int = 0
+    path_cost: float = inf
+    wall_time: float = 0.0
+    peak_memory: Optional[int] = None
+
+    _started: float = field(default=0.0, repr=False, compare=False)
+    _memory_base: int = field(default=0, repr=False, compare=False)
+
+    def start(self) -> "SearchStats":
+        """
+        Starts the clock, and the memory measurement if tracemalloc is tracing.
+        """
+        if tracemalloc.is_tracing():
+            self._memory_base = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+        return self
+
+    def merge(self, other: "SearchStats") -> "SearchStats":
+        """
+        Counts the work of a search run as part of this one. Open lists are
+        taken to be separate, so peak_open is the larger of the two.
+        """
+        self.expanded += other.expanded
+        self.generated += other.generated
+        self.reopened += other.reopened
+        self.peak_open = max(self.peak_open, other.peak_open)
+        return self
+
+    def finish(self, path_cost: float = inf) -> "SearchStats":
+        self.wall_time = time.perf_counter() - self._started
+        if tracemalloc.is_tracing():
+            self.peak_memory = max(
+                tracemalloc.get_traced_memory()[1] - self._memory_base, 0
+            )
+        self.path_cost = path_cost
+        return self
+
+
+def path_cost(graph: Dict, path: List) -> float:
+    """
+    Cost of a path of adjacent nodes, using the edge weights when graph[node]
+    is a dict of {neighbour: distance} and unit weights when it is a list.
+    Empty paths cost inf.
+    """
+    if not path:
+        return inf
+    cost = 0
+    for node, next_node in zip(path, path[1:]):
+        neighbours = graph[node]
+        cost += neighbours[next_node] if isinstance(neighbours, dict) else 1
+    return cost
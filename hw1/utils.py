@@ -1,62 +1,107 @@
+from __future__ import annotations
+
 import random
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 import math
-from PIL import Image
 
+import numpy as np
+
+from grid import GridGraph
+
+if TYPE_CHECKING:
+    from PIL import Image
 
-def choose_start_and_end_loc(image: Image) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+
+def choose_start_and_end_loc(
+    image: Union[Image.Image, np.ndarray], graph: Optional[GridGraph] = None
+) -> Tuple[Tuple[int, int], Tuple[int, int]]:
     """
     Randomly chooses start, end locations in the top left and
     bottom right portions of the image avoiding obstacles.
+    Only mutually reachable pairs are considered, going by the connected
+    components of graph, or of the 4-connected grid from image when no graph
+    is given (4-connected reachability implies 8-connected reachability).
+
+    image may also be an occupancy array, memory-mapped or not. For a graph
+    without index_components, random free cells of the two corners are
+    chosen, reading only a few cells, whether or not they reach each other.
     """
-    grid_size = image.size[0]
+    if graph is None:
+        if isinstance(image, np.ndarray):
+            graph = GridGraph(image, connectivity=4)
+        else:
+            graph = GridGraph.from_image(image, connectivity=4)
+    grid_size = graph.width
     limit = int(10 * grid_size / 100)
 
+    if not graph.index_components:
+        start = random_free_cell(graph.occupied, 0, 0, limit)
+        end = random_free_cell(
+            graph.occupied, grid_size - limit, grid_size - limit, limit
+        )
+        if start is None or end is None:
+            raise ValueError("No free start or end location")
+        return start, end
+
+    # Component labels of the NorthWest and SouthEast corners, transposed to
+    # [x, y] so that locations come out in the same x-major order as always
+    start_labels = graph.components[:limit, :limit].T
+    end_labels = graph.components[grid_size - limit :, grid_size - limit :].T
+
     # Filter out feasible start locations in the NorthWest
-    feasible_starts = []
-    for i in range(limit):  # x
-        for j in range(limit):  # y
-            if image.getpixel((i, j)) == (0, 0, 0):
-                continue
-            feasible_starts.append((i, j))
+    start_xs, start_ys = np.nonzero(np.isin(start_labels, end_labels[end_labels >= 0]))
+    feasible_starts = list(zip(start_xs.tolist(), start_ys.tolist()))
+    if not feasible_starts:
+        raise ValueError("No free start location can reach a free end location")
+    start = random.choice(feasible_starts)
 
     # Filter out feasible end locations in the SouthEast
-    feasible_ends = []
-    for i in range(grid_size - limit, grid_size):  # x
-        for j in range(grid_size - limit, grid_size):  # y
-            if image.getpixel((i, j)) == (0, 0, 0):
-                continue
-            feasible_ends.append((i, j))
+    start_label = start_labels[start]
+    end_xs, end_ys = np.nonzero(end_labels == start_label)
+    feasible_ends = [
+        (grid_size - limit + x, grid_size - limit + y)
+        for x, y in zip(end_xs.tolist(), end_ys.tolist())
+    ]
 
-    return random.choice(feasible_starts), random.choice(feasible_ends)
+    return start, random.choice(feasible_ends)
 
 
-def create_adjacency_dict(image: Image) -> Dict:
+def random_free_cell(
+    occupied: np.ndarray, x0: int, y0: int, size: int, tries: int = 1000
+) -> Optional[Tuple[int, int]]:
     """
-    Creates adjacency dict as a representation of graph from the image
+    Uniformly random free cell of the size x size tile at (x0, y0), or None if
+    there is none. Cells are drawn at random until a free one turns up, so
+    only a few of them are read; the tile is scanned only when mostly blocked.
     """
-    adjacency = {}
-    grid_size = image.size[0]
-    for i in range(grid_size):  # y
-        for j in range(grid_size):  # x
-            adjacency[(i, j)] = get_valid_node_neighbours((i, j), grid_size, image)
+    for _ in range(tries):
+        x, y = x0 + random.randrange(size), y0 + random.randrange(size)
+        if not occupied[y, x]:
+            return x, y
 
-    return adjacency
+    free = np.flatnonzero(~occupied[y0 : y0 + size, x0 : x0 + size])
+    if not free.size:
+        return None
+    y, x = divmod(int(free[random.randrange(free.size)]), size)
+    return x0 + x, y0 + y
 
 
-def create_adjacency_dict_for_weighted_graphs(image: Image) -> Dict:
+def create_adjacency_dict(image: Image) -> Dict:
     """
-    Creates adjacency list as a representation of graph from the image
+    Creates adjacency dict as a representation of graph from the image.
+    The searches also accept a GridGraph directly, which skips building this.
     """
-    adjacency = {}
-    grid_size = image.size[0]
-    for i in range(grid_size):  # y
-        for j in range(grid_size):  # x
-            adjacency[(i, j)] = get_valid_node_neighbours_with_weights(
-                (i, j), grid_size, image
-            )
+    graph = GridGraph.from_image(image, connectivity=4)
+    return {node: graph.neighbours(node) for node in graph}
+
 
-    return adjacency
+def create_adjacency_dict_for_weighted_graphs(image: Image) -> Dict:
+    """
+    Creates adjacency list as a representation of graph from the image.
+    The searches also accept a GridGraph directly, which skips building this.
+    """
+    graph = GridGraph.from_image(image, connectivity=8)
+    return {node: graph.weighted_neighbours(node) for node in graph}
 
 
 def get_valid_node_neighbours(current: Tuple, grid_size: int, image: Image) -> List:
@@ -124,7 +169,19 @@ def get_unvisited_children(node: Tuple, graph: Dict, visited: Dict) -> List:
     """
     unvisited_children = []
     for child_node in graph.get(node, []):
-        if visited[child_node]:
+        if visited.get(child_node):
             continue
         unvisited_children.append(child_node)
     return unvisited_children
+
+
+def reconstruct_path(parent: Dict, end: Tuple) -> List:
+    """
+    Follows parent links back from end and returns the path from the root of
+    the search tree to end, both inclusive.
+    """
+    path = [end]
+    while parent[path[-1]] is not None:
+        path.append(parent[path[-1]])
+    path.reverse()
+    return path